@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+################################################################################
+# Description:
+#       Offline benchmark suite. Starts mock Ollama servers
+#       (chrono_modules/mock_ollama.py), runs every engine of main.py against
+#       them and saves throughput and latency percentiles as JSON, so runs on
+#       different commits can be diffed with --compare.
+#
+# e.g.
+#     $ python benchmark.py                          # all scenarios, all engines
+#     $ python benchmark.py -s baseline -e threads,async -n 5
+#     $ python benchmark.py --compare results/bench/A.json results/bench/B.json
+################################################################################
+
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import chrono_modules.io as io
+
+RESULTS_DIR = os.path.abspath('results/bench')
+MOCK_BACKENDS = 2  # Mock servers started per scenario
+REGRESSION_THRESHOLD = 0.10  # --compare flags changes worse than 10%
+
+# Mock server settings per scenario (see mock_ollama.DEFAULT_CONFIG)
+SCENARIOS = {
+    "baseline": {},
+    "jitter": {"distribution": "lognormal", "jitter": 0.8},
+    "swap": {"max_loaded_models": 1, "swap_penalty": 0.2},
+    "errors": {"error_rate": 0.05},
+}
+
+# Engine -> workers passed as -w (None keeps the engine default)
+ENGINE_WORKERS = {
+    "serial": None,
+    "threads": 8,
+    "processes": 4,
+    "async": 64,
+    "mpi": 2,
+}
+
+TASK_TIME_RE = re.compile(r"^Task: .* \| Time: ([0-9.]+) seconds$")
+AGREEMENTS_RE = re.compile(r"^Total Agreements: (\d+)$")
+DECISIONS_RE = re.compile(r"^Total Decisions \(# of queries made\): (\d+)$")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_mock_servers(config, count, seed):
+    """Start count mock servers as subprocesses; returns (processes, urls)."""
+    processes, urls = [], []
+    for i in range(count):
+        port = free_port()
+        command = [sys.executable, "-m", "chrono_modules.mock_ollama", "--port", str(port), "--seed", str(seed + i)]
+        for key, value in config.items():
+            command += ["--" + key.replace("_", "-"), str(value)]
+        processes.append(subprocess.Popen(command, stdout=subprocess.DEVNULL))
+        urls.append(f"http://127.0.0.1:{port}")
+    for url in urls:
+        wait_for_server(url)
+    return processes, urls
+
+
+def wait_for_server(url, timeout=10):
+    host, port = url.rsplit("/", 1)[-1].split(":")
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection((host, int(port)), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Mock server at {url} did not start")
+
+
+def stop_mock_servers(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait()
+
+
+def engine_command(engine, workers, prompts_path, mpirun):
+    command = [sys.executable, "main.py", "--engine", engine, "-p", prompts_path]
+    if workers:
+        command += ["-w", str(workers)]
+    if engine == "mpi":
+        return mpirun.split() + ["-n", "2"] + command
+    return command
+
+
+def mpi_available(mpirun):
+    if not shutil.which(mpirun.split()[0]):
+        return False
+    try:
+        import mpi4py  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def read_telemetry(path):
+    """Per-request records written by the engine run (CHRONO_TELEMETRY_DIR), if any."""
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize_output(output, wall_seconds, records=()):
+    """Throughput and latency percentiles from an engine's stdout and telemetry records."""
+    latencies, agreements, decisions = [], 0, 0
+    for line in output.splitlines():
+        line = line.strip()
+        if match := TASK_TIME_RE.match(line):
+            latencies.append(float(match.group(1)))
+        elif match := AGREEMENTS_RE.match(line):
+            agreements += int(match.group(1))
+        elif match := DECISIONS_RE.match(line):
+            decisions += int(match.group(1))
+
+    ok = [record for record in records if record["status"] == "ok"]
+    if ok:
+        # Telemetry times are unrounded; the printed task times are only the fallback
+        latencies = [record["latency"] for record in ok]
+    ttfts = [record["ttft"] for record in ok if record.get("ttft") is not None]
+    latencies = np.array(latencies) if latencies else np.zeros(1)
+    ttfts = np.array(ttfts) if ttfts else np.zeros(1)
+    return {
+        "wall_seconds": round(wall_seconds, 3),
+        "completed": decisions,
+        "failed_requests": len(records) - len(ok),
+        "agreements": agreements,
+        "throughput": round(decisions / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+        "latency_p50": round(float(np.percentile(latencies, 50)), 3),
+        "latency_p90": round(float(np.percentile(latencies, 90)), 3),
+        "latency_p99": round(float(np.percentile(latencies, 99)), 3),
+        "latency_mean": round(float(latencies.mean()), 3),
+        "ttft_p50": round(float(np.percentile(ttfts, 50)), 3),
+        "ttft_p99": round(float(np.percentile(ttfts, 99)), 3),
+    }
+
+
+def run_engine(engine, workers, prompts_path, urls, mpirun):
+    with tempfile.TemporaryDirectory() as telemetry_dir:
+        env = dict(os.environ, OLLAMA_BACKENDS=",".join(urls), CHRONO_CACHE="0", CHRONO_TELEMETRY_DIR=telemetry_dir)
+        command = engine_command(engine, workers, prompts_path, mpirun)
+        start_time = time.time()
+        process = subprocess.run(command, env=env, capture_output=True, text=True)
+        wall_seconds = time.time() - start_time
+        if process.returncode != 0:
+            print(process.stdout[-2000:])
+            print(process.stderr[-2000:])
+            return {"error": f"exit code {process.returncode}", "wall_seconds": round(wall_seconds, 3)}
+        records = read_telemetry(os.path.join(telemetry_dir, "telemetry.jsonl"))
+    return summarize_output(process.stdout, wall_seconds, records)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def run_benchmarks(args):
+    prompts = [prompt for prompt in io.read_input_file(args.prompts) if prompt][:args.num_prompts]
+    engines = [engine for engine in args.engines if engine != "mpi" or mpi_available(args.mpirun)]
+    skipped = sorted(set(args.engines) - set(engines))
+    if skipped:
+        print(f"Skipping unavailable engines: {', '.join(skipped)}")
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "num_prompts": len(prompts),
+        "seed": args.seed,
+        "results": {},
+    }
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as prompts_file:
+        prompts_file.write("\n".join(prompts) + "\n")
+    try:
+        for scenario in args.scenarios:
+            report["results"][scenario] = {"config": SCENARIOS[scenario], "engines": {}}
+            for engine in engines:
+                # Fresh servers per run, so loaded models and queues don't carry over
+                processes, urls = start_mock_servers(SCENARIOS[scenario], MOCK_BACKENDS, args.seed)
+                try:
+                    result = run_engine(engine, ENGINE_WORKERS[engine], prompts_file.name, urls, args.mpirun)
+                finally:
+                    stop_mock_servers(processes)
+                report["results"][scenario]["engines"][engine] = result
+                print(f"{scenario:10s} {engine:10s} {format_result(result)}", flush=True)
+    finally:
+        os.unlink(prompts_file.name)
+    return report
+
+
+def format_result(result):
+    if "error" in result:
+        return f"ERROR ({result['error']})"
+    return (f"{result['throughput']:8.2f} req/s | p50 {result['latency_p50']:.3f}s | "
+            f"p99 {result['latency_p99']:.3f}s | wall {result['wall_seconds']:.2f}s")
+
+
+def compare_reports(old_path, new_path, threshold=REGRESSION_THRESHOLD):
+    """Print per-engine changes between two reports; returns the number of regressions."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"Comparing {old.get('commit') or old_path} -> {new.get('commit') or new_path}")
+    regressions = 0
+    # metric -> True if higher is better
+    metrics = {"throughput": True, "latency_p50": False, "latency_p99": False}
+    for scenario, new_scenario in new["results"].items():
+        old_engines = old["results"].get(scenario, {}).get("engines", {})
+        for engine, new_result in new_scenario["engines"].items():
+            old_result = old_engines.get(engine)
+            if not old_result or "error" in old_result or "error" in new_result:
+                continue
+            for metric, is_higher_better in metrics.items():
+                before, after = old_result[metric], new_result[metric]
+                if before == 0:
+                    continue
+                change = (after - before) / before
+                is_regression = (-change if is_higher_better else change) > threshold
+                regressions += is_regression
+                flag = "  REGRESSION" if is_regression else ""
+                print(f"{scenario:10s} {engine:10s} {metric:12s} {before:8.3f} -> {after:8.3f} ({change * 100:+.1f}%){flag}")
+    print(f"Regressions: {regressions}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every engine against mock Ollama servers.")
+    parser.add_argument("-s", "--scenarios", type=lambda v: v.split(","), default=list(SCENARIOS),
+                        help=f"comma-separated scenarios from {list(SCENARIOS)}")
+    parser.add_argument("-e", "--engines", type=lambda v: v.split(","), default=list(ENGINE_WORKERS),
+                        help=f"comma-separated engines from {list(ENGINE_WORKERS)}")
+    parser.add_argument("-n", "--num-prompts", type=int, default=10, help="number of prompts from the prompt file")
+    parser.add_argument("-p", "--prompts", default=os.path.abspath('data/prompts.txt'))
+    parser.add_argument("-o", "--output", default=None, help="report path (default: results/bench/<commit>_<time>.json)")
+    parser.add_argument("--seed", type=int, default=0, help="mock server seed")
+    parser.add_argument("--mpirun", default="mpirun", help="MPI launcher command, e.g. 'mpirun --oversubscribe'")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="diff two saved reports and exit")
+    args = parser.parse_args(argv)
+    for scenario in args.scenarios:
+        if scenario not in SCENARIOS:
+            parser.error(f"unknown scenario: {scenario}")
+    for engine in args.engines:
+        if engine not in ENGINE_WORKERS:
+            parser.error(f"unknown engine: {engine}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.compare:
+        sys.exit(1 if compare_reports(*args.compare) else 0)
+
+    report = run_benchmarks(args)
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['commit'] or 'bench'}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
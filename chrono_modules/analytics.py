@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+##########################################
+# Scores run results against data/answer_keys.py
+#
+# $ python -m chrono_modules.analytics --journal data/journal [-p data/prompts.txt] [--output report.json]
+##########################################
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+import chrono_modules.io as io
+import chrono_modules.tasks as tasks_module
+from classes.ResultJournal import ResultJournal
+from data.answer_keys import answer_keys
+
+LAYERS = (2, 3)  # Layer axis: index 0 is layer 2 (Generalist), index 1 is layer 3 (roles)
+MISSING = -1  # Verdict array value for tasks that were not run or failed
+
+
+def decision_array(records, models=None, roles=None):
+    """Verdicts of journal-style records as int8 [prompt, model, role, layer]: 1 TRUE, 0 FALSE, -1 missing.
+
+    records are dicts with prompt_id, model, role, layer, agree and decision,
+    from ResultJournal.load() or built in memory. The role axis is
+    [DEFAULT_ROLE] + roles; layer 2 only has DEFAULT_ROLE votes.
+    Returns (verdicts, models, roles).
+    """
+    records = list(records)
+    models = list(models or sorted({r["model"] for r in records}))
+    roles = list(roles or sorted({r["role"] for r in records if r["role"] != tasks_module.DEFAULT_ROLE}))
+    role_axis = [tasks_module.DEFAULT_ROLE] + roles
+    model_index = {model: i for i, model in enumerate(models)}
+    role_index = {role: i for i, role in enumerate(role_axis)}
+    layer_index = {layer: i for i, layer in enumerate(LAYERS)}
+
+    records = [r for r in records if r["decision"] and r["model"] in model_index and r["role"] in role_index]
+    count = len(records)
+    # One pass per column straight into typed arrays, no intermediate tuples
+    prompt_ids = np.fromiter((r["prompt_id"] for r in records), dtype=np.int64, count=count)
+    model_ids = np.fromiter((model_index[r["model"]] for r in records), dtype=np.int64, count=count)
+    role_ids = np.fromiter((role_index[r["role"]] for r in records), dtype=np.int64, count=count)
+    layer_ids = np.fromiter((layer_index[r["layer"]] for r in records), dtype=np.int64, count=count)
+    agrees = np.fromiter((r["agree"] for r in records), dtype=np.int8, count=count)
+
+    n_prompts = int(prompt_ids.max()) + 1 if count else 0
+    verdicts = np.full((n_prompts, len(models), len(role_axis), len(LAYERS)), MISSING, dtype=np.int8)
+    verdicts[prompt_ids, model_ids, role_ids, layer_ids] = agrees
+    return verdicts, models, roles
+
+
+def truth_array(prompts, n_prompts):
+    """Ground truth per prompt id from data/answer_keys.py: 1 TRUE, 0 FALSE, -1 unknown."""
+    truth = np.full(n_prompts, MISSING, dtype=np.int8)
+    for prompt_id, prompt in enumerate(prompts):
+        if prompt_id >= n_prompts:
+            break
+        if prompt in answer_keys:
+            truth[prompt_id] = int(answer_keys[prompt])
+    return truth
+
+
+def confusion_cells(verdicts, truth):
+    """tp/fp/fn/tn counts per [model, role, layer] cell, weighting every prompt by its answer key.
+
+    Each count is one matrix-vector product over the flattened verdicts, so
+    summing a table along any axis afterwards touches only a few hundred cells.
+    """
+    shape = verdicts.shape[1:]
+    flat = verdicts.reshape(len(truth), -1)
+    # float32 counts are exact up to 2**24 prompts per cell
+    dtype = np.float32 if len(truth) < 2 ** 24 else np.float64
+    is_true = (flat == 1).astype(dtype)
+    is_false = (flat == 0).astype(dtype)
+    positive = (truth == 1).astype(dtype)
+    negative = (truth == 0).astype(dtype)
+    return {
+        "tp": (positive @ is_true).reshape(shape),
+        "fp": (negative @ is_true).reshape(shape),
+        "fn": (positive @ is_false).reshape(shape),
+        "tn": (negative @ is_false).reshape(shape),
+    }
+
+
+def confusion(cells, axis):
+    """{tp, fp, fn, tn, accuracy} along one axis of the verdict array (1 = model, 2 = role)."""
+    other_axes = tuple(a - 1 for a in (1, 2, 3) if a != axis)
+    counts = {key: value.sum(axis=other_axes).astype(np.int64) for key, value in cells.items()}
+    total = sum(counts.values())
+    counts["accuracy"] = np.divide(counts["tp"] + counts["tn"], total, out=np.zeros(total.shape), where=total > 0)
+    return counts
+
+
+def model_agreement(verdicts):
+    """Pairwise [model, model] fraction of identical verdicts on the same prompt, role and layer."""
+    n_models = verdicts.shape[1]
+    agreement = np.eye(n_models)
+    for i in range(n_models):
+        for j in range(i + 1, n_models):
+            a, b = verdicts[:, i], verdicts[:, j]
+            both = (a != MISSING) & (b != MISSING)
+            n_both = np.count_nonzero(both)
+            agreement[i, j] = agreement[j, i] = np.count_nonzero((a == b) & both) / n_both if n_both else 0.0
+    return agreement
+
+
+def layer_shift(verdicts, truth):
+    """Per model: how often layer-3 role verdicts differ from the same model's layer-2 verdict.
+
+    Every (prompt, model, role) pair is encoded as layer-2 verdict, layer-3
+    verdict and answer key (3 states each), so one bincount per model gives
+    all of the counts.
+    """
+    n_prompts, n_models = verdicts.shape[:2]
+    layer2 = np.broadcast_to(verdicts[:, :, :1, 0], verdicts[:, :, 1:, 1].shape)  # Generalist, per role
+    layer3 = verdicts[:, :, 1:, 1]
+    states = (layer2 + 1) * 9 + (layer3 + 1) * 3 + (truth.reshape(-1, 1, 1) + 1)
+    model_ids = np.broadcast_to(np.arange(n_models).reshape(1, -1, 1), states.shape)
+    table = np.bincount((model_ids * 27 + states).ravel(), minlength=n_models * 27).reshape(n_models, 3, 3, 3)
+    table = table[:, 1:, 1:, :]  # [model, layer-2 FALSE/TRUE, layer-3 FALSE/TRUE, truth unknown/FALSE/TRUE]
+
+    pairs = table.sum(axis=(1, 2, 3))
+    to_true = table[:, 0, 1, :].sum(axis=1)
+    to_false = table[:, 1, 0, :].sum(axis=1)
+    # Pairs where layer 3 fixed layer 2's verdict and pairs where it broke it
+    fixed = table[:, 0, 1, 2] + table[:, 1, 0, 1]
+    broken = table[:, 1, 0, 2] + table[:, 0, 1, 1]
+    return {
+        "pairs": pairs,
+        "shift_rate": np.divide(to_true + to_false, pairs, out=np.zeros(pairs.shape), where=pairs > 0),
+        "to_true": to_true,
+        "to_false": to_false,
+        "fixed": fixed,
+        "broken": broken,
+    }
+
+
+def majority_accuracy(verdicts, truth):
+    """Accuracy of each prompt's majority verdict (agreement above 50%), the run's final answer."""
+    flat = verdicts.reshape(len(truth), -1)
+    votes = np.count_nonzero(flat != MISSING, axis=1)
+    agrees = np.count_nonzero(flat == 1, axis=1)
+    scored = (votes > 0) & (truth != MISSING)
+    majority = (agrees * 2 > votes).astype(np.int8)
+    return float((majority == truth)[scored].mean()) if scored.any() else 0.0, int(scored.sum())
+
+
+def analyze(records, prompts, models=None, roles=None):
+    """Build the verdict array and every report table; returns a JSON-serializable dict."""
+    start_time = time.perf_counter()
+    verdicts, models, roles = decision_array(records, models, roles)
+    build_time = time.perf_counter() - start_time
+    truth = truth_array(prompts, verdicts.shape[0])
+
+    start_time = time.perf_counter()
+    cells = confusion_cells(verdicts, truth)
+    by_model = confusion(cells, axis=1)
+    by_role = confusion(cells, axis=2)
+    agreement = model_agreement(verdicts)
+    shift = layer_shift(verdicts, truth)
+    majority, majority_prompts = majority_accuracy(verdicts, truth)
+    compute_time = time.perf_counter() - start_time
+
+    tolist = lambda table: {key: value.tolist() for key, value in table.items()}
+    return {
+        "decisions": int((verdicts != MISSING).sum()),
+        "prompts": int(verdicts.shape[0]),
+        "prompts_with_answer_key": int((truth != MISSING).sum()),
+        "models": models,
+        "roles": [tasks_module.DEFAULT_ROLE] + roles,
+        "by_model": tolist(by_model),
+        "by_role": tolist(by_role),
+        "model_agreement": agreement.tolist(),
+        "layer_shift": tolist(shift),
+        "majority_accuracy": majority,
+        "majority_prompts": majority_prompts,
+        "build_ms": build_time * 1000,
+        "compute_ms": compute_time * 1000,
+    }
+
+
+def print_report(report):
+    print(f"Analytics: {report['decisions']} decisions | {report['prompts_with_answer_key']}/{report['prompts']} prompts with an answer key | "
+          f"built in {report['build_ms']:.1f} ms, computed in {report['compute_ms']:.1f} ms")
+    print(f"Majority Verdict Accuracy: {report['majority_accuracy'] * 100:.2f}% ({report['majority_prompts']} prompts)")
+    for label, names, table in (("Model", report["models"], report["by_model"]), ("Role", report["roles"], report["by_role"])):
+        for i, name in enumerate(names):
+            print(
+                f"{label}: {name} | Accuracy: {table['accuracy'][i] * 100:.2f}% | "
+                f"TP: {table['tp'][i]} FP: {table['fp'][i]} FN: {table['fn'][i]} TN: {table['tn'][i]}"
+            )
+    models = report["models"]
+    for i, model in enumerate(models):
+        others = " | ".join(f"{other}: {report['model_agreement'][i][j] * 100:.1f}%" for j, other in enumerate(models) if j != i)
+        print(f"Agreement: {model} vs {others}")
+    shift = report["layer_shift"]
+    for i, model in enumerate(models):
+        print(
+            f"Layer 2 -> 3 Shift: {model} | {shift['shift_rate'][i] * 100:.2f}% of {shift['pairs'][i]} | "
+            f"to TRUE: {shift['to_true'][i]} to FALSE: {shift['to_false'][i]} | fixed: {shift['fixed'][i]} broken: {shift['broken'][i]}"
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Score journaled results against data/answer_keys.py.")
+    parser.add_argument("--journal", default=os.getenv("CHRONO_JOURNAL_DIR", ""), help="journal directory (default: CHRONO_JOURNAL_DIR)")
+    parser.add_argument("-p", "--prompts", default=os.path.abspath('data/prompts.txt'), help="prompt file of the run")
+    parser.add_argument("--output", default=None, help="also write the report as JSON")
+    args = parser.parse_args(argv)
+    if not args.journal:
+        parser.error("--journal or CHRONO_JOURNAL_DIR is required")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = analyze(ResultJournal.load(args.journal).values(), io.iter_prompts(args.prompts))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+import asyncio
+import time
+import chrono_modules.ollama_async as ollama_async
+import chrono_modules.ollama_helper as ollama_helper
+import chrono_modules.tasks as tasks_module
+from classes.PromptPipeline import WAIT
+
+DEFAULT_MAX_INFLIGHT = 256  # Outstanding requests across all models
+MAX_INFLIGHT_PER_MODEL = 64  # Outstanding requests for a single model
+QUEUE_DEPTH = 2  # Queued tasks per in-flight slot
+
+
+async def worker_task(task, session, limiter, quorum, agree_count=-1, decision_count=-1):
+    """Coroutine to process a single task."""
+    prompt_id, model = task[0], task[1]
+    async with limiter.slot(model):
+        # Checked once a slot is free, so prompts decided meanwhile are skipped
+        if quorum.should_skip(prompt_id):
+            return None
+        # Each consumer is its own asyncio task with its own context, so these tags stay with this request
+        ollama_helper.set_request_tags(layer=task[3], role=task[4], worker="event-loop")
+        start_time = time.time()
+        try:
+            response = await ollama_async.query_ollama_async(session, model, tasks_module.render_prompt(task, agree_count, decision_count))
+        except Exception as e:
+            tasks_module.log_task_error(task, e)
+            response = None
+        else:
+            tasks_module.log_task_time(task, start_time, time.time())
+    end_time = time.time()
+    agree, decision = tasks_module.score_response(response)
+    tasks_module.journal_result(task, (prompt_id, agree, decision), start_time, end_time)
+    quorum.record(prompt_id, agree, decision)
+    return tasks_module.make_result(task, agree, decision, start_time, end_time, response)
+
+
+async def run_tasks(tasks, max_inflight, quorum, emit):
+    """Run tasks with max_inflight consumers pulling from a bounded queue, bounded by the in-flight limits."""
+    limiter = ollama_async.InflightLimiter(max_inflight, min(MAX_INFLIGHT_PER_MODEL, max_inflight))
+    task_queue = asyncio.Queue(maxsize=max_inflight * QUEUE_DEPTH)
+    async with ollama_async.create_session(ollama_helper.pool_size()) as session:
+        async def consume():
+            while (task := await task_queue.get()) is not None:
+                result = await worker_task(task, session, limiter, quorum)
+                if result is not None:
+                    emit(result)
+
+        consumers = [asyncio.create_task(consume()) for _ in range(max_inflight)]
+        # Tasks are pulled from the iterable only as queue space frees up
+        for task in tasks:
+            await task_queue.put(task)
+        for _ in consumers:
+            await task_queue.put(None)
+        await asyncio.gather(*consumers)
+
+
+async def run_pipeline(tasks, max_inflight, quorum, emit):
+    """Like run_tasks, but consumers take tasks from a PromptPipeline as their layer-3 counts come in."""
+    limiter = ollama_async.InflightLimiter(max_inflight, min(MAX_INFLIGHT_PER_MODEL, max_inflight))
+    pipeline = tasks_module.make_pipeline(tasks, max_inflight)
+    changed = asyncio.Condition()
+    async with ollama_async.create_session(ollama_helper.pool_size()) as session:
+        async def consume():
+            while True:
+                async with changed:
+                    while (item := pipeline.try_get()) is WAIT:
+                        await changed.wait()
+                if item is None:
+                    return
+                _, task, agree_count, decision_count = item
+                result = None
+                try:
+                    result = await worker_task(task, session, limiter, quorum, agree_count, decision_count)
+                finally:
+                    pipeline.complete(task, result)
+                    async with changed:
+                        changed.notify_all()
+                if result is not None:
+                    emit(result)
+
+        await asyncio.gather(*(consume() for _ in range(max_inflight)))
+
+
+def run_streaming(tasks, args, emit):
+    """Run tasks on one event loop, passing each (prompt_id, agree, decision) to emit."""
+    max_inflight = ollama_helper.concurrency_ceiling(args.workers, DEFAULT_MAX_INFLIGHT)
+    ollama_helper.set_request_slots(max_inflight)
+    ollama_helper.start_concurrency_control(max_inflight)
+    print(f'Max In-flight Requests: {max_inflight} ({min(MAX_INFLIGHT_PER_MODEL, max_inflight)} per model)')
+    quorum = tasks_module.make_quorum(args.models, args.roles)
+    asyncio.run((run_pipeline if tasks_module.is_pipelined() else run_tasks)(tasks, max_inflight, quorum, emit))
+
+    if quorum.is_enabled:
+        quorum.print_summary()
+    tasks_module.print_stats(tasks_module.collect_stats(ollama_async.connection_stats()))
+
+
+def run(tasks, args):
+    """Run tasks on one event loop; returns a ResultStore."""
+    results = tasks_module.make_result_store()
+    run_streaming(tasks, args, results.append)
+    return results
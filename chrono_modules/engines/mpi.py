@@ -0,0 +1,576 @@
+#!/usr/bin/env python
+
+from mpi4py import MPI
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+import itertools
+import threading
+import math
+import time
+import chrono_modules.ollama_helper as ollama_helper
+import chrono_modules.scheduler as scheduler
+import chrono_modules.tasks as tasks_module
+import resources.common as cmn
+from classes.DecisionResult import DecisionResult
+from classes.QuorumTracker import QuorumTracker
+from classes.ResultStore import ResultStore
+
+# Message tags for dynamic scheduling
+TAG_REQUEST = 1  # worker -> coordinator: ready for more work
+TAG_WORK = 2  # coordinator -> worker: [(task_id, task, agree_count, decision_count), ...]
+TAG_RESULT = 3  # worker -> coordinator: (task_id, (prompt_id, agree, decision, seconds, justification))
+TAG_STOP = 4  # coordinator -> worker: no more work
+TAG_CANCEL = 5  # coordinator -> worker: [task_id, ...] another rank already finished
+
+CANCEL_POLL_SECONDS = 0.05  # How often a dynamic worker checks for cancels while its requests run
+
+
+def is_root():
+    return MPI.COMM_WORLD.Get_rank() == 0
+
+
+def chunk_tasks(tasks, size, keep_prompts_together=False):
+    """Split tasks into one contiguous chunk per process.
+
+    With keep_prompts_together, chunk boundaries fall between prompts so that
+    one rank sees every vote of a prompt and can stop it early.
+    """
+    if not keep_prompts_together:
+        chunk_size = len(tasks) // size
+        chunks = [tasks[i * chunk_size:(i + 1) * chunk_size] for i in range(size)]
+
+        # Handle any remaining tasks
+        for i in range(len(tasks) % size):
+            chunks[i].append(tasks[chunk_size * size + i])
+        return chunks
+
+    prompt_groups = {}
+    for task in tasks:
+        prompt_groups.setdefault(task[0], []).append(task)
+    groups = list(prompt_groups.values())
+    chunks = [[] for _ in range(size)]
+    for i, group in enumerate(groups):
+        chunks[i * size // len(groups)].extend(group)
+    return chunks
+
+
+def busy_seconds(intervals):
+    """Length of the union of (start, end) intervals, i.e. time with at least one request in flight."""
+    total = 0.0
+    current_start = current_end = None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+def make_runner(quorum, phase_log):
+    """run_one(task, agree_count, decision_count, cancel) -> (result, (start, end)), or None if quorum skips it.
+
+    cancel is an optional threading.Event: set before the task starts, the task
+    is skipped (None); set with ollama_helper.cancel_requests() while it runs,
+    its request stops at once.
+    """
+    rank = MPI.COMM_WORLD.Get_rank()
+
+    def run_one(task, agree_count=-1, decision_count=-1, cancel=None):
+        if quorum.should_skip(task[0]) or cancel is not None and cancel.is_set():
+            return None
+        ollama_helper.set_request_cancel(cancel)  # Executor threads keep it, so set it for every task
+        with ollama_helper.concurrency_slot():
+            start_time = time.time()
+            result = tasks_module.run_task(task, agree_count, decision_count)
+            end_time = time.time()
+        phase_log.record((rank, threading.get_ident()), task[1], start_time, end_time)
+        quorum.record(*result)
+        return result, (start_time, end_time)
+
+    return run_one
+
+
+def iter_local_results(tasks, quorum, phase_log, executor, counts=None, cancels=None, poll=None):
+    """Run tasks with as many requests in flight as the executor has threads (one without it).
+
+    counts optionally gives each task's (agree_count, decision_count) for its
+    layer-3 prompt, and cancels each task's cancel Event (see make_runner).
+    Yields (index, result, (start, end)) in completion order, from the calling
+    thread, so MPI calls made by the consumer stay on the main thread. With an
+    executor, poll() is also called on the calling thread every
+    CANCEL_POLL_SECONDS while requests run.
+    """
+    run_one = make_runner(quorum, phase_log)
+    counts = counts or [(-1, -1)] * len(tasks)
+    cancels = cancels or [None] * len(tasks)
+    if executor is None:
+        outputs = ((index, run_one(task, *counts[index], cancels[index])) for index, task in enumerate(tasks))
+    else:
+        futures = {executor.submit(run_one, task, *counts[index], cancels[index]): index for index, task in enumerate(tasks)}
+        outputs = iter_completed(futures, poll)
+    for index, output in outputs:
+        if output is not None:
+            yield index, output[0], output[1]
+
+
+def iter_completed(futures, poll=None):
+    """(index, result) of {future: index} in completion order, calling poll() between waits if given."""
+    if poll is None:
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+        return
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+        poll()
+        for future in done:
+            yield futures[future], future.result()
+
+
+def iter_pipeline_results(tasks, quorum, phase_log, executor, concurrency):
+    """Like iter_local_results, but tasks go through a PromptPipeline, so layer-3 prompts get their counts.
+
+    Up to concurrency ready tasks are in flight; each completion may release
+    the next task of its prompt. Yields (task_id, result, (start, end)).
+    """
+    run_one = make_runner(quorum, phase_log)
+    pipeline = tasks_module.make_pipeline(tasks, concurrency)
+    if executor is None:
+        while (item := pipeline.take()) is not None:
+            output = run_one(*item[1:])
+            pipeline.complete(item[1], output and output[0])
+            if output is not None:
+                yield item[0], output[0], output[1]
+        return
+
+    futures = {}
+    while True:
+        while len(futures) < concurrency and (item := pipeline.take()) is not None:
+            futures[executor.submit(run_one, *item[1:])] = item
+        if not futures:
+            break
+        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        for future in done:
+            item = futures.pop(future)
+            output = future.result()
+            pipeline.complete(item[1], output and output[0])
+            if output is not None:
+                yield item[0], output[0], output[1]
+
+
+class TaskFeed:
+    """Numbers tasks from a list or any iterable and hands them out in order, reading ahead by one."""
+    def __init__(self, tasks):
+        self.total = len(tasks) if isinstance(tasks, list) else None
+        self.iterator = enumerate(tasks)
+        self.next_item = next(self.iterator, None)
+        self.issued = 0
+
+    def is_feeding(self):
+        return self.next_item is not None
+
+    def remaining(self):
+        """Tasks not yet handed out, or None when reading from an iterable of unknown length."""
+        return None if self.total is None else self.total - self.issued
+
+    def take(self):
+        """Next (task_id, task, agree_count, decision_count), or None; the same items a PromptPipeline hands out."""
+        if self.next_item is None:
+            return None
+        task_id, task = self.next_item
+        self.next_item = next(self.iterator, None)
+        self.issued += 1
+        return task_id, task, -1, -1
+
+    def complete(self, task, result):
+        pass  # Independent tasks: a result releases nothing
+
+
+class FinishedTaskIds:
+    """Set of finished task ids that forgets the ids below its lowest unfinished one."""
+    def __init__(self):
+        self.low = 0  # Every id below this is finished
+        self.ids = set()
+
+    def add(self, task_id):
+        self.ids.add(task_id)
+        while self.low in self.ids:
+            self.ids.remove(self.low)
+            self.low += 1
+
+    def __contains__(self, task_id):
+        return task_id < self.low or task_id in self.ids
+
+
+def run_local(tasks, quorum, phase_log, executor, emit, chunk_size):
+    """Single-rank run over any iterable, chunk_size tasks at a time; returns busy seconds."""
+    if tasks_module.is_pipelined():
+        intervals = []
+        for _, result, interval in iter_pipeline_results(tasks, quorum, phase_log, executor, chunk_size):
+            intervals.append(interval)
+            emit(result)
+        return busy_seconds(intervals)
+
+    busy_time = 0.0
+    iterator = iter(tasks)
+    while chunk := list(itertools.islice(iterator, chunk_size)):
+        intervals = []
+        for _, result, interval in iter_local_results(chunk, quorum, phase_log, executor):
+            intervals.append(interval)
+            emit(result)
+        # Chunks run one after another, so their busy times add up
+        busy_time += busy_seconds(intervals)
+    return busy_time
+
+
+def run_static(comm, chunks, quorum, phase_log, executor, threads_per_rank):
+    """Scatter chunks once and process this rank's share; returns (ResultStore, busy seconds).
+
+    Each rank's chunk is a list of model phases (one phase without model
+    affinity); ranks wait for each other between phases.
+    """
+    local_phases = comm.scatter(chunks, root=0)
+
+    # Process local tasks, skipping prompts whose verdict is already decided
+    local_results = tasks_module.make_result_store(sum(len(local_tasks) for local_tasks in local_phases))
+    busy_time = 0.0
+    for index, local_tasks in enumerate(local_phases):
+        if index:
+            comm.Barrier()  # Keeps the models in use across ranks within OLLAMA_MAX_LOADED_MODELS
+        intervals = []
+        if tasks_module.is_pipelined():
+            outputs = iter_pipeline_results(local_tasks, quorum, phase_log, executor, threads_per_rank)
+        else:
+            outputs = iter_local_results(local_tasks, quorum, phase_log, executor)
+        for _, result, interval in outputs:
+            local_results.append(result)
+            intervals.append(interval)
+        # Phases run one after another, so their busy times add up
+        busy_time += busy_seconds(intervals)
+    return local_results, busy_time
+
+
+def next_chunk_size(remaining, n_workers, threads_per_rank):
+    """Guided self-scheduling: large chunks while much work remains, single tasks near the end."""
+    # In hybrid mode a chunk should fill every request slot of the rank
+    min_chunk = max(cmn.MPI_MIN_CHUNK, threads_per_rank)
+    if remaining is None:
+        return min_chunk  # Streamed tasks: the total is unknown, so keep chunks small
+    return max(min_chunk, math.ceil(remaining / (cmn.MPI_CHUNK_FACTOR * n_workers)))
+
+
+class CoordinatorState:
+    """Scheduling decisions of the dynamic coordinator, without the MPI calls that carry them out.
+
+    dispatch() decides what a worker asking for work gets; finish() records
+    a reported result and says which rank must drop its copy and which
+    parked workers to retry. feed is a TaskFeed or PromptPipeline.
+    """
+    def __init__(self, feed, quorum, n_workers, threads_per_rank):
+        self.feed = feed
+        self.quorum = quorum
+        self.n_workers = n_workers
+        self.threads_per_rank = threads_per_rank
+        self.outstanding = {}  # {task_id: (item, rank, issue_time)}
+        self.reissued = {}  # {task_id: rank running the re-issued copy} of outstanding tasks
+        self.finished = FinishedTaskIds()
+        self.parked = []  # Workers waiting for the last outstanding tasks to finish
+        self.reissue_count = 0
+        self.cancel_count = 0
+        self.duplicates = 0
+        self.stopped = 0
+
+    def next_chunk(self, source):
+        # Fresh tasks first, skipping prompts whose verdict is already decided
+        chunk = []
+        chunk_size = next_chunk_size(self.feed.remaining(), self.n_workers, self.threads_per_rank)
+        while len(chunk) < chunk_size and (item := self.feed.take()) is not None:
+            if self.quorum.should_skip(item[1][0]):
+                self.finished.add(item[0])
+                self.feed.complete(item[1], None)
+            else:
+                chunk.append(item)
+
+        # Nothing fresh left: re-issue the longest-running straggler task to this idle worker
+        if not chunk and not self.feed.is_feeding():
+            stragglers = [
+                (issue_time, task_id, item)
+                for task_id, (item, owner, issue_time) in self.outstanding.items()
+                if task_id not in self.reissued and owner != source
+            ]
+            if stragglers:
+                _, task_id, item = min(stragglers)
+                self.reissued[task_id] = source
+                self.reissue_count += 1
+                chunk.append(item)
+        return chunk
+
+    def dispatch(self, source):
+        """(TAG_WORK, chunk) or (TAG_STOP, None) to send to source, or None when it is parked."""
+        chunk = self.next_chunk(source)
+        if chunk:
+            now = time.time()
+            for item in chunk:
+                self.outstanding.setdefault(item[0], (item, source, now))
+            return TAG_WORK, chunk
+        if not self.outstanding and not self.feed.is_feeding():
+            self.stopped += 1
+            return TAG_STOP, None
+        self.parked.append(source)
+        return None
+
+    def finish(self, source, task_id, result):
+        """Record source's result for task_id; returns (is_new, rank to cancel or None, parked workers to retry)."""
+        if task_id in self.finished:
+            self.duplicates += 1  # The re-issued copy lost the race
+            return False, None, []
+        self.finished.add(task_id)
+        item, owner = self.outstanding.pop(task_id)[:2]
+        loser = None
+        copy_owner = self.reissued.pop(task_id, None)
+        if copy_owner is not None:
+            loser = owner if source == copy_owner else copy_owner
+            self.cancel_count += 1
+        self.quorum.record(*result)
+        self.feed.complete(item[1], result)
+        # The result may have released tasks (or ended the run)
+        waiting, self.parked = self.parked, []
+        return True, loser, waiting
+
+    def is_running(self):
+        return self.stopped < self.n_workers
+
+    def stats(self):
+        return {"reissued": self.reissue_count, "cancelled": self.cancel_count, "duplicates": self.duplicates}
+
+
+def run_coordinator(comm, tasks, quorum, threads_per_rank, emit):
+    """Hand out task chunks on request and pass streamed results to emit; returns re-issue stats.
+
+    tasks may be a list or any iterable; it is only read as chunks are handed out.
+    With layer-3 feedback the tasks come from a PromptPipeline: a worker that
+    finds nothing ready is parked until a result releases more, and stragglers
+    are only re-issued once every task has been handed out. When either copy
+    of a re-issued task finishes, the rank running the other one gets a
+    TAG_CANCEL and drops it, so the slower copy no longer holds up the run.
+    The decisions are CoordinatorState's; this loop only does the messaging.
+    """
+    n_workers = comm.Get_size() - 1
+    if tasks_module.is_pipelined():
+        feed = tasks_module.make_pipeline(tasks, n_workers * threads_per_rank)
+    else:
+        feed = TaskFeed(tasks)
+    state = CoordinatorState(feed, quorum, n_workers, threads_per_rank)
+    cancels = []  # isend requests of TAG_CANCEL messages
+    status = MPI.Status()
+
+    def dispatch(worker):
+        action = state.dispatch(worker)
+        if action is not None:
+            tag, chunk = action
+            comm.send(chunk, dest=worker, tag=tag)
+
+    while state.is_running():
+        message = comm.recv(source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG, status=status)
+        source = status.Get_source()
+
+        if status.Get_tag() == TAG_RESULT:
+            task_id, fields = message
+            result = DecisionResult(*fields)
+            is_new, loser, waiting = state.finish(source, task_id, result)
+            if not is_new:
+                continue
+            if loser is not None:
+                # Stop the losing copy; the worker receives this before any later STOP
+                cancels.append(comm.isend([task_id], dest=loser, tag=TAG_CANCEL))
+            emit(result)
+            for worker in waiting:
+                dispatch(worker)
+            continue
+
+        # TAG_REQUEST
+        dispatch(source)
+
+    MPI.Request.Waitall(cancels)
+    return state.stats()
+
+
+def run_worker(comm, phase_log, executor):
+    """Request chunks from the coordinator and stream results back; returns busy seconds.
+
+    Tasks the coordinator cancels (another rank finished them first) are
+    skipped if not started, stopped if running, and never reported.
+    """
+    # The coordinator applies quorum itself, so workers run every task they are given
+    no_quorum = QuorumTracker(0, mode="off")
+    busy_time = 0.0
+    sends = []
+    status = MPI.Status()
+    cancels = {}  # {task_id: threading.Event} of the current chunk
+
+    def cancel(task_ids):
+        for task_id in task_ids:
+            if task_id in cancels:
+                ollama_helper.cancel_requests(cancels[task_id])
+
+    def receive_cancels():
+        while comm.Iprobe(source=0, tag=TAG_CANCEL):
+            cancel(comm.recv(source=0, tag=TAG_CANCEL))
+
+    while True:
+        comm.send(None, dest=0, tag=TAG_REQUEST)
+        chunk = comm.recv(source=0, tag=MPI.ANY_TAG, status=status)
+        while status.Get_tag() == TAG_CANCEL:
+            chunk = comm.recv(source=0, tag=MPI.ANY_TAG, status=status)  # Its task already finished here
+        if status.Get_tag() == TAG_STOP:
+            break
+        chunk_tasks = [item[1] for item in chunk]
+        counts = [item[2:] for item in chunk]
+        cancels = {item[0]: threading.Event() for item in chunk}
+        events = [cancels[item[0]] for item in chunk]
+        intervals = []
+        for index, result, interval in iter_local_results(
+                chunk_tasks, no_quorum, phase_log, executor, counts, events, receive_cancels):
+            intervals.append(interval)
+            if events[index].is_set():
+                continue  # Another rank reported it first
+            # A plain tuple pickles smaller than the DecisionResult (no class reference per message)
+            fields = (result.prompt_id, result.agree, result.decision, result.seconds, result.justification)
+            sends.append(comm.isend((chunk[index][0], fields), dest=0, tag=TAG_RESULT))
+        busy_time += busy_seconds(intervals)
+        sends = [request for request in sends if not request.Test()]
+    MPI.Request.Waitall(sends)
+    return busy_time
+
+
+def print_rank_utilization(busy_times, wall_time, is_dynamic):
+    for rank, busy_time in enumerate(busy_times):
+        if is_dynamic and rank == 0:
+            print(f"Rank: 0 | Coordinator")
+            continue
+        idle_time = max(wall_time - busy_time, 0)
+        idle_pct = idle_time / wall_time * 100 if wall_time > 0 else 0
+        print(f"Rank: {rank} | Busy: {busy_time:.2f} seconds | Idle: {idle_time:.2f} seconds ({idle_pct:.2f}%)")
+
+
+def run_streaming(tasks, args, emit):
+    """Run tasks across MPI ranks, passing each (prompt_id, agree, decision) to emit on rank 0.
+
+    Only rank 0 reads tasks. Static scheduling scatters one full list, so when
+    tasks is any other iterable the run switches to dynamic scheduling (or, on
+    a single rank, to a chunked local loop) and tasks are read as they are handed out.
+    """
+    gathered = run_ranks(tasks, args, emit)
+    if gathered is not None:
+        for result in gathered.results():
+            emit(result)
+
+
+def run_ranks(tasks, args, emit):
+    """run_streaming() without its last step: returns the ranks' static results as one ResultStore on rank 0.
+
+    Results of the dynamic and local modes go to emit as they arrive; static
+    ones are gathered at the end, and are left to the caller so they need not
+    be re-emitted row by row. Returns None on the other ranks.
+    """
+    comm = MPI.COMM_WORLD
+    rank = comm.Get_rank()
+    size = comm.Get_size()
+    is_list = comm.bcast(isinstance(tasks, list), root=0)
+    is_dynamic = size > 1 and (cmn.MPI_SCHEDULE == "dynamic" or not is_list)
+    threads_per_rank = ollama_helper.concurrency_ceiling(args.workers, cmn.MPI_THREADS_PER_RANK)
+    ollama_helper.set_request_slots(threads_per_rank)
+    if not is_dynamic and is_list and tasks_module.is_pipelined():
+        # Every rank pipelines its own prompts, so each needs the root's --resume counts
+        tasks_module.set_resumed_counts(comm.bcast(tasks_module.get_resumed_counts(), root=0))
+
+    # Divide tasks into chunks for processes
+    chunks = None
+    planned_swaps = None
+    if rank == 0 and not is_dynamic and is_list:
+        if cmn.IS_MODEL_AFFINITY and not tasks_module.is_pipelined():
+            phases = scheduler.plan_model_phases(tasks, size, cmn.MAX_LOADED_MODELS)
+            planned_swaps = scheduler.count_planned_swaps(phases)
+        else:
+            if cmn.IS_MODEL_AFFINITY:
+                print(f"Warning: CHRONO_MODEL_AFFINITY is ignored with CHRONO_FEEDBACK={cmn.FEEDBACK_MODE}; set CHRONO_FEEDBACK=off to use it")
+            # A prompt's layer-3 tasks need its other results, so feedback also keeps prompts on one rank
+            keep_prompts_together = cmn.QUORUM_MODE in ("quorum", "shadow") or tasks_module.is_pipelined()
+            phases = [chunk_tasks(tasks, size, keep_prompts_together=keep_prompts_together)]
+        chunks = [[phase[r] for phase in phases] for r in range(size)]
+
+    quorum = tasks_module.make_quorum(args.models, args.roles)
+    phase_log = scheduler.ModelPhaseLog()
+    ollama_helper.set_default_tags(rank=rank)
+
+    # Hybrid mode: several requests in flight per rank, optionally one backend share per rank
+    if cmn.IS_MPI_SPREAD_BACKENDS:
+        ollama_helper.restrict_backends(rank, size)
+    # Dynamic workers always run requests on an executor, so the main thread can receive cancels meanwhile
+    if threads_per_rank > 1 or is_dynamic and rank != 0:
+        executor = ThreadPoolExecutor(max_workers=threads_per_rank)
+    else:
+        executor = None
+    if not (is_dynamic and rank == 0):
+        # Each rank adapts its own requests in flight; together they back off when the shared servers queue
+        ollama_helper.start_concurrency_control(threads_per_rank)
+
+    comm.Barrier()
+    run_start = time.time()
+    local_results = tasks_module.make_result_store(1)  # Static scheduling only; the other modes emit as they go
+    if is_dynamic and rank == 0:
+        reissue_stats = run_coordinator(comm, tasks, quorum, threads_per_rank, emit)
+        busy_time = 0.0
+    elif is_dynamic:
+        busy_time = run_worker(comm, phase_log, executor)
+    elif not is_list:
+        busy_time = run_local(tasks, quorum, phase_log, executor, emit, max(cmn.MPI_MIN_CHUNK, threads_per_rank))
+    else:
+        local_results, busy_time = run_static(comm, chunks, quorum, phase_log, executor, threads_per_rank)
+    if executor:
+        executor.shutdown()
+    journal = tasks_module.get_journal()
+    if journal:
+        journal.flush()  # The gathers below order this before the root reads the journals
+
+    # Gather results (one compact ResultStore per rank) and counters at root
+    all_results = comm.gather(local_results, root=0)
+    all_stats = comm.gather(tasks_module.collect_stats(), root=0)
+    all_quorum_summaries = comm.gather(quorum.summary(), root=0)
+    all_phase_summaries = comm.gather(phase_log.summary(), root=0)
+    all_busy_times = comm.gather(busy_time, root=0)
+    if rank != 0:
+        return None
+
+    wall_time = time.time() - run_start
+    print(f"MPI Schedule: {'dynamic' if is_dynamic else 'static'} | Ranks: {size} | Requests in Flight per Rank: {threads_per_rank}")
+    print_rank_utilization(all_busy_times, wall_time, is_dynamic)
+    if is_dynamic:
+        print(
+            f"Re-issued Tasks: {reissue_stats['reissued']} | Cancelled Copies: {reissue_stats['cancelled']} | "
+            f"Discarded Duplicate Results: {reissue_stats['duplicates']}"
+        )
+    if quorum.is_enabled:
+        quorum.print_summary(QuorumTracker.merge_summaries(all_quorum_summaries))
+    tasks_module.print_stats(tasks_module.merge_stats(all_stats))
+    if planned_swaps is not None:
+        # Only model-affinity runs plan phases, and only they have swaps worth reporting
+        scheduler.ModelPhaseLog.print_summary(scheduler.ModelPhaseLog.merge_summaries(all_phase_summaries), planned_swaps)
+    return ResultStore.concatenate(all_results, tasks_module.get_arena())
+
+
+def run(tasks, args):
+    """Run tasks across MPI ranks; returns a ResultStore on rank 0 and None elsewhere.
+
+    Only rank 0's tasks are read: the other ranks get their share scattered or
+    handed out, so they can pass an empty list.
+    """
+    results = tasks_module.make_result_store()
+    gathered = run_ranks(tasks, args, results.append)
+    if gathered is None:
+        return None
+    # Only static scheduling gathers results, and only the other modes stream them
+    return gathered if len(gathered) else results
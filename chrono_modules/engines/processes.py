@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED, FIRST_EXCEPTION
+from multiprocessing import shared_memory
+import glob
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import chrono_modules.ollama_helper as ollama_helper
+import chrono_modules.tasks as tasks_module
+import resources.common as cmn
+from classes.ResultStore import ResultStore, NOT_RUN, FAILED, TRUE
+from classes.TokenMetricTracker import TokenMetricsTracker
+
+DEFAULT_WORKERS = os.cpu_count() or 1  # Number of worker processes
+PROGRESS_INTERVAL = 10  # seconds between live progress reads in the parent
+
+# Shared result columns: an int8 verdict code per task, then a float32 task time
+# per task. Task i owns row i, so workers write without locks and nothing is
+# pickled back to the parent; rows are in build_tasks() order.
+CODE_BYTES, SECONDS_BYTES = 1, 4
+
+# Set in each worker process by attach_counters()
+counters = None
+counters_shm = None
+
+
+def shared_columns(buffer, n_tasks):
+    """(codes, seconds) NumPy views of the shared block."""
+    seconds_offset = -(-n_tasks * CODE_BYTES // SECONDS_BYTES) * SECONDS_BYTES  # float32-aligned
+    codes = np.ndarray((n_tasks,), dtype=np.int8, buffer=buffer)
+    seconds = np.ndarray((n_tasks,), dtype=np.float32, buffer=buffer, offset=seconds_offset)
+    return codes, seconds
+
+
+def shared_size(n_tasks):
+    return max(-(-n_tasks * CODE_BYTES // SECONDS_BYTES) * SECONDS_BYTES + n_tasks * SECONDS_BYTES, 1)
+
+
+def attach_counters(shm_name, n_tasks, telemetry_dir):
+    """Pool initializer: map the parent's shared result columns into this worker and point its telemetry at telemetry_dir."""
+    global counters, counters_shm
+    counters_shm = shared_memory.SharedMemory(name=shm_name)
+    counters = shared_columns(counters_shm.buf, n_tasks)
+    ollama_helper.set_telemetry_dir(telemetry_dir)
+
+
+def worker_task(task_index, task, agree_count=-1, decision_count=-1):
+    """Worker process: run one task (layer-3 tasks with their prompt's counts) and write its outcome into its shared row.
+
+    Only the task's text, when kept, travels back through the future; the
+    worker's telemetry goes to its own file in the run's telemetry directory.
+    """
+    codes, seconds = counters
+    result = None
+    try:
+        result = tasks_module.run_task(task, agree_count, decision_count)
+        codes[task_index] = result.decision + result.agree if result.decision else FAILED
+        seconds[task_index] = result.seconds
+    finally:
+        if codes[task_index] == NOT_RUN:
+            codes[task_index] = FAILED
+    return result.justification if result else None
+
+
+def run_pipelined(executor, tasks, n_workers, codes):
+    """Submit tasks as a PromptPipeline releases them (CHRONO_FEEDBACK); returns the outputs in task order.
+
+    The parent keeps n_workers tasks in flight and reads each finished task's
+    verdict from its shared row to release the next tasks of its prompt, so
+    layer-3 prompts carry the same counts as in the serial engine.
+    """
+    pipeline = tasks_module.make_pipeline(tasks, n_workers)
+    outputs = [None] * len(tasks)
+    futures = {}
+    last_progress = time.time()
+    while True:
+        while len(futures) < n_workers and (item := pipeline.take()) is not None:
+            futures[executor.submit(worker_task, *item)] = item
+        if not futures:
+            break
+        done, _ = wait(futures, timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+        for future in done:
+            task_index, task = futures.pop(future)[:2]
+            outputs[task_index] = future.result()
+            code = int(codes[task_index])
+            pipeline.complete(task, (task[0], int(code == TRUE), int(code != FAILED)))
+        if time.time() - last_progress >= PROGRESS_INTERVAL:
+            print(f"Progress: {np.count_nonzero(codes != NOT_RUN)}/{len(tasks)} tasks")
+            last_progress = time.time()
+    print(f"Progress: {np.count_nonzero(codes != NOT_RUN)}/{len(tasks)} tasks")
+    return outputs
+
+
+def run(tasks, args):
+    """Run tasks on a process pool with shared-memory results; returns a ResultStore."""
+    n_workers = args.workers or DEFAULT_WORKERS
+    print(f'Number of Processes: {n_workers}')
+
+    n_tasks = len(tasks)
+    shm = shared_memory.SharedMemory(create=True, size=shared_size(n_tasks))
+    codes, seconds = shared_columns(shm.buf, n_tasks)
+    # Workers write their telemetry here; the parent reads it once they have exited
+    if cmn.TELEMETRY_DIR:
+        os.makedirs(cmn.TELEMETRY_DIR, exist_ok=True)
+    telemetry_dir = tempfile.mkdtemp(prefix="workers-", dir=cmn.TELEMETRY_DIR or None)
+    try:
+        codes[:] = NOT_RUN
+        seconds[:] = np.nan
+
+        initargs = (shm.name, n_tasks, telemetry_dir)
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=attach_counters, initargs=initargs) as executor:
+            if tasks_module.is_pipelined():
+                outputs = run_pipelined(executor, tasks, n_workers, codes)
+            else:
+                futures = [executor.submit(worker_task, task_index, task) for task_index, task in enumerate(tasks)]
+                not_done = futures
+                while not_done:
+                    _, not_done = wait(not_done, timeout=PROGRESS_INTERVAL, return_when=FIRST_EXCEPTION)
+                    # Live progress straight from shared memory, no messages from the workers
+                    print(f"Progress: {np.count_nonzero(codes != NOT_RUN)}/{n_tasks} tasks")
+                outputs = [future.result() for future in futures]
+        # Leaving the pool joined the workers, whose exit flushed their last records
+        tasks_module.print_telemetry(TokenMetricsTracker.summarize_files(
+            sorted(glob.glob(os.path.join(telemetry_dir, "telemetry-*.jsonl"))), cmn.COLD_LOAD_SECONDS,
+        ))
+
+        prompt_ids = np.fromiter((task[0] for task in tasks), dtype=np.int32, count=n_tasks)
+        results = ResultStore.from_columns(prompt_ids, codes, seconds, tasks_module.get_arena())
+        for task_index, justification in enumerate(outputs):
+            results.set_justification(task_index, justification)
+        return results
+    finally:
+        # The NumPy views must go before the block can be closed
+        del codes, seconds
+        shm.close()
+        shm.unlink()
+        shutil.rmtree(telemetry_dir, ignore_errors=True)
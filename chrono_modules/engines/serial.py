@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+
+import chrono_modules.tasks as tasks_module
+
+
+def run_streaming(tasks, args, emit):
+    """Run every task one after another, passing each (prompt_id, agree, decision) to emit."""
+    quorum = tasks_module.make_quorum(args.models, args.roles)
+    current_prompt_id, counts = None, [0, 0]  # Running [agree, decision] fed into layer-3 prompts
+    for task in tasks:
+        prompt_id = task[0]
+        if quorum.should_skip(prompt_id):
+            continue
+        if prompt_id != current_prompt_id:
+            # Tasks arrive prompt by prompt, so only the current prompt's counts are kept
+            tasks_module.get_resumed_counts().pop(current_prompt_id, None)
+            current_prompt_id, counts = prompt_id, [0, 0]
+        # Results of the prompt's tasks skipped on --resume count as if they had run here
+        resumed_agree, resumed_decision = tasks_module.resumed_count(prompt_id)
+        result = tasks_module.run_task(
+            task, agree_count=counts[0] + resumed_agree, decision_count=counts[1] + resumed_decision,
+        )
+        counts[0] += result.agree
+        counts[1] += result.decision
+        quorum.record(*result)
+        emit(result)
+
+    if quorum.is_enabled:
+        quorum.print_summary()
+    tasks_module.print_stats(tasks_module.collect_stats())
+
+
+def run(tasks, args):
+    """Run every task one after another; returns a ResultStore."""
+    results = tasks_module.make_result_store()
+    run_streaming(tasks, args, results.append)
+    return results
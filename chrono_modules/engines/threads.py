@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+import time
+import chrono_modules.ollama_helper as ollama_helper
+import chrono_modules.scheduler as scheduler
+import chrono_modules.tasks as tasks_module
+import resources.common as cmn
+
+DEFAULT_WORKERS = 1  # Number of threads
+QUEUE_DEPTH = 4  # Queued tasks per thread between the producer and the workers
+
+
+def run_streaming(tasks, args, emit):
+    """Run tasks on a thread pool, passing each (prompt_id, agree, decision) to emit.
+
+    Threads pull from a bounded queue fed from the tasks iterable, so tasks are
+    only built as fast as they are run. With layer-3 feedback (CHRONO_FEEDBACK)
+    they pull from a PromptPipeline instead, which holds each layer-3 task back
+    until the counts its prompt needs are in. Model affinity needs the whole
+    task list up front and feedback off.
+    """
+    n_workers = ollama_helper.concurrency_ceiling(args.workers, DEFAULT_WORKERS)
+    print(f'Number of Threads: {n_workers}')
+    ollama_helper.set_request_slots(n_workers)
+    # Adaptive mode: the threads are a ceiling and the controller decides how many run a request at once
+    ollama_helper.start_concurrency_control(n_workers)
+    quorum = tasks_module.make_quorum(args.models, args.roles)
+    phase_log = scheduler.ModelPhaseLog()
+
+    def run_one(task, worker_id, agree_count=-1, decision_count=-1):
+        if quorum.should_skip(task[0]):
+            return None
+        with ollama_helper.concurrency_slot():
+            start_time = time.time()
+            result = tasks_module.run_task(task, agree_count, decision_count)
+        phase_log.record(worker_id, task[1], start_time, time.time())
+        quorum.record(*result)
+        emit(result)
+        return result
+
+    if cmn.IS_MODEL_AFFINITY and tasks_module.is_pipelined():
+        print(f"Warning: CHRONO_MODEL_AFFINITY is ignored with CHRONO_FEEDBACK={cmn.FEEDBACK_MODE}; set CHRONO_FEEDBACK=off to use it")
+
+    planned_swaps = None
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        if tasks_module.is_pipelined():
+            pipeline = tasks_module.make_pipeline(tasks, n_workers)
+
+            def worker(worker_id):
+                while (item := pipeline.get()) is not None:
+                    _, task, agree_count, decision_count = item
+                    result = None
+                    try:
+                        result = run_one(task, worker_id, agree_count, decision_count)
+                    finally:
+                        # Always complete, or the prompt's later tasks would wait forever
+                        pipeline.complete(task, result)
+
+            list(executor.map(worker, range(n_workers)))
+        elif cmn.IS_MODEL_AFFINITY:
+            # Assign tasks to threads, in phases of at most MAX_LOADED_MODELS models
+            phases = scheduler.plan_model_phases(list(tasks), n_workers, cmn.MAX_LOADED_MODELS)
+            planned_swaps = scheduler.count_planned_swaps(phases)
+            # No thread starts a phase's models until every thread has finished the previous phase
+            barrier = threading.Barrier(n_workers)
+
+            def worker(worker_id):
+                try:
+                    for index, phase in enumerate(phases):
+                        if index:
+                            barrier.wait()
+                        for task in phase[worker_id]:
+                            run_one(task, worker_id)
+                except BaseException:
+                    barrier.abort()  # Release the other threads instead of leaving them waiting
+                    raise
+
+            list(executor.map(worker, range(n_workers)))
+        else:
+            task_queue = queue.Queue(maxsize=n_workers * QUEUE_DEPTH)
+
+            def worker(worker_id):
+                while (task := task_queue.get()) is not None:
+                    run_one(task, worker_id)
+
+            futures = [executor.submit(worker, worker_id) for worker_id in range(n_workers)]
+            try:
+                for task in tasks:
+                    task_queue.put(task)
+            finally:
+                for _ in range(n_workers):
+                    task_queue.put(None)
+            for future in futures:
+                future.result()
+
+    if planned_swaps is not None:
+        # Only model-affinity runs plan phases, and only they have swaps worth reporting
+        scheduler.ModelPhaseLog.print_summary(phase_log.summary(), planned_swaps)
+    if quorum.is_enabled:
+        quorum.print_summary()
+    tasks_module.print_stats(tasks_module.collect_stats())
+
+
+def run(tasks, args):
+    """Run tasks on a thread pool; returns a ResultStore."""
+    results = tasks_module.make_result_store()
+    run_streaming(tasks, args, results.append)
+    return results
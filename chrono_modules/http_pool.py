@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+##########################################
+# Keep-alive requests session whose urllib3 pools count the sockets they open
+#
+# Imported on first use by ollama_helper.get_session(), so importing
+# ollama_helper (every engine, analytics, the benchmarks) does not import
+# requests and urllib3.
+##########################################
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+_on_new_connection = None  # Called for every new socket; set by make_session()
+
+
+def _count_new_connection():
+    if _on_new_connection is not None:
+        _on_new_connection()
+
+
+class CountingHTTPConnectionPool(HTTPConnectionPool):
+    """HTTP connection pool that counts every socket it opens."""
+    def _new_conn(self):
+        _count_new_connection()
+        return super()._new_conn()
+
+
+class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    """HTTPS connection pool that counts every socket it opens."""
+    def _new_conn(self):
+        _count_new_connection()
+        return super()._new_conn()
+
+
+class PooledAdapter(HTTPAdapter):
+    """Keep-alive adapter whose pools report new connections."""
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+
+
+def make_session(pool_connections, pool_maxsize, on_new_connection=None):
+    """Session with a PooledAdapter mounted for http and https."""
+    global _on_new_connection
+    _on_new_connection = on_new_connection
+    session = requests.Session()
+    adapter = PooledAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
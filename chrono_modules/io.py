@@ -4,6 +4,24 @@ import json
 def read_input_file(path):
     with open(path) as f:
         return [x.strip() for x in f.read().split('\n')]
+
+
+def iter_prompts(path):
+    """Yield the non-empty prompts of a file one at a time.
+
+    Plain files hold one prompt per line; .jsonl files hold one {"prompt": ...} object per line.
+    """
+    is_jsonl = path.endswith(".jsonl")
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if is_jsonl:
+                line = json.loads(line)["prompt"].strip()
+                if not line:
+                    continue
+            yield line
     
     
 def write_result_to_file(dict_result, filename='data', ):
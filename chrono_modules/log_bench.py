@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+##########################################
+# Microbenchmark of per-task logging cost on the calling threads
+#
+# $ python -m chrono_modules.log_bench [--threads 8] [--records 5000] [--repeat 3]
+#
+# Each variant logs the same task-time line from several threads at once.
+# Console output goes to os.devnull, and the callers' thread CPU time is
+# measured, so work moved to the listener thread is not charged to them.
+##########################################
+
+import argparse
+import contextlib
+import logging
+import os
+import tempfile
+import threading
+import time
+import resources.chrono_logging as chrono_logging
+
+TASK = (0, "llama3", "Is the sky blue?", 3, "Engineer")
+
+
+def log_print(stream):
+    """The original: an f-string printed on the calling thread."""
+    def emit(task, seconds):
+        _, model, _, layer, role = task
+        print(f"Task: {model}-{role} | Layer: {layer} | Time: {seconds:.2f} seconds", file=stream)
+    return emit
+
+
+def log_with(logger):
+    """A logger call with a level check first and structured fields."""
+    def emit(task, seconds):
+        if logger.isEnabledFor(logging.INFO):
+            prompt_id, model, _, layer, role = task
+            logger.info(
+                "Task: %s-%s | Layer: %s | Time: %.2f seconds", model, role, layer, seconds,
+                extra={"fields": {"prompt_id": prompt_id, "model": model, "role": role, "layer": layer, "seconds": seconds}},
+            )
+    return emit
+
+
+def log_queued(task_log):
+    """tasks.log_task_time's call: TaskLog.info() queues a tuple for the listener thread."""
+    def emit(task, seconds):
+        if task_log.is_info:
+            prompt_id, model, _, layer, role = task
+            task_log.info(
+                "Task: %s-%s | Layer: %s | Time: %.2f seconds", model, role, layer, seconds,
+                prompt_id=prompt_id, model=model, role=role, layer=layer, seconds=seconds,
+            )
+    return emit
+
+
+def sync_json_logger(stream):
+    """A JsonFormatter StreamHandler on the calling thread, like get_json_logger()."""
+    logger = logging.getLogger("log_bench.sync")
+    logger.handlers.clear()
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(chrono_logging.JsonFormatter())
+    logger.addHandler(handler)
+    return logger
+
+
+def time_threads(emit, n_threads, records):
+    """CPU seconds the calling threads spent inside emit, summed (time waiting for the GIL is not counted)."""
+    totals = [0.0] * n_threads
+    barrier = threading.Barrier(n_threads)
+
+    def worker(index):
+        barrier.wait()
+        start_time = time.thread_time()
+        for i in range(records):
+            emit(TASK, i * 1e-3)
+        totals[index] = time.thread_time() - start_time
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(totals)
+
+
+def run(n_threads, records, repeat):
+    """Best-of-repeat caller seconds per record and drain seconds for each variant; returns [(name, seconds, drain)]."""
+    results = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), tempfile.TemporaryDirectory() as directory:
+        sync_logger = sync_json_logger(devnull)
+        variants = [
+            ("print", lambda: (log_print(devnull), None)),
+            ("json handler (sync)", lambda: (log_with(sync_logger), None)),
+            ("queue handler: console", lambda: _queue_handler()),
+            ("TaskLog: console", lambda: _queued("console", "")),
+            ("TaskLog: summary + jsonl", lambda: _queued("summary", directory)),
+            ("TaskLog: summary", lambda: _queued("summary", "")),
+            ("TaskLog: off", lambda: _queued("off", "")),
+        ]
+        for name, make in variants:
+            best, best_drain = float("inf"), 0.0
+            for _ in range(repeat):
+                emit, task_log = make()
+                seconds = time_threads(emit, n_threads, records)
+                drain_start = time.perf_counter()
+                if task_log is not None:
+                    task_log.close()
+                drain = time.perf_counter() - drain_start
+                if seconds < best:
+                    best, best_drain = seconds, drain
+            results.append((name, best / (n_threads * records), best_drain))
+    return results
+
+
+def _queued(mode, directory):
+    task_log = chrono_logging.TaskLog(mode, directory)
+    return log_queued(task_log), task_log
+
+
+def _queue_handler():
+    """A stock QueueHandler logger call on the same listener (the record is built and formatted by the caller)."""
+    task_log = chrono_logging.TaskLog("console")
+    task_log.logger.setLevel(logging.INFO)
+    return log_with(task_log.logger), task_log
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure per-task logging cost on the calling threads.")
+    parser.add_argument("--threads", type=int, default=8, help="threads logging at once")
+    parser.add_argument("--records", type=int, default=5000, help="records per thread per timing")
+    parser.add_argument("--repeat", type=int, default=3, help="timings per variant (best is reported)")
+    args = parser.parse_args(argv)
+
+    print(f"Log Benchmark: {args.threads} threads x {args.records} records")
+    results = run(args.threads, args.records, args.repeat)
+    baseline = results[0][1]
+    for name, seconds, drain in results:
+        print(f"Log: {name:24s} | {seconds * 1e6:7.2f} us/record on the caller | {baseline / seconds:6.1f}x | listener drain {drain * 1e3:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+##########################################
+# Local stand-in for the Ollama /api/generate endpoint, for offline benchmarks
+#
+# $ python -m chrono_modules.mock_ollama --port 11500 --ttft 0.05 --token-delay 0.01
+##########################################
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DEFAULT_CONFIG = {
+    "ttft": 0.05,  # seconds before the first token (prompt evaluation)
+    "token_delay": 0.01,  # seconds per generated token
+    "jitter": 0.0,  # spread of the latency distribution (fraction of the mean)
+    "distribution": "fixed",  # fixed | uniform | lognormal
+    "tokens": 30,  # generated tokens per response, capped by options.num_predict
+    "num_parallel": 4,  # requests decoded at once, like OLLAMA_NUM_PARALLEL; others queue
+    "max_loaded_models": 3,  # like OLLAMA_MAX_LOADED_MODELS
+    "swap_penalty": 0.0,  # seconds to load a model that is not resident
+    "error_rate": 0.0,  # fraction of requests answered with HTTP 500
+    "stall_rate": 0.0,  # fraction of streams that hang after their first token, like a stuck generation
+    "stall_seconds": 60.0,  # how long a stalled stream hangs before finishing
+    "seed": 0,
+}
+
+
+class MockOllamaServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the mock's configuration and model state."""
+    daemon_threads = True
+
+    def __init__(self, address, config):
+        super().__init__(address, MockOllamaHandler)
+        self.config = dict(DEFAULT_CONFIG, **config)
+        self.slots = threading.Semaphore(self.config["num_parallel"])
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+        self.loaded_models = OrderedDict()  # LRU of resident models
+        self.request_count = 0
+        self.swap_count = 0
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def next_rng(self):
+        """Per-request RNG derived from the seed and arrival order, so runs are reproducible."""
+        with self.lock:
+            self.request_count += 1
+            return random.Random(self.config["seed"] * 1_000_003 + self.request_count)
+
+    def sample(self, rng, mean):
+        jitter = self.config["jitter"]
+        if mean <= 0 or jitter <= 0:
+            return max(mean, 0.0)
+        if self.config["distribution"] == "uniform":
+            return max(0.0, rng.uniform(mean * (1 - jitter), mean * (1 + jitter)))
+        if self.config["distribution"] == "lognormal":
+            # Lognormal with the requested mean, i.e. a long right tail
+            sigma = math.sqrt(math.log(1 + jitter ** 2))
+            return rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+        return mean
+
+    def ensure_loaded(self, model):
+        """Load model if needed; returns the load time in seconds."""
+        with self.load_lock:
+            if model in self.loaded_models:
+                self.loaded_models.move_to_end(model)
+                return 0.0
+            while len(self.loaded_models) >= self.config["max_loaded_models"]:
+                self.loaded_models.popitem(last=False)
+            penalty = self.config["swap_penalty"]
+            # Loading holds the lock, like a single GPU swapping weights
+            time.sleep(penalty)
+            self.loaded_models[model] = time.time()
+            self.swap_count += 1
+            return penalty
+
+    def unload(self, model):
+        with self.load_lock:
+            self.loaded_models.pop(model, None)
+
+
+def mock_verdict(model, prompt):
+    """Deterministic TRUE/FALSE per (model, prompt)."""
+    digest = hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).digest()
+    return "TRUE" if digest[0] % 2 == 0 else "FALSE"
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so client connection pooling is exercised
+    # TCP_NODELAY like Ollama's Go server; otherwise Nagle holds back the small chunks on reused connections
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def write_chunk(self, body):
+        data = (json.dumps(body) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_GET(self):
+        server = self.server
+        if self.path in ("/api/ps", "/api/tags"):
+            with server.load_lock:
+                models = [{"name": model, "model": model} for model in server.loaded_models]
+            self.send_json(200, {"models": models})
+        else:
+            self.send_json(200, {"status": "ok"})
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if self.path != "/api/generate":
+            self.send_json(404, {"error": "not found"})
+            return
+
+        model = body.get("model", "")
+        prompt = body.get("prompt", "")
+        options = body.get("options") or {}
+        rng = server.next_rng()
+        arrival = time.time()
+
+        # keep_alive 0 with no prompt unloads, an empty prompt only loads (Ollama's warm-up idiom)
+        if not prompt:
+            if body.get("keep_alive") in (0, "0", "0s"):
+                server.unload(model)
+                load_time = 0.0
+            else:
+                load_time = server.ensure_loaded(model)
+            self.send_json(200, {"model": model, "response": "", "done": True, "load_duration": int(load_time * 1e9)})
+            return
+
+        if rng.random() < server.config["error_rate"]:
+            self.send_json(500, {"error": "injected failure"})
+            return
+
+        with server.slots:
+            queue_time = time.time() - arrival
+            load_time = server.ensure_loaded(model)
+            tokens = server.config["tokens"]
+            if options.get("num_predict"):
+                tokens = min(tokens, int(options["num_predict"]))
+            verdict = mock_verdict(model, prompt)
+            pieces = [verdict, "."] + [" reason"] * max(tokens - 2, 0)
+            pieces = pieces[:max(tokens, 1)]
+            is_stalled = server.config["stall_rate"] > 0 and rng.random() < server.config["stall_rate"]
+            prompt_time = server.sample(rng, server.config["ttft"])
+            time.sleep(prompt_time)
+
+            is_stream = body.get("stream", True)
+            eval_start = time.time()
+            if is_stream:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+            try:
+                for index, piece in enumerate(pieces):
+                    time.sleep(server.sample(rng, server.config["token_delay"]))
+                    if is_stream:
+                        self.write_chunk({"model": model, "response": piece, "done": False})
+                    if index == 0 and is_stalled:
+                        time.sleep(server.config["stall_seconds"])
+                eval_time = time.time() - eval_start
+                final = {
+                    "model": model,
+                    "response": "" if is_stream else "".join(pieces),
+                    "done": True,
+                    "total_duration": int((time.time() - arrival) * 1e9),
+                    "load_duration": int(load_time * 1e9),
+                    "prompt_eval_count": len(prompt.split()),
+                    "prompt_eval_duration": int(prompt_time * 1e9),
+                    "eval_count": len(pieces),
+                    "eval_duration": int(eval_time * 1e9),
+                    "queue_duration": int(queue_time * 1e9),
+                }
+                if is_stream:
+                    self.write_chunk(final)
+                    self.wfile.write(b"0\r\n\r\n")
+                else:
+                    self.send_json(200, final)
+            except (BrokenPipeError, ConnectionResetError):
+                # Client closed early (e.g. verdict-only mode); stop "decoding"
+                self.close_connection = True
+
+
+def start_mock_server(port=0, host="127.0.0.1", **config):
+    """Start a mock server on a background thread; returns the server (see server.url)."""
+    server = MockOllamaServer((host, port), config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mock Ollama /api/generate server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    for key, default in DEFAULT_CONFIG.items():
+        option = "--" + key.replace("_", "-")
+        if isinstance(default, str):
+            parser.add_argument(option, default=default)
+        else:
+            parser.add_argument(option, type=type(default), default=default)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = vars(parse_args())
+    host, port = args.pop("host"), args.pop("port")
+    server = MockOllamaServer((host, port), args)
+    print(f"Mock Ollama listening on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
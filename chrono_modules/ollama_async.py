@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+
+import time
+import asyncio
+import contextlib
+import contextvars
+import aiohttp
+import resources.common as cmn
+import chrono_modules.ollama_helper as ollama_helper
+from classes.RequestPolicy import RequestFailed, TRANSIENT_STATUSES
+from classes.ResponseCache import ResponseCache
+
+# Connection counters for the aiohttp session (the event loop is single-threaded)
+_connection_stats = {"requests": 0, "new_connections": 0}
+_limiter = contextvars.ContextVar("inflight_limiter", default=None)  # InflightLimiter whose slot the request holds
+
+
+async def _on_request_start(session, context, params):
+    _connection_stats["requests"] += 1
+
+
+async def _on_connection_create_end(session, context, params):
+    _connection_stats["new_connections"] += 1
+
+
+def create_session(limit_per_host):
+    """Create a keep-alive aiohttp session that counts new connections, with limit_per_host per backend."""
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    connector = aiohttp.TCPConnector(limit=limit_per_host * len(cmn.OLLAMA_BACKENDS), limit_per_host=limit_per_host)
+    timeout = aiohttp.ClientTimeout(
+        total=None, sock_connect=cmn.CONNECT_TIMEOUT, sock_read=cmn.READ_TIMEOUT
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=[trace_config])
+
+
+def connection_stats():
+    """Return request, new-connection and reused-connection counts for the event loop."""
+    stats = dict(_connection_stats)
+    stats["reused_connections"] = stats["requests"] - stats["new_connections"]
+    return stats
+
+
+async def query_ollama_async(session, model_name, prompt, options=None, verdict_only=None):
+    """Queries the Ollama server without blocking the event loop, using the response cache.
+
+    Cache reads and writes are SQLite calls, so they run on a worker thread
+    (ResponseCache keeps one connection per thread) instead of stalling every
+    coroutine on the loop.
+    """
+    if verdict_only is None:
+        verdict_only = cmn.IS_VERDICT_ONLY
+    cache = ollama_helper.get_cache()
+    if cache:
+        start_time = time.time()
+        key = ResponseCache.make_key(model_name, prompt, ollama_helper.cache_options(options, verdict_only))
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            ollama_helper.record_request(model_name, "cache", start_time, time.time(), "cached")
+            return cached
+
+    response = await _query_with_policy_async(
+        session, model_name, prompt, ollama_helper.generation_options(options, verdict_only), verdict_only
+    )
+    if cache and response is not None:
+        await asyncio.to_thread(cache.put, key, response)
+    return response
+
+
+def is_transient(error):
+    if isinstance(error, RequestFailed):
+        return error.is_transient
+    return isinstance(error, (aiohttp.ClientConnectionError, asyncio.TimeoutError))
+
+
+async def _query_with_policy_async(session, model_name, prompt, options, verdict_only):
+    """Async counterpart of ollama_helper._query_with_policy."""
+    policy = ollama_helper.get_request_policy()
+    policy.count("requests")
+    start_time = time.time()
+    for retry in range(policy.max_retries + 1):
+        try:
+            response = await _hedged_attempt_async(policy, session, model_name, prompt, options, verdict_only)
+            policy.record(time.time() - start_time)
+            return response
+        except Exception as e:
+            if retry == policy.max_retries or not is_transient(e):
+                policy.count("failed")
+                raise
+            policy.count("retries")
+            await asyncio.sleep(policy.retry_delay(retry))
+
+
+async def _hedged_attempt_async(policy, session, model_name, prompt, options, verdict_only):
+    """One attempt, plus a duplicate if it outlives the hedge delay; the loser's task is cancelled."""
+    start_time = time.time()
+    delay = policy.hedge_delay(model_name)
+    if delay is None:
+        response = await _query_ollama_server_async(session, model_name, prompt, options, verdict_only, policy.deadline)
+        policy.record_attempt(model_name, time.time() - start_time, time.time() - start_time)
+        return response
+
+    attempt = lambda: asyncio.ensure_future(
+        _query_ollama_server_async(session, model_name, prompt, options, verdict_only, policy.deadline)
+    )
+    attempts = [attempt()]
+    done, _ = await asyncio.wait(attempts, timeout=delay)
+    # A hedge is one more request in flight, so under adaptive concurrency it needs a free slot
+    if not done and ollama_helper.try_hedge_slot():
+        policy.count("hedges")
+        attempts.append(attempt())
+        attempts[1].add_done_callback(release_hedge_slot)
+    pending = set(attempts)
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                winner = attempts.index(future)
+                latency = time.time() - start_time
+                if winner == 1 and policy.is_shadow:
+                    def record_primary(primary):
+                        if not primary.cancelled():
+                            primary.exception()  # Retrieved, so a failed primary is not logged as unhandled
+                            policy.record_primary(time.time() - start_time)
+
+                    attempts[0].add_done_callback(record_primary)
+                    pending.discard(attempts[0])
+                    policy.record_attempt(model_name, latency, hedge_won=True)
+                else:
+                    policy.record_attempt(model_name, latency, latency, hedge_won=winner == 1)
+                return future.result()
+        raise error
+    finally:
+        # Cancelling the loser's task closes its connection, so the server stops generating it
+        for future in pending:
+            future.cancel()
+
+
+async def aiter_ndjson(content):
+    """Yield NDJSON objects from an aiohttp stream, reading whatever has arrived up to STREAM_CHUNK_BYTES at a time."""
+    decoder = ollama_helper.NDJSONDecoder()
+    async for chunk in content.iter_chunked(cmn.STREAM_CHUNK_BYTES):
+        for json_response in decoder.feed(chunk):
+            yield json_response
+    for json_response in decoder.close():
+        yield json_response
+
+
+async def _query_ollama_server_async(session, model_name, prompt, options=None, verdict_only=False, deadline=None):
+    """Streams one generation attempt from the Ollama server; raises RequestFailed on an error status."""
+    payload = {"model": model_name, "prompt": prompt, "keep_alive": cmn.KEEP_ALIVE}
+    if options:
+        payload["options"] = options
+    is_bulk = ollama_helper.is_bulk_response(verdict_only)
+    if is_bulk:
+        payload["stream"] = False
+    pool = ollama_helper.get_backend_pool()
+    ollama_helper.get_request_policy().count("attempts")
+    backend, start_time = pool.acquire(model_name)
+    is_ok = False
+    status = "error"
+    ttfb = ttft = final = stream = None
+    try:
+        async with session.post(
+            f"{backend.url}/api/generate",
+            json=payload,
+            timeout=aiohttp.ClientTimeout(
+                total=deadline, sock_connect=cmn.CONNECT_TIMEOUT, sock_read=min(cmn.READ_TIMEOUT, deadline or cmn.READ_TIMEOUT)
+            ),
+        ) as response:
+            ttfb = time.time() - start_time
+            if response.status == 200:
+                stream = ollama_helper.VerdictStream(verdict_only, cmn.VERDICT_JUSTIFICATION_CHARS)
+                if is_bulk:
+                    final = ollama_helper.json_loads((await response.read()).decode("utf-8"))
+                    stream.feed(final.get("response", ""))
+                else:
+                    async for json_response in aiter_ndjson(response.content):
+                        piece = json_response.get("response", "")
+                        if ttft is None and piece:
+                            ttft = time.time() - start_time
+                        if json_response.get("done"):
+                            final = json_response
+                        if stream.feed(piece):
+                            # Dropping the connection makes Ollama stop decoding this request
+                            response.close()
+                            break
+                is_ok = True
+                status = "ok"
+                return stream.text()
+            else:
+                status = f"http_{response.status}"
+                raise RequestFailed(status, response.status in TRANSIENT_STATUSES)
+    except asyncio.TimeoutError:
+        status = "deadline"
+        ollama_helper.get_request_policy().count("deadlines")
+        raise
+    except asyncio.CancelledError:
+        status = "cancelled"
+        raise
+    finally:
+        # A cancelled hedge loser says nothing about the backend's health
+        pool.release(backend, model_name, start_time, is_ok or status == "cancelled")
+        output_tokens = len(stream.pieces) if stream else None
+        ollama_helper.record_request(model_name, backend.url, start_time, time.time(), status, ttfb, ttft, output_tokens, final)
+
+
+def release_hedge_slot(_=None):
+    """Give back a hedge's slot (a done callback) and wake the requests InflightLimiter.slot() holds back for one."""
+    ollama_helper.release_hedge_slot()
+    limiter = _limiter.get()
+    if limiter is not None:
+        limiter.notify_soon()
+
+
+class InflightLimiter:
+    """Caps the number of outstanding requests per model and in total.
+
+    With adaptive concurrency the total cap follows the process's
+    ConcurrencyController instead of staying at max_inflight.
+    """
+    def __init__(self, max_inflight, max_inflight_per_model):
+        self.max_inflight_per_model = max_inflight_per_model
+        self.total = asyncio.Semaphore(max_inflight)
+        self.per_model = {}
+        self.controller = ollama_helper.get_concurrency_controller()
+        self.controller_changed = asyncio.Condition()
+        self.notifications = set()  # notify_soon() tasks, referenced until they ran
+
+    def _model_semaphore(self, model_name):
+        if model_name not in self.per_model:
+            self.per_model[model_name] = asyncio.Semaphore(self.max_inflight_per_model)
+        return self.per_model[model_name]
+
+    @contextlib.asynccontextmanager
+    async def slot(self, model_name):
+        """Hold one in-flight slot for model_name."""
+        # Take the per-model slot first so a busy model does not hold global slots
+        async with self._model_semaphore(model_name):
+            async with self.total:
+                if self.controller is None:
+                    yield
+                    return
+                async with self.controller_changed:
+                    await self.controller_changed.wait_for(self.controller.try_acquire)
+                # Lets the request's hedge (see release_hedge_slot) wake the waiters when it frees its slot
+                token = _limiter.set(self)
+                try:
+                    yield
+                finally:
+                    _limiter.reset(token)
+                    self.controller.release()
+                    # The finished request may also have raised the limit
+                    await self.notify_changed()
+
+    async def notify_changed(self):
+        """Wake the requests waiting in slot() to retry the controller."""
+        async with self.controller_changed:
+            self.controller_changed.notify_all()
+
+    def notify_soon(self):
+        """notify_changed() from synchronous code on the event loop, such as a done callback."""
+        task = asyncio.ensure_future(self.notify_changed())
+        self.notifications.add(task)
+        task.add_done_callback(self.notifications.discard)
+
+    async def query(self, session, model_name, prompt, options=None):
+        async with self.slot(model_name):
+            return await query_ollama_async(session, model_name, prompt, options)
@@ -1,31 +1,815 @@
 #!/usr/bin/env python
 
+import atexit
+import multiprocessing.util
+import os
+import socket
 import time
 import json
-import requests
+import contextlib
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from classes.DecisionResult import DecisionResult
+from classes.ResponseCache import ResponseCache
+from classes.BackendPool import BackendPool
+from classes.ConcurrencyController import ConcurrencyController
+from classes.RequestPolicy import RequestPolicy, RequestFailed, TRANSIENT_STATUSES
+from classes.TokenMetricTracker import TokenMetricsTracker
 import resources.common as cmn
 
 
-def query_ollama(model_name, prompt):
-    """Queries the Ollama server."""
-    response = requests.post(
-        f"{cmn.BASE_URL_LOCAL}/api/generate",  
-        json={"model": model_name, "prompt": prompt},
-        stream=True
+##############################
+# Pooled HTTP client
+##############################
+_session = None
+_session_pid = None
+_session_pool_size = 0
+_session_lock = threading.Lock()
+_request_slots = 0  # Requests this process runs at once, as declared by its engine
+_stats_lock = threading.Lock()
+_connection_stats = {"requests": 0, "new_connections": 0}
+
+
+def _count_new_connection():
+    with _stats_lock:
+        _connection_stats["new_connections"] += 1
+
+
+def get_session():
+    """Return the process-wide pooled session, shared by all threads of this process.
+
+    requests is imported here on first use (see chrono_modules/http_pool.py).
+    """
+    global _session, _session_pid, _session_pool_size
+    pid = os.getpid()
+    size = pool_size()
+    if _session is None or _session_pid != pid or _session_pool_size < size:
+        with _session_lock:
+            # A forked child (MPI rank, process pool) must not reuse the parent's sockets
+            if _session is None or _session_pid != pid:
+                import chrono_modules.http_pool as http_pool
+                _session = http_pool.make_session(len(cmn.OLLAMA_BACKENDS), size, _count_new_connection)
+                _session_pid, _session_pool_size = pid, size
+                with _stats_lock:
+                    _connection_stats["requests"] = 0
+                    _connection_stats["new_connections"] = 0
+            elif _session_pool_size < size:
+                # The engine declared more request slots than the session (e.g. opened by the warm-up) keeps
+                import chrono_modules.http_pool as http_pool
+                old_session = _session
+                _session = http_pool.make_session(len(cmn.OLLAMA_BACKENDS), size, _count_new_connection)
+                _session_pool_size = size
+                old_session.close()
+    return _session
+
+
+def set_request_slots(slots):
+    """Declare how many requests this process runs at once, so its connection pools keep a socket for each."""
+    global _request_slots
+    _request_slots = max(_request_slots, slots)
+
+
+def pool_size():
+    """Keep-alive connections per backend: one per request slot and one per possible hedge.
+
+    The slots are the most of OLLAMA_NUM_PARALLEL, the engine's declared
+    slots and, with adaptive concurrency, CHRONO_CONCURRENCY_MAX. A pool
+    smaller than the requests in flight opens and discards a socket for
+    every request over it.
+    """
+    slots = max(cmn.POOL_SIZE, _request_slots, cmn.CONCURRENCY_MAX if is_adaptive_concurrency() else 0)
+    return 2 * slots if cmn.HEDGE_PERCENTILE is not None else slots
+
+
+def connection_stats():
+    """Return request, new-connection and reused-connection counts for this process."""
+    with _stats_lock:
+        stats = dict(_connection_stats)
+    stats["reused_connections"] = stats["requests"] - stats["new_connections"]
+    return stats
+
+
+def print_connection_stats(stats=None):
+    stats = stats or connection_stats()
+    print(f"HTTP Requests: {stats['requests']} | New Connections: {stats['new_connections']} | Reused Connections: {stats['reused_connections']}")
+
+
+##############################
+# Backend pool
+##############################
+_backend_pool = None
+_backend_pool_pid = None
+
+
+def get_backend_pool():
+    """Return this process's pool of Ollama backends."""
+    global _backend_pool, _backend_pool_pid
+    pid = os.getpid()
+    if _backend_pool is None or _backend_pool_pid != pid:
+        with _session_lock:
+            if _backend_pool is None or _backend_pool_pid != pid:
+                _backend_pool = BackendPool(
+                    cmn.OLLAMA_BACKENDS,
+                    max_failures=cmn.BACKEND_MAX_FAILURES,
+                    eject_seconds=cmn.BACKEND_EJECT_SECONDS,
+                )
+                _backend_pool_pid = pid
+    return _backend_pool
+
+
+def restrict_backends(rank, size):
+    """Limit this process to its share of the backends so ranks spread across servers.
+
+    With at least as many backends as ranks, rank r takes every size-th backend
+    starting at r; otherwise ranks wrap around the backends.
+    """
+    global _backend_pool, _backend_pool_pid
+    urls = cmn.OLLAMA_BACKENDS
+    if len(urls) >= size or not urls:  # No URLs: BackendPool reports it
+        share = urls[rank::size]
+    else:
+        share = [urls[rank % len(urls)]]
+    with _session_lock:
+        _backend_pool = BackendPool(share, max_failures=cmn.BACKEND_MAX_FAILURES, eject_seconds=cmn.BACKEND_EJECT_SECONDS)
+        _backend_pool_pid = os.getpid()
+    return share
+
+
+def backend_stats():
+    """Return per-backend request counters for this process."""
+    return get_backend_pool().stats()
+
+
+def print_backend_stats(stats=None):
+    BackendPool.print_stats(stats or backend_stats())
+
+
+##############################
+# Adaptive concurrency
+##############################
+_concurrency_controller = None
+
+
+def is_adaptive_concurrency():
+    return cmn.CONCURRENCY_MODE != "fixed"
+
+
+def concurrency_ceiling(workers, default):
+    """Request slots an engine creates: -w, else CHRONO_CONCURRENCY_MAX when adaptive, else the engine default."""
+    return workers or (cmn.CONCURRENCY_MAX if is_adaptive_concurrency() else default)
+
+
+def start_concurrency_control(maximum):
+    """Install this process's ConcurrencyController, fed by every server request; None in fixed mode."""
+    global _concurrency_controller
+    if not is_adaptive_concurrency():
+        return None
+    _concurrency_controller = ConcurrencyController(
+        initial=cmn.CONCURRENCY_INITIAL, maximum=maximum, mode=cmn.CONCURRENCY_MODE,
+        tolerance=cmn.CONCURRENCY_TOLERANCE,
+    )
+    return _concurrency_controller
+
+
+def get_concurrency_controller():
+    return _concurrency_controller
+
+
+def concurrency_slot():
+    """Context manager holding one adaptive in-flight slot (a no-op in fixed mode)."""
+    return _concurrency_controller.slot() if _concurrency_controller else contextlib.nullcontext()
+
+
+def try_hedge_slot():
+    """Take an in-flight slot for a hedge without waiting; False when the adaptive limit leaves none (no hedge is sent)."""
+    return _concurrency_controller is None or _concurrency_controller.try_acquire()
+
+
+def release_hedge_slot(_=None):
+    """Give back try_hedge_slot()'s slot; usable as a future's done callback."""
+    if _concurrency_controller is not None:
+        _concurrency_controller.release()
+
+
+##############################
+# Deadlines, retries and hedging
+##############################
+HEDGE_THREADS = 256  # Threads streaming hedged attempts (created on demand)
+_policy = None
+_policy_pid = None
+_hedge_executor = None
+
+
+def get_request_policy():
+    """Return this process's RequestPolicy, built from the CHRONO_* settings."""
+    global _policy, _policy_pid
+    pid = os.getpid()
+    if _policy is None or _policy_pid != pid:
+        with _session_lock:
+            if _policy is None or _policy_pid != pid:
+                _policy = RequestPolicy(
+                    cmn.REQUEST_DEADLINE, cmn.MAX_RETRIES, cmn.RETRY_BACKOFF, cmn.RETRY_BACKOFF_MAX,
+                    cmn.HEDGE_PERCENTILE, cmn.HEDGE_MIN_SAMPLES, cmn.IS_HEDGE_SHADOW,
+                )
+                _policy_pid = pid
+    return _policy
+
+
+def _get_hedge_executor():
+    global _hedge_executor
+    with _session_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_THREADS, thread_name_prefix="hedge")
+    return _hedge_executor
+
+
+def request_stats():
+    return get_request_policy().summary()
+
+
+def print_request_stats(stats=None):
+    RequestPolicy.print_summary(stats or request_stats())
+
+
+def is_transient(error):
+    if isinstance(error, RequestFailed):
+        return error.is_transient
+    import requests  # Already loaded by get_session() whenever a request could fail
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+def _query_with_policy(model_name, prompt, options, verdict_only):
+    """Query the server under the request policy: per-attempt deadline, jittered retries, optional hedging."""
+    policy = get_request_policy()
+    policy.count("requests")
+    start_time = time.time()
+    for retry in range(policy.max_retries + 1):
+        try:
+            response = _hedged_attempt(policy, model_name, prompt, options, verdict_only)
+            policy.record(time.time() - start_time)
+            return response
+        except Exception as e:
+            if is_request_cancelled():
+                raise  # Given up by the caller: neither a failure nor worth a retry
+            if retry == policy.max_retries or not is_transient(e):
+                policy.count("failed")
+                raise
+            policy.count("retries")
+            time.sleep(policy.retry_delay(retry))
+
+
+def _attempt_context():
+    """Copy of the caller's context for an attempt run on a hedge thread.
+
+    The copy keeps the caller's request tags (layer, role) for telemetry and
+    names the caller's thread as the worker. Each attempt needs its own copy,
+    since a context can only be entered by one thread at a time.
+    """
+    context = contextvars.copy_context()
+    context.run(_request_tags.set, {"worker": threading.current_thread().name, **_request_tags.get()})
+    return context
+
+
+def _hedged_attempt(policy, model_name, prompt, options, verdict_only):
+    """One attempt, plus a duplicate on another backend if it outlives the hedge delay; the first answer wins."""
+    start_time = time.time()
+    delay = policy.hedge_delay(model_name)
+    if delay is None:
+        response = _query_ollama_server(model_name, prompt, options, verdict_only, policy.deadline)
+        policy.record_attempt(model_name, time.time() - start_time, time.time() - start_time)
+        return response
+
+    # Both attempts stream on executor threads so this thread can time the hedge and take the first answer
+    executor = _get_hedge_executor()
+    cancels = [threading.Event(), threading.Event()]
+    submit = lambda cancel: executor.submit(
+        _attempt_context().run, _query_ollama_server, model_name, prompt, options, verdict_only, policy.deadline, cancel
     )
-    if response.status_code == 200:
-        full_response = ""
-        for line in response.iter_lines():
-            if line:
-                decoded_line = line.decode("utf-8")
-                json_response = json.loads(decoded_line)
-                full_response += json_response.get("response", "")
-        return full_response
+    futures = [submit(cancels[0])]
+    # A hedge is one more request in flight, so under adaptive concurrency it needs a free slot
+    if not wait(futures, timeout=delay).done and try_hedge_slot():
+        policy.count("hedges")
+        futures.append(submit(cancels[1]))
+        futures[1].add_done_callback(release_hedge_slot)
+    pending = set(futures)
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                error = future.exception()
+                continue
+            winner = futures.index(future)
+            latency = time.time() - start_time
+            if winner == 1 and policy.is_shadow:
+                # Keep the primary running to learn its latency, or how long it took to fail
+                futures[0].add_done_callback(lambda _: policy.record_primary(time.time() - start_time))
+                policy.record_attempt(model_name, latency, hedge_won=True)
+            else:
+                # The loser stops streaming at its next chunk, which closes its connection and frees the server slot
+                for cancel in cancels:
+                    cancel.set()
+                policy.record_attempt(model_name, latency, latency, hedge_won=winner == 1)
+            return future.result()
+    raise error
+
+
+##############################
+# Model warm-up
+##############################
+def _model_name(name):
+    # /api/ps lists "llama3:latest" for a model requested as "llama3"
+    return name[:-len(":latest")] if name.endswith(":latest") else name
+
+
+def _load_model(session, url, model_name, keep_alive):
+    """Send Ollama's empty-prompt load request; keep_alive 0 unloads instead."""
+    import requests
+    start_time = time.time()
+    entry = {"url": url, "model": model_name, "status": "error", "wall": None, "load": None}
+    try:
+        response = session.post(
+            f"{url}/api/generate",
+            json={"model": model_name, "prompt": "", "keep_alive": keep_alive, "stream": False},
+            timeout=(cmn.CONNECT_TIMEOUT, cmn.READ_TIMEOUT),
+        )
+        entry["wall"] = time.time() - start_time
+        if response.status_code != 200:
+            entry["status"] = f"http_{response.status_code}"
+            return entry
+        body = response.json()
+        entry["status"] = "ok"
+        entry["load"] = body["load_duration"] / 1e9 if "load_duration" in body else None
+    except (requests.RequestException, ValueError):
+        entry["wall"] = time.time() - start_time
+    return entry
+
+
+def _for_each_backend_model(models, keep_alive, urls=None):
+    """Run _load_model for every (backend, model) pair at once; returns their entries."""
+    import requests
+    urls = [url.rstrip("/") for url in (urls or cmn.OLLAMA_BACKENDS)]
+    pairs = [(url, model_name) for url in urls for model_name in models]
+    if not pairs:
+        return []
+    # A private session, so warm-up sockets don't show up in the run's connection stats
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=len(pairs)) as executor:
+        return list(executor.map(lambda pair: _load_model(session, *pair, keep_alive), pairs))
+
+
+def warm_up_models(models, urls=None):
+    """Load models on every backend concurrently before a timed run.
+
+    Only the first cmn.MAX_LOADED_MODELS models are loaded, since loading more
+    would evict the first ones again; the others load on first use. Each
+    backend's /api/ps listing is then handed to the backend pool, so routing
+    prefers backends that already hold a model. Returns
+    {"models", "skipped", "seconds", "entries"} for print_warm_up().
+    """
+    import requests
+    start_time = time.time()
+    models = list(models)
+    loaded = models[:max(cmn.MAX_LOADED_MODELS, 1)]
+    entries = _for_each_backend_model(loaded, cmn.KEEP_ALIVE, urls)
+    pool = get_backend_pool()
+    for url in {entry["url"] for entry in entries}:
+        try:
+            response = requests.get(f"{url}/api/ps", timeout=(cmn.CONNECT_TIMEOUT, cmn.CONNECT_TIMEOUT))
+            running = [_model_name(model["name"]) for model in response.json().get("models", [])]
+        except (requests.RequestException, ValueError, KeyError):
+            # Older servers without /api/ps: trust the load responses
+            running = [entry["model"] for entry in entries if entry["url"] == url and entry["status"] == "ok"]
+        pool.set_loaded_models(url, running)
+    return {"models": loaded, "skipped": models[len(loaded):], "seconds": time.time() - start_time, "entries": entries}
+
+
+def release_models(models, urls=None):
+    """Unload models from every backend (keep_alive 0); returns the number of successful unloads."""
+    return sum(entry["status"] == "ok" for entry in _for_each_backend_model(models, 0, urls))
+
+
+def print_warm_up(warm_up):
+    """Cold-start timings of the warm-up, reported apart from the timed run's steady state."""
+    entries = warm_up["entries"]
+    ok = [entry for entry in entries if entry["status"] == "ok"]
+    backends = len({entry["url"] for entry in entries})
+    print(f"Warm-up: {len(ok)}/{len(entries)} model loads on {backends} backends in {warm_up['seconds']:.2f} seconds (keep_alive {cmn.KEEP_ALIVE})")
+    for entry in entries:
+        load = f"{entry['load']:.2f} s" if entry["load"] is not None else "n/a"
+        wall = f"{entry['wall']:.2f} s" if entry["wall"] is not None else "n/a"
+        print(f"Cold Start: {entry['model']} @ {entry['url']} | Status: {entry['status']} | Load: {load} | Wall: {wall}")
+    if warm_up["skipped"]:
+        print(f"Not Warmed (over OLLAMA_MAX_LOADED_MODELS={cmn.MAX_LOADED_MODELS}): {', '.join(warm_up['skipped'])}")
+
+
+##############################
+# Request telemetry
+##############################
+_telemetry = None
+_telemetry_pid = None
+_telemetry_dir = None  # Overrides CHRONO_TELEMETRY_DIR, e.g. in process pool workers
+_default_tags = {}  # Process-wide tags, e.g. the MPI rank
+_request_tags = contextvars.ContextVar("request_tags", default={})  # Per thread / asyncio task
+_request_cancel = contextvars.ContextVar("request_cancel", default=None)  # threading.Event that abandons requests
+_cancel_lock = threading.Lock()
+_cancel_sockets = {}  # {cancel Event: sockets of the streams running under it}
+
+
+def get_telemetry():
+    """Return this process's per-request telemetry store.
+
+    With CHRONO_TELEMETRY_DIR (or set_telemetry_dir()) set, each process
+    appends its records to its own telemetry-<host>-<pid>.jsonl there;
+    print_telemetry() merges the files.
+    """
+    global _telemetry, _telemetry_pid
+    pid = os.getpid()
+    if _telemetry is None or _telemetry_pid != pid:
+        with _session_lock:
+            if _telemetry is None or _telemetry_pid != pid:
+                sink_path = None
+                directory = _telemetry_dir or cmn.TELEMETRY_DIR
+                if directory:
+                    sink_path = os.path.join(directory, f"telemetry-{socket.gethostname()}-{pid}.jsonl")
+                telemetry = TokenMetricsTracker(sink_path, cmn.COLD_LOAD_SECONDS)
+                # Write the last batch at exit; pool workers skip atexit, so also register a multiprocessing finalizer
+                atexit.register(telemetry.flush)
+                multiprocessing.util.Finalize(None, telemetry.flush, exitpriority=10)
+                _telemetry, _telemetry_pid = telemetry, pid
+    return _telemetry
+
+
+def set_telemetry_dir(directory):
+    """Write this process's telemetry records to directory; call before its first request."""
+    global _telemetry_dir
+    _telemetry_dir = directory
+
+
+def set_default_tags(**tags):
+    """Tag every request of this process."""
+    _default_tags.update(tags)
+
+
+def set_request_tags(**tags):
+    """Tag the following requests of the current thread or asyncio task (role, layer, worker)."""
+    _request_tags.set(tags)
+
+
+def set_request_cancel(event):
+    """Give up the current thread's following requests once event is set (None: never).
+
+    Requests are not retried once given up, e.g. when another MPI rank already
+    finished the same re-issued task. Set the event with cancel_requests() to
+    also stop the streams in flight at once.
+    """
+    _request_cancel.set(event)
+
+
+def is_request_cancelled():
+    event = _request_cancel.get()
+    return event is not None and event.is_set()
+
+
+def cancel_requests(event):
+    """Set event and shut down the sockets streaming under it, so even a stalled read ends now."""
+    event.set()
+    with _cancel_lock:
+        # Under the lock: a stream unregisters before its connection goes back to the pool
+        for sock in _cancel_sockets.get(event, ()):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass  # Already closed
+
+
+@contextlib.contextmanager
+def _cut_on_cancel(event, response):
+    """Let cancel_requests(event) shut down response's socket while the body streams."""
+    sock = getattr(getattr(response.raw, "connection", None), "sock", None)
+    if event is None or sock is None:
+        yield
+        return
+    with _cancel_lock:
+        _cancel_sockets.setdefault(event, set()).add(sock)
+    try:
+        if event.is_set():
+            raise RequestFailed("cancelled", False)  # Cancelled before the socket was registered
+        yield
+    finally:
+        with _cancel_lock:
+            sockets = _cancel_sockets[event]
+            sockets.discard(sock)
+            if not sockets:
+                del _cancel_sockets[event]
+
+
+def record_request(model_name, backend_url, start_time, end_time, status, ttfb=None, ttft=None, output_tokens=None, final=None):
+    """Store one request's timings, combining client-side times with the final chunk's metadata."""
+    final = final or {}
+    seconds = lambda key: final[key] / 1e9 if key in final else None
+    load, prompt_eval, eval_time, total = (seconds(key) for key in ("load_duration", "prompt_eval_duration", "eval_duration", "total_duration"))
+    # Ollama's total_duration also covers time spent waiting for a free slot on the server
+    queue = max(total - (load or 0) - (prompt_eval or 0) - (eval_time or 0), 0) if total is not None else None
+    output_tokens = final.get("eval_count", output_tokens)
+    if eval_time:
+        tokens_per_s = output_tokens / eval_time
+    elif final.get("done") and output_tokens and output_tokens > 1 and ttft is not None and end_time - start_time > ttft:
+        # Decode rate: the first token arrived at ttft, the other output_tokens - 1 after it. A stream
+        # closed early (no done chunk, e.g. a verdict-only read) did not decode to the end, so it has none.
+        tokens_per_s = (output_tokens - 1) / (end_time - start_time - ttft)
     else:
+        tokens_per_s = None
+    record = {
+        "model": model_name,
+        "worker": threading.current_thread().name,
+        "pid": os.getpid(),
+        **_default_tags,
+        **_request_tags.get(),
+        "backend": backend_url,
+        "status": status,
+        "start": start_time,
+        "ttfb": ttfb,
+        "ttft": ttft,
+        "latency": end_time - start_time,
+        "queue": queue,
+        "load": load,
+        "prompt_eval": prompt_eval,
+        "eval": eval_time,
+        "prompt_tokens": final.get("prompt_eval_count"),
+        "output_tokens": output_tokens,
+        "tokens_per_s": tokens_per_s,
+    }
+    get_telemetry().record(**record)
+    if _concurrency_controller is not None and status not in ("cached", "cancelled"):
+        # Queueing for a server slot shows in the time to first token before the total latency
+        _concurrency_controller.record(ttft if ttft is not None else end_time - start_time, status == "ok")
+
+
+##############################
+# NDJSON stream decoding
+##############################
+try:
+    import orjson
+    json_loads = orjson.loads  # Optional, several times faster on small objects
+except ImportError:
+    orjson = None
+    json_loads = json.JSONDecoder().decode  # json.loads without its per-call argument checks
+
+
+class NDJSONDecoder:
+    """Splits byte chunks of any size into NDJSON objects.
+
+    Lines cut across chunk boundaries are carried over to the next feed(), so
+    the stream can be read in large chunks rather than line by line.
+    """
+    def __init__(self, loads=None):
+        self.loads = loads or json_loads
+        self.tail = b""
+
+    def feed(self, chunk):
+        """Return the objects completed by chunk."""
+        data = self.tail + chunk if self.tail else chunk
+        end = data.rfind(b"\n") + 1
+        self.tail = data[end:]
+        loads = self.loads
+        # One decode per chunk; splitting at a newline never cuts a UTF-8 character
+        return [loads(line) for line in data[:end].decode("utf-8").split("\n") if line.strip()]
+
+    def close(self):
+        """Return the last object if the stream did not end with a newline."""
+        tail, self.tail = self.tail, b""
+        return [self.loads(tail.decode("utf-8"))] if tail.strip() else []
+
+
+def iter_ndjson(chunks, loads=None):
+    """Yield NDJSON objects from an iterable of byte chunks."""
+    decoder = NDJSONDecoder(loads)
+    for chunk in chunks:
+        yield from decoder.feed(chunk)
+    yield from decoder.close()
+
+
+def is_bulk_response(verdict_only):
+    """Ask for one "stream": false body instead of NDJSON; verdict-only mode needs the stream to stop early."""
+    return cmn.IS_BULK_RESPONSE and not verdict_only
+
+
+##############################
+# Verdict-only parsing
+##############################
+VERDICTS = ("TRUE", "FALSE")
+VERDICT_LEAD_CHARS = " \t\r\n*#>\"'`:-_"
+
+
+def parse_verdict(text):
+    """Return the leading TRUE/FALSE of a response, None if still undecided, or "" if there is none."""
+    head = text.lstrip(VERDICT_LEAD_CHARS).upper()
+    for verdict in VERDICTS:
+        if head.startswith(verdict):
+            return verdict
+    if any(verdict.startswith(head) for verdict in VERDICTS):
         return None
-    
-    
+    return ""
+
+
+class VerdictStream:
+    """Accumulates streamed response pieces and reports when enough has been read.
+
+    In verdict-only mode reading can stop as soon as the leading TRUE/FALSE
+    (plus justification_chars of the reason) has arrived. Responses that do not
+    lead with a verdict are read to the end, bounded by num_predict.
+    """
+    def __init__(self, verdict_only=False, justification_chars=0):
+        self.verdict_only = verdict_only
+        self.justification_chars = justification_chars
+        self.pieces = []
+        self.length = 0
+        self.verdict = None
+        self.verdict_end = None
+
+    def feed(self, piece):
+        """Add one streamed piece; return True once the rest of the stream is not needed."""
+        self.pieces.append(piece)
+        self.length += len(piece)
+        if not self.verdict_only:
+            return False
+        if self.verdict is None:
+            # Only joins while undecided, i.e. over the first few tokens
+            text = "".join(self.pieces)
+            self.verdict = parse_verdict(text)
+            if self.verdict:
+                self.verdict_end = text.upper().index(self.verdict) + len(self.verdict)
+        if not self.verdict:
+            return False
+        return self.length >= self.verdict_end + self.justification_chars
+
+    def text(self):
+        """The response; in verdict-only mode cut after the justification, with the verdict as parse_verdict read it.
+
+        process_response() looks for "TRUE", so a model answering "True." must
+        not score as disagreement just because its reason was cut off.
+        """
+        text = "".join(self.pieces)
+        if self.verdict_only and self.verdict:
+            start = self.verdict_end - len(self.verdict)
+            return text[:start] + self.verdict + text[self.verdict_end:self.verdict_end + self.justification_chars]
+        return text
+
+
+def generation_options(options, verdict_only):
+    """Add the num_predict cap used in verdict-only mode to the generation options."""
+    if verdict_only and cmn.VERDICT_NUM_PREDICT:
+        options = dict(options or {})
+        # Roughly 3 characters per token for the kept justification
+        options.setdefault("num_predict", cmn.VERDICT_NUM_PREDICT + cmn.VERDICT_JUSTIFICATION_CHARS // 3)
+    return options
+
+
+def cache_options(options, verdict_only):
+    """Options that identify a response in the cache, including the verdict-only truncation."""
+    if verdict_only:
+        options = dict(options or {})
+        options["verdict_only"] = cmn.VERDICT_JUSTIFICATION_CHARS
+    return options
+
+
+##############################
+# Response cache
+##############################
+_cache = None
+_cache_pid = None
+
+
+def get_cache():
+    """Return this process's response cache, or None when caching is disabled."""
+    global _cache, _cache_pid
+    if not cmn.IS_CACHE_ENABLED:
+        return None
+    pid = os.getpid()
+    if _cache is None or _cache_pid != pid:
+        with _session_lock:
+            if _cache is None or _cache_pid != pid:
+                _cache = ResponseCache(cmn.CACHE_PATH, max_bytes=cmn.CACHE_MAX_BYTES, max_age=cmn.CACHE_MAX_AGE)
+                _cache_pid = pid
+    return _cache
+
+
+def cache_stats():
+    """Return cache hit/miss/write counts for this process."""
+    cache = get_cache()
+    return cache.stats() if cache else {"hits": 0, "misses": 0, "writes": 0}
+
+
+def print_cache_stats(stats=None):
+    if not cmn.IS_CACHE_ENABLED:
+        print("Response Cache: disabled")
+        return
+    stats = stats or cache_stats()
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = stats["hits"] / lookups if lookups > 0 else 0
+    print(f"Response Cache: {stats['hits']} hits | {stats['misses']} misses | Hit Rate: {hit_rate * 100:.2f}%")
+
+
+def query_ollama(model_name, prompt, options=None, verdict_only=None):
+    """Queries the Ollama server, answering from the response cache when possible."""
+    if verdict_only is None:
+        verdict_only = cmn.IS_VERDICT_ONLY
+    cache = get_cache()
+    if cache:
+        start_time = time.time()
+        key = ResponseCache.make_key(model_name, prompt, cache_options(options, verdict_only))
+        cached = cache.get(key)
+        if cached is not None:
+            record_request(model_name, "cache", start_time, time.time(), "cached")
+            return cached
+
+    response = _query_with_policy(model_name, prompt, generation_options(options, verdict_only), verdict_only)
+    if cache and response is not None:
+        cache.put(key, response)
+    return response
+
+
+def _query_ollama_server(model_name, prompt, options=None, verdict_only=False, deadline=None, cancel=None):
+    """Streams one generation attempt from the Ollama server.
+
+    Raises RequestFailed on an error status, once deadline seconds have
+    passed, or when cancel (a threading.Event) is set by a winning hedge or
+    the caller's set_request_cancel() event is set.
+    """
+    import requests
+    from urllib3.exceptions import ReadTimeoutError
+    session = get_session()
+    caller_cancel = _request_cancel.get()
+    is_cancelled = lambda: any(event is not None and event.is_set() for event in (cancel, caller_cancel))
+    payload = {"model": model_name, "prompt": prompt, "keep_alive": cmn.KEEP_ALIVE}
+    if options:
+        payload["options"] = options
+    is_bulk = is_bulk_response(verdict_only)
+    if is_bulk:
+        payload["stream"] = False
+    with _stats_lock:
+        _connection_stats["requests"] += 1
+    pool = get_backend_pool()
+    get_request_policy().count("attempts")
+    backend, start_time = pool.acquire(model_name)
+    deadline_at = start_time + deadline if deadline else None
+    is_ok = False
+    status = "error"
+    ttfb = ttft = final = stream = None
+    try:
+        with session.post(
+            f"{backend.url}/api/generate",
+            json=payload,
+            stream=True,
+            timeout=(cmn.CONNECT_TIMEOUT, min(cmn.READ_TIMEOUT, deadline or cmn.READ_TIMEOUT)),
+        ) as response, _cut_on_cancel(caller_cancel, response):
+            ttfb = time.time() - start_time
+            if response.status_code == 200:
+                stream = VerdictStream(verdict_only, cmn.VERDICT_JUSTIFICATION_CHARS)
+                if is_bulk:
+                    # One body and one parse; there is no TTFT without tokens arriving one by one
+                    final = json_loads(response.content.decode("utf-8"))
+                    stream.feed(final.get("response", ""))
+                else:
+                    for json_response in iter_ndjson(response.iter_content(chunk_size=cmn.STREAM_CHUNK_BYTES)):
+                        if is_cancelled():
+                            status = "cancelled"
+                            raise RequestFailed(status, False)
+                        if deadline_at and time.time() > deadline_at:
+                            status = "deadline"
+                            get_request_policy().count("deadlines")
+                            raise RequestFailed(status, True)
+                        piece = json_response.get("response", "")
+                        if ttft is None and piece:
+                            ttft = time.time() - start_time
+                        if json_response.get("done"):
+                            final = json_response
+                        if stream.feed(piece):
+                            # Closing the stream early makes Ollama stop decoding this request
+                            break
+                is_ok = True
+                status = "ok"
+                return stream.text()
+            else:
+                status = f"http_{response.status_code}"
+                raise RequestFailed(status, response.status_code in TRANSIENT_STATUSES)
+    except (requests.Timeout, requests.ConnectionError) as e:
+        # Reads time out after at most the deadline, so a stalled stream ends here (wrapped in a
+        # ConnectionError when it happens while streaming)
+        if isinstance(e, requests.Timeout) or any(isinstance(arg, ReadTimeoutError) for arg in e.args):
+            status = "timeout"
+            get_request_policy().count("deadlines")
+        raise
+    finally:
+        if status == "error" and is_cancelled():
+            status = "cancelled"  # Its socket was shut down by cancel_requests()
+        # A cancelled request (hedge loser, task finished elsewhere) says nothing about the backend's health
+        pool.release(backend, model_name, start_time, is_ok or status == "cancelled")
+        output_tokens = len(stream.pieces) if stream else None
+        record_request(model_name, backend.url, start_time, time.time(), status, ttfb, ttft, output_tokens, final)
+
+
 def generate_prompt(original_prompt, layer, role=None, agree_count=-1, decision_count=-1):
     """Construct the prompt based on the layer, role, and agreement count."""
     base_prompt = (
@@ -46,6 +830,5 @@ def generate_prompt(original_prompt, layer, role=None, agree_count=-1, decision_
 
 def process_response(response):
     """Process LLM response."""
-    decision = "TRUE" if "TRUE" in response else "FALSE"
-    return DecisionResult(decision, response)
-
+    agree = 1 if "TRUE" in response else 0
+    return DecisionResult(None, agree, 1, justification=response)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+##########################################
+# Microbenchmark of client-side response parsing, per response and per token
+#
+# $ python -m chrono_modules.parse_bench [--tokens 300] [--responses 200] [--repeat 5]
+#
+# Each variant parses the same synthetic Ollama responses from an in-memory
+# body through requests, so only client CPU is measured (no server, no network).
+##########################################
+
+import argparse
+import io
+import json
+import time
+import requests
+import resources.common as cmn
+import chrono_modules.ollama_helper as ollama_helper
+from chrono_modules.ollama_helper import orjson
+
+JSON_LOADS = json.JSONDecoder().decode  # The stdlib fallback of ollama_helper.json_loads
+
+
+def make_stream(tokens):
+    """NDJSON body of a streamed generation of `tokens` pieces, shaped like Ollama's."""
+    lines = [{"model": "llama3", "created_at": "2024-11-01T00:00:00.000000Z", "response": "TRUE" if i == 0 else " word", "done": False}
+             for i in range(tokens)]
+    lines.append({"model": "llama3", "created_at": "2024-11-01T00:00:00.000000Z", "response": "", "done": True,
+                  "total_duration": 1, "load_duration": 1, "prompt_eval_count": 1, "prompt_eval_duration": 1,
+                  "eval_count": tokens, "eval_duration": 1})
+    return "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+
+
+def make_bulk(tokens):
+    """"stream": false body of the same generation."""
+    return json.dumps({"model": "llama3", "created_at": "2024-11-01T00:00:00.000000Z", "response": "TRUE" + " word" * (tokens - 1),
+                       "done": True, "eval_count": tokens}).encode("utf-8")
+
+
+def response_from(body):
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(body)
+    return response
+
+
+def parse_lines_concat(body):
+    """The original loop: iter_lines, decode each line, json.loads, grow a str."""
+    full_response = ""
+    for line in response_from(body).iter_lines():
+        if line:
+            json_response = json.loads(line.decode("utf-8"))
+            full_response += json_response.get("response", "")
+    return full_response
+
+
+def parse_chunked(body, loads):
+    """The current loop: large chunked reads, NDJSONDecoder, VerdictStream's list of pieces."""
+    stream = ollama_helper.VerdictStream()
+    for json_response in ollama_helper.iter_ndjson(response_from(body).iter_content(chunk_size=cmn.STREAM_CHUNK_BYTES), loads):
+        stream.feed(json_response.get("response", ""))
+    return stream.text()
+
+
+def parse_bulk(body, loads):
+    """"stream": false: one body, one parse."""
+    stream = ollama_helper.VerdictStream()
+    stream.feed(loads(response_from(body).content.decode("utf-8")).get("response", ""))
+    return stream.text()
+
+
+def variants():
+    """[(name, parse function, uses the bulk body)]"""
+    found = [
+        ("lines + json + str concat", parse_lines_concat, False),
+        ("chunked + json", lambda body: parse_chunked(body, JSON_LOADS), False),
+    ]
+    if orjson:
+        found.append(("chunked + orjson", lambda body: parse_chunked(body, orjson.loads), False))
+    found.append(("bulk + json", lambda body: parse_bulk(body, JSON_LOADS), True))
+    if orjson:
+        found.append(("bulk + orjson", lambda body: parse_bulk(body, orjson.loads), True))
+    return found
+
+
+def run(tokens, responses, repeat):
+    """Best-of-repeat seconds per response for each variant; returns [(name, seconds)]."""
+    stream_body, bulk_body = make_stream(tokens), make_bulk(tokens)
+    expected = parse_lines_concat(stream_body)
+    results = []
+    for name, parse, is_bulk in variants():
+        body = bulk_body if is_bulk else stream_body
+        if parse(body) != expected:
+            raise RuntimeError(f"{name} parsed a different response")
+        best = float("inf")
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            for _ in range(responses):
+                parse(body)
+            best = min(best, (time.perf_counter() - start_time) / responses)
+        results.append((name, best))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure client-side parse cost per response.")
+    parser.add_argument("--tokens", type=int, default=300, help="streamed pieces per response")
+    parser.add_argument("--responses", type=int, default=200, help="responses parsed per timing")
+    parser.add_argument("--repeat", type=int, default=5, help="timings per variant (best is reported)")
+    args = parser.parse_args(argv)
+
+    print(f"Parse Benchmark: {args.tokens} tokens/response | {len(make_stream(args.tokens))} bytes streamed | "
+          f"read size {cmn.STREAM_CHUNK_BYTES} | orjson {'available' if orjson else 'not installed'}")
+    results = run(args.tokens, args.responses, args.repeat)
+    baseline = results[0][1]
+    for name, seconds in results:
+        print(f"Parse: {name:28s} | {seconds * 1e6:9.1f} us/response | {seconds / args.tokens * 1e6:6.2f} us/token | {baseline / seconds:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
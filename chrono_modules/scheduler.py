@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+import threading
+
+# Task tuples are (prompt_id, model, prompt, layer, role)
+MODEL_INDEX = 1
+
+
+def count_model_swaps(tasks):
+    """Number of times consecutive tasks switch model."""
+    return sum(1 for prev, cur in zip(tasks, tasks[1:]) if prev[MODEL_INDEX] != cur[MODEL_INDEX])
+
+
+def group_tasks_by_model(tasks):
+    """Return {model: [tasks]} in first-seen model order, keeping task order within a model."""
+    groups = {}
+    for task in tasks:
+        groups.setdefault(task[MODEL_INDEX], []).append(task)
+    return groups
+
+
+def split_evenly(items, n):
+    """Split items into n contiguous parts whose sizes differ by at most one."""
+    size, extra = divmod(len(items), n)
+    parts, start = [], 0
+    for i in range(n):
+        end = start + size + (1 if i < extra else 0)
+        parts.append(items[start:end])
+        start = end
+    return parts
+
+
+def count_planned_swaps(phases):
+    """Model swaps of a [phase][worker] plan, each worker running its phases in order."""
+    n_workers = len(phases[0]) if phases else 0
+    return sum(count_model_swaps([task for phase in phases for task in phase[w]]) for w in range(n_workers))
+
+
+def plan_model_phases(tasks, n_workers, max_loaded_models):
+    """Assign tasks to workers so each worker sticks to as few models as possible; returns [phase][worker] task lists.
+
+    Models are processed in phases of at most max_loaded_models models. Within a
+    phase, workers are shared out between models in proportion to their task
+    counts; with fewer workers than models, whole models go to the least-loaded
+    worker. The models in use at once only fit the server's memory budget if
+    no worker starts a phase before every worker has finished the previous
+    one, so engines wait at a barrier between phases.
+    """
+    groups = group_tasks_by_model(tasks)
+    models = list(groups)
+    budget = max(1, min(max_loaded_models, len(models)))
+    phases = []
+
+    for phase_start in range(0, len(models), budget):
+        phase_models = models[phase_start:phase_start + budget]
+        worker_tasks = [[] for _ in range(n_workers)]
+        phases.append(worker_tasks)
+        if n_workers >= len(phase_models):
+            # Largest-remainder share of workers per model, at least one each
+            total = sum(len(groups[m]) for m in phase_models)
+            spare = n_workers - len(phase_models)
+            shares = {m: 1 + spare * len(groups[m]) / total for m in phase_models}
+            counts = {m: int(shares[m]) for m in phase_models}
+            leftover = n_workers - sum(counts.values())
+            for m in sorted(phase_models, key=lambda m: shares[m] - counts[m], reverse=True)[:leftover]:
+                counts[m] += 1
+            worker = 0
+            for m in phase_models:
+                for part in split_evenly(groups[m], counts[m]):
+                    worker_tasks[worker].extend(part)
+                    worker += 1
+        else:
+            loads = [0] * n_workers
+            for m in sorted(phase_models, key=lambda m: len(groups[m]), reverse=True):
+                worker = loads.index(min(loads))
+                worker_tasks[worker].extend(groups[m])
+                loads[worker] += len(groups[m])
+
+    return phases
+
+
+class ModelPhaseLog:
+    """Records which model each worker runs to count real swaps and per-model phase timings."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_model = {}  # {worker_id: model}
+        self.swaps = 0
+        self.phases = {}  # {model: {"tasks", "busy_seconds", "first_start", "last_end"}}
+
+    def record(self, worker_id, model, start_time, end_time):
+        with self.lock:
+            if self.last_model.get(worker_id, model) != model:
+                self.swaps += 1
+            self.last_model[worker_id] = model
+            phase = self.phases.setdefault(
+                model, {"tasks": 0, "busy_seconds": 0.0, "first_start": start_time, "last_end": end_time}
+            )
+            phase["tasks"] += 1
+            phase["busy_seconds"] += end_time - start_time
+            phase["first_start"] = min(phase["first_start"], start_time)
+            phase["last_end"] = max(phase["last_end"], end_time)
+
+    def summary(self):
+        with self.lock:
+            return {"swaps": self.swaps, "phases": {m: dict(p) for m, p in self.phases.items()}}
+
+    @staticmethod
+    def merge_summaries(summaries):
+        merged = {"swaps": 0, "phases": {}}
+        for summary in summaries:
+            merged["swaps"] += summary["swaps"]
+            for model, phase in summary["phases"].items():
+                if model not in merged["phases"]:
+                    merged["phases"][model] = dict(phase)
+                    continue
+                total = merged["phases"][model]
+                total["tasks"] += phase["tasks"]
+                total["busy_seconds"] += phase["busy_seconds"]
+                total["first_start"] = min(total["first_start"], phase["first_start"])
+                total["last_end"] = max(total["last_end"], phase["last_end"])
+        return merged
+
+    @staticmethod
+    def print_summary(summary, planned_swaps=None):
+        if planned_swaps is not None:
+            print(f"Planned Model Swaps: {planned_swaps}")
+        print(f"Model Swaps: {summary['swaps']}")
+        for model, phase in sorted(summary["phases"].items(), key=lambda item: item[1]["first_start"]):
+            print(
+                f"Model: {model} | Tasks: {phase['tasks']} | "
+                f"Phase: {phase['last_end'] - phase['first_start']:.2f} seconds | Busy: {phase['busy_seconds']:.2f} seconds"
+            )
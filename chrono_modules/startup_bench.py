@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+##########################################
+# Cold-start benchmark of each entry point: interpreter start plus imports
+#
+# $ python -m chrono_modules.startup_bench [-e serial,mpi] [--repeat 5] [--ranks 16] [--check] [--scale 1.5]
+#
+# Every run starts fresh interpreters with -X importtime that import what the
+# entry point imports before its first request. With --ranks N, N of them
+# start at once and the slowest counts, as when an MPI job waits for its last
+# rank. --check exits 1 when an entry point exceeds its cold-start budget
+# (one interpreter at a time, times --scale for slower machines) or imports
+# a module it must not.
+##########################################
+
+import argparse
+import importlib.util
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Never needed before the first request: rich is only for opt-in console loggers,
+# matplotlib only for perf_monitor --plot, pdb only for debugging
+FORBIDDEN = ("rich", "matplotlib", "pdb")
+
+# name -> (modules imported, cold-start budget in ms, packages it must not import besides FORBIDDEN)
+ENTRY_POINTS = {
+    "serial": (("main", "chrono_modules.engines.serial"), 350, ("aiohttp", "mpi4py")),
+    "threads": (("main", "chrono_modules.engines.threads"), 350, ("aiohttp", "mpi4py")),
+    "processes": (("main", "chrono_modules.engines.processes"), 350, ("aiohttp", "mpi4py")),
+    "async": (("main", "chrono_modules.engines.async_engine"), 550, ("requests", "mpi4py")),
+    "mpi": (("main", "chrono_modules.engines.mpi"), 750, ("aiohttp",)),
+    "analytics": (("chrono_modules.analytics",), 300, ("requests", "aiohttp", "mpi4py")),
+    "perf_monitor": (("classes.perf_monitor",), 300, ("requests", "aiohttp", "mpi4py")),
+    "benchmark": (("benchmark",), 250, ("requests", "aiohttp", "mpi4py")),
+    "mock_ollama": (("chrono_modules.mock_ollama",), 150, ("numpy", "requests", "aiohttp", "mpi4py")),
+}
+# Entry points that need an optional package to import at all
+REQUIRES = {"async": "aiohttp", "mpi": "mpi4py", "perf_monitor": "psutil"}
+
+
+def parse_importtime(stderr):
+    """{module: self microseconds} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # The header line
+        modules[fields[2].strip()] = int(fields[0])
+    return modules
+
+
+def by_package(modules):
+    """Self time summed per top-level package, in ms, heaviest first."""
+    packages = {}
+    for name, microseconds in modules.items():
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + microseconds / 1e3
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+
+def start(statement, ranks):
+    """Wall seconds until `ranks` interpreters running statement at once have all exited, and the first one's stderr."""
+    start_time = time.perf_counter()
+    processes = [
+        subprocess.Popen([sys.executable, "-X", "importtime", "-c", statement], cwd=ROOT,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        for _ in range(ranks)
+    ]
+    outputs = [process.communicate()[1] for process in processes]
+    wall = time.perf_counter() - start_time
+    for process, output in zip(processes, outputs):
+        if process.returncode:
+            raise RuntimeError(f"{statement!r} failed:\n{output[-2000:]}")
+    return wall, outputs[0]
+
+
+def measure(modules, repeat, ranks=1):
+    """Median cold start and import time in ms over repeat runs, and the imported modules of the last run."""
+    statement = "; ".join(f"import {module}" for module in modules)
+    walls, imports = [], []
+    for _ in range(repeat):
+        wall, stderr = start(statement, ranks)
+        imported = parse_importtime(stderr)
+        walls.append(wall * 1e3)
+        imports.append(sum(imported.values()) / 1e3)
+    return {"cold_start_ms": statistics.median(walls), "import_ms": statistics.median(imports), "modules": imported}
+
+
+def check(name, result, scale, ranks=1):
+    """Budget and import violations of one entry point's result; empty when it passes.
+
+    Budgets are for one interpreter at a time, so with ranks > 1 only the
+    imports are checked.
+    """
+    _, budget, forbidden = ENTRY_POINTS[name]
+    packages = {module.split(".")[0] for module in result["modules"]}
+    problems = [f"imports {package}" for package in FORBIDDEN + forbidden if package in packages]
+    if ranks == 1 and result["cold_start_ms"] > budget * scale:
+        problems.append(f"cold start {result['cold_start_ms']:.0f} ms over budget {budget * scale:.0f} ms")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold-start time and imports of each entry point.")
+    parser.add_argument("-e", "--entry-points", default=",".join(ENTRY_POINTS), help="comma-separated entry points")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per entry point (the median is reported)")
+    parser.add_argument("--ranks", type=int, default=1, help="interpreters started at once; the slowest counts")
+    parser.add_argument("--top", type=int, default=5, help="heaviest packages listed per entry point")
+    parser.add_argument("--check", action="store_true", help="exit 1 on a budget overrun or forbidden import")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget, e.g. on slower machines")
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.entry_points.split(",") if name.strip()]
+    unknown = [name for name in names if name not in ENTRY_POINTS]
+    if unknown:
+        raise SystemExit(f"Unknown entry points: {', '.join(unknown)} (choose from {', '.join(ENTRY_POINTS)})")
+
+    baseline = measure((), args.repeat, args.ranks)
+    print(f"Startup Benchmark: {args.repeat} runs | {args.ranks} interpreter(s) at once | "
+          f"bare interpreter {baseline['cold_start_ms']:.0f} ms | {sys.executable}")
+    failures = 0
+    for name in names:
+        required = REQUIRES.get(name)
+        if required and importlib.util.find_spec(required) is None:
+            print(f"Startup: {name:12s} | skipped ({required} not installed)")
+            continue
+        result = measure(ENTRY_POINTS[name][0], args.repeat, args.ranks)
+        heaviest = ", ".join(f"{package} {ms:.0f}" for package, ms in by_package(result["modules"])[:args.top])
+        problems = check(name, result, args.scale, args.ranks)
+        budget = f" (budget {ENTRY_POINTS[name][1] * args.scale:.0f})" if args.ranks == 1 else ""
+        failures += bool(problems)
+        print(
+            f"Startup: {name:12s} | cold start {result['cold_start_ms']:6.0f} ms{budget} | "
+            f"imports {result['import_ms']:6.0f} ms | heaviest (ms): {heaviest}"
+            + (f" | FAIL: {'; '.join(problems)}" if problems else "")
+        )
+    if args.check and failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
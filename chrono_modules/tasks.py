@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+
+import atexit
+import hashlib
+import json
+import multiprocessing.util
+import os
+import threading
+import time
+import chrono_modules.io as io
+import chrono_modules.ollama_helper as ollama_helper
+import resources.chrono_logging as chrono_logging
+import resources.common as cmn
+from classes.DecisionResult import DecisionResult
+from classes.JustificationArena import JustificationArena
+from classes.PromptPipeline import PromptPipeline
+from classes.QuorumTracker import QuorumTracker
+from classes.RequestPolicy import RequestPolicy
+from classes.ResultJournal import ResultJournal
+from classes.ResultStore import ResultStore
+from classes.BackendPool import BackendPool
+from classes.ConcurrencyController import ConcurrencyController
+from classes.TokenMetricTracker import TokenMetricsTracker
+
+# Constants
+DEFAULT_ROLE = "Generalist"
+IS_MEASURE_QUERY_RESPONSE_TIME = True
+
+# Task tuples are (prompt_id, model, prompt, layer, role)
+
+
+def read_prompts(path):
+    """Read the non-empty prompts of a prompt file."""
+    return list(io.iter_prompts(path))
+
+
+def votes_per_prompt(models, roles):
+    return len(models) + len(models) * len(roles)
+
+
+def iter_tasks(prompts, models, roles):
+    """Yield the (prompt, model, role) task grid shared by every engine, prompt by prompt."""
+    for prompt_id, prompt in enumerate(prompts):
+        # Layer 2: Query each model as Generalist
+        for model in models:
+            yield (prompt_id, model, ollama_helper.generate_prompt(prompt, layer=2), 2, DEFAULT_ROLE)
+
+        # Layer 3: Query each model with role-specific prompts
+        for model in models:
+            for role in roles:
+                yield (prompt_id, model, prompt, 3, role)
+
+
+def build_tasks(prompts, models, roles):
+    return list(iter_tasks(prompts, models, roles))
+
+
+def make_quorum(models, roles):
+    """Create a quorum tracker configured from resources/common.py."""
+    return QuorumTracker(
+        votes_per_prompt(models, roles),
+        mode=cmn.QUORUM_MODE, confidence=cmn.QUORUM_CONFIDENCE, min_votes=cmn.QUORUM_MIN_VOTES,
+    )
+
+
+def is_pipelined():
+    """True when layer-3 tasks wait for their prompt's earlier results (CHRONO_FEEDBACK)."""
+    return cmn.FEEDBACK_MODE != "off"
+
+
+def make_pipeline(tasks, concurrency):
+    """PromptPipeline over tasks, keeping enough prompts in flight for concurrency parallel requests."""
+    return PromptPipeline(
+        tasks, mode=cmn.FEEDBACK_MODE, max_prompts=cmn.PIPELINE_PROMPTS or 2 * concurrency, resumed=_resumed_counts,
+    )
+
+
+def render_prompt(task, agree_count=-1, decision_count=-1):
+    """Return the final prompt text of a task; layer-3 prompts are generated here."""
+    _, _, prompt, layer, role = task
+    if layer == 3:
+        return ollama_helper.generate_prompt(prompt, layer=3, role=role, agree_count=agree_count, decision_count=decision_count)
+    return prompt
+
+
+def score_response(response):
+    """Return (agree, decision) for a response; a missing response is no decision."""
+    if response:
+        result = ollama_helper.process_response(response)
+        return result.agree, result.decision
+    return 0, 0
+
+
+def make_result(task, agree, decision, start_time, end_time, response=None):
+    """DecisionResult of a finished task; the response text is only kept with CHRONO_JUSTIFICATIONS set."""
+    return DecisionResult(task[0], agree, decision, end_time - start_time, response if cmn.JUSTIFICATIONS and decision else None)
+
+
+def get_task_log():
+    """This process's queued task log (CHRONO_TASK_LOG, CHRONO_TASK_LOG_DIR)."""
+    return chrono_logging.get_task_log(cmn.TASK_LOG, cmn.TASK_LOG_DIR, cmn.TASK_LOG_BATCH, cmn.TASK_LOG_FLUSH_SECONDS)
+
+
+def log_task_time(task, start_time, end_time):
+    task_log = get_task_log()
+    # One flag check; "summary" without CHRONO_TASK_LOG_DIR and "off" build nothing
+    if IS_MEASURE_QUERY_RESPONSE_TIME and task_log.is_info:
+        prompt_id, model, _, layer, role = task
+        role, seconds = role or DEFAULT_ROLE, end_time - start_time
+        task_log.info(
+            "Task: %s-%s | Layer: %s | Time: %.2f seconds", model, role, layer, seconds,
+            prompt_id=prompt_id, model=model, role=role, layer=layer, seconds=seconds,
+        )
+
+
+def log_task_error(task, error):
+    prompt_id, model, _, layer, role = task
+    get_task_log().logger.error(
+        "Error processing task %s: %s", task, error,
+        extra={"fields": {"prompt_id": prompt_id, "model": model, "role": role or DEFAULT_ROLE, "layer": layer}},
+    )
+
+
+def run_task(task, agree_count=-1, decision_count=-1):
+    """Process a single task and return its DecisionResult (unpacks as prompt_id, agree, decision)."""
+    prompt_id, model = task[0], task[1]
+    ollama_helper.set_request_tags(layer=task[3], role=task[4])
+    start_time = time.time()
+    try:
+        response = ollama_helper.query_ollama(model, render_prompt(task, agree_count, decision_count))
+    except Exception as e:
+        end_time = time.time()
+        if ollama_helper.is_request_cancelled():
+            # Another rank finished this task and journals it
+            return make_result(task, 0, 0, start_time, end_time)
+        log_task_error(task, e)
+        journal_result(task, (prompt_id, 0, 0), start_time, end_time)
+        return make_result(task, 0, 0, start_time, end_time)
+    end_time = time.time()
+    log_task_time(task, start_time, end_time)
+    agree, decision = score_response(response)
+    journal_result(task, (prompt_id, agree, decision), start_time, end_time)
+    return make_result(task, agree, decision, start_time, end_time, response)
+
+
+##############################
+# Result store
+##############################
+_arena = None
+_arena_pid = None
+_arena_lock = threading.Lock()
+
+
+def get_arena():
+    """Return this process's justification arena, or None when texts are not kept."""
+    global _arena, _arena_pid
+    if not cmn.JUSTIFICATIONS:
+        return None
+    pid = os.getpid()
+    if _arena is None or _arena_pid != pid:
+        with _arena_lock:
+            if _arena is None or _arena_pid != pid:
+                _arena = JustificationArena(None if cmn.JUSTIFICATIONS == "memory" else cmn.JUSTIFICATIONS)
+                _arena_pid = pid
+    return _arena
+
+
+def make_result_store(capacity=1024):
+    """Empty ResultStore, keeping texts in this process's arena when CHRONO_JUSTIFICATIONS is set."""
+    return ResultStore(capacity, get_arena())
+
+
+##############################
+# Result journal
+##############################
+_journal = None
+_journal_pid = None
+_journal_lock = threading.Lock()
+
+
+def get_journal():
+    """Return this process's result journal, or None when CHRONO_JOURNAL_DIR is unset."""
+    global _journal, _journal_pid
+    if not cmn.JOURNAL_DIR:
+        return None
+    pid = os.getpid()
+    if _journal is None or _journal_pid != pid:
+        with _journal_lock:
+            if _journal is None or _journal_pid != pid:
+                journal = ResultJournal(cmn.JOURNAL_DIR, batch_size=cmn.JOURNAL_BATCH, flush_seconds=cmn.JOURNAL_FLUSH_SECONDS)
+                # Flush the last batch at exit; pool workers skip atexit, so also register a multiprocessing finalizer
+                atexit.register(journal.close)
+                multiprocessing.util.Finalize(None, journal.close, exitpriority=10)
+                _journal, _journal_pid = journal, pid
+    return _journal
+
+
+def task_fingerprint(task):
+    """Short hash of a task's prompt, so a resume against an edited prompt file reruns changed prompts."""
+    return hashlib.sha256(task[2].encode("utf-8")).hexdigest()[:16]
+
+
+def journal_result(task, result, start_time, end_time):
+    journal = get_journal()
+    if journal:
+        prompt_id, model, _, layer, role = task
+        journal.append({
+            "prompt_id": prompt_id, "model": model, "role": role, "layer": layer,
+            "agree": result[1], "decision": result[2], "prompt_sha": task_fingerprint(task),
+            "start": start_time, "end": end_time,
+        })
+
+
+# Journaled counts of the tasks skip_completed() skipped: {prompt_id: {layer: [agree, decision]}}
+_resumed_counts = {}
+
+
+def skip_completed(tasks, records, on_resumed):
+    """Yield the tasks without a decided journal record; journaled results go to on_resumed instead.
+
+    The skipped results are also added to the resumed counts, so the prompt's
+    remaining layer-3 tasks carry the same counts as in an uninterrupted run.
+    """
+    for task in tasks:
+        record = records.get(ResultJournal.task_key(task[0], task[1], task[3], task[4]))
+        if record and record["decision"] and record["prompt_sha"] == task_fingerprint(task):
+            counts = _resumed_counts.setdefault(task[0], {2: [0, 0], 3: [0, 0]})[task[3]]
+            counts[0] += record["agree"]
+            counts[1] += record["decision"]
+            on_resumed((task[0], record["agree"], record["decision"]))
+        else:
+            yield task
+
+
+def get_resumed_counts():
+    return _resumed_counts
+
+
+def set_resumed_counts(counts):
+    """Replace the resumed counts, e.g. with the root's on the other MPI ranks."""
+    _resumed_counts.clear()
+    _resumed_counts.update(counts)
+
+
+def resumed_count(prompt_id, layers=(2, 3)):
+    """(agree, decision) summed over the prompt's resumed tasks of the given layers."""
+    counts = _resumed_counts.get(prompt_id)
+    if not counts:
+        return 0, 0
+    return sum(counts[layer][0] for layer in layers), sum(counts[layer][1] for layer in layers)
+
+
+def aggregate_results(results):
+    """Sum (prompt_id, agree, decision) results into {prompt_id: {"agree": int, "decision": int}}."""
+    if isinstance(results, ResultStore):
+        return results.aggregate()
+    aggregated = {}
+    for prompt_id, agree, decision in results:
+        if prompt_id not in aggregated:
+            aggregated[prompt_id] = {"agree": 0, "decision": 0}
+        aggregated[prompt_id]["agree"] += agree
+        aggregated[prompt_id]["decision"] += decision
+    return aggregated
+
+
+def print_results(aggregated):
+    """Log results per prompt."""
+    for prompt_id in sorted(aggregated):
+        print_prompt_result(prompt_id, aggregated[prompt_id]["agree"], aggregated[prompt_id]["decision"])
+
+
+def print_prompt_result(prompt_id, agree, decision):
+    score = agree / decision if decision > 0 else 0
+    print(f"----------------------")
+    print(f"Prompt ID: {prompt_id}")
+    print(f"Total Agreements: {agree}")
+    print(f"Total Decisions (# of queries made): {decision}")
+    print(f"Agreement Percentage: {score * 100:.2f}%")
+    print(f"----------------------")
+
+
+def collect_stats(connection_stats=None):
+    """Snapshot this process's connection, cache and backend counters, request telemetry, concurrency decisions and task log."""
+    controller = ollama_helper.get_concurrency_controller()
+    task_log = get_task_log()
+    task_log.drain()
+    return {
+        "connections": connection_stats or ollama_helper.connection_stats(),
+        "cache": ollama_helper.cache_stats(),
+        "backends": ollama_helper.backend_stats(),
+        "requests": ollama_helper.request_stats(),
+        "telemetry": ollama_helper.get_telemetry().summary(),
+        "concurrency": [{"pid": os.getpid(), **controller.summary()}] if controller else [],
+        "task_log": task_log.stats(),
+    }
+
+
+def merge_stats(stats_list):
+    """Combine collect_stats() snapshots from several processes."""
+    return {
+        "connections": {key: sum(s["connections"][key] for s in stats_list) for key in stats_list[0]["connections"]},
+        "cache": {key: sum(s["cache"][key] for s in stats_list) for key in stats_list[0]["cache"]},
+        "backends": BackendPool.merge_stats([s["backends"] for s in stats_list]),
+        "requests": RequestPolicy.merge_summaries([s["requests"] for s in stats_list]),
+        "telemetry": TokenMetricsTracker.merge_summaries([s["telemetry"] for s in stats_list]),
+        "concurrency": [summary for s in stats_list for summary in s["concurrency"]],
+        "task_log": chrono_logging.TaskLog.merge_stats([s["task_log"] for s in stats_list]),
+    }
+
+
+def print_stats(stats):
+    ollama_helper.print_connection_stats(stats["connections"])
+    ollama_helper.print_cache_stats(stats["cache"])
+    ollama_helper.print_backend_stats(stats["backends"])
+    ollama_helper.print_request_stats(stats["requests"])
+    print_telemetry(stats["telemetry"])
+    print_concurrency(stats["concurrency"])
+    chrono_logging.TaskLog.print_stats(stats["task_log"], cmn.TASK_LOG_DIR)
+
+
+def print_concurrency(summaries):
+    """Print each process's adaptive concurrency outcome and, with CHRONO_TELEMETRY_DIR set, log its decisions."""
+    for summary in summaries:
+        ConcurrencyController.print_summary(summary, f" [pid {summary['pid']}]" if len(summaries) > 1 else "")
+    if summaries and cmn.TELEMETRY_DIR:
+        os.makedirs(cmn.TELEMETRY_DIR, exist_ok=True)
+        path = os.path.join(cmn.TELEMETRY_DIR, "concurrency.jsonl")
+        with open(path, "w") as f:
+            for summary in summaries:
+                for decision in summary["decisions"]:
+                    f.write(json.dumps({"pid": summary["pid"], "mode": summary["mode"], **decision}) + "\n")
+        print(f"Concurrency decisions written to {path}")
+
+
+def print_telemetry(summary):
+    """Print the telemetry summary and, with CHRONO_TELEMETRY_DIR set, merge the per-process record files."""
+    TokenMetricsTracker.print_summary(summary)
+    if cmn.TELEMETRY_DIR:
+        os.makedirs(cmn.TELEMETRY_DIR, exist_ok=True)
+        TokenMetricsTracker.merge_files(summary["files"], os.path.join(cmn.TELEMETRY_DIR, "telemetry.jsonl"))
+        TokenMetricsTracker.write_histograms(summary, os.path.join(cmn.TELEMETRY_DIR, "telemetry_histograms.json"))
+        print(f"Telemetry: {summary['records']} records written to {cmn.TELEMETRY_DIR}")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+import os
+import time
+import threading
+
+
+class Backend:
+    """One Ollama server endpoint and its load/health counters."""
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.completed = 0
+        self.failed = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.busy_seconds = 0.0
+        self.first_start = None
+        self.last_end = None
+        self.models = set()  # Models this backend is known to have loaded
+
+    def is_healthy(self, now):
+        return now >= self.ejected_until
+
+
+class BackendPool:
+    """Routes each request to the least-loaded healthy Ollama backend.
+
+    Among healthy backends the one with the fewest outstanding requests wins;
+    ties go to a backend that already has the model loaded. A backend that
+    fails max_failures times in a row is ejected for eject_seconds and then let
+    back in on probation: one more failure ejects it again.
+    """
+    def __init__(self, urls, max_failures=3, eject_seconds=30):
+        self.backends = [Backend(url) for url in urls]
+        if not self.backends:
+            raise ValueError("BackendPool needs at least one backend URL (check OLLAMA_BACKENDS)")
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.lock = threading.Lock()
+        # Different processes (MPI ranks) start their tie-breaking on different backends
+        self.rotation = os.getpid() % len(self.backends)
+
+    def acquire(self, model_name):
+        """Pick a backend for model_name and count the request as outstanding on it."""
+        now = time.time()
+        with self.lock:
+            candidates = [b for b in self.backends if b.is_healthy(now)]
+            if not candidates:
+                # Everything is ejected; retry the one that comes back soonest
+                candidates = [min(self.backends, key=lambda b: b.ejected_until)]
+            self.rotation = (self.rotation + 1) % len(self.backends)
+            n = len(self.backends)
+            backend = min(
+                candidates,
+                key=lambda b: (
+                    b.outstanding,
+                    model_name not in b.models,
+                    (self.backends.index(b) - self.rotation) % n,
+                ),
+            )
+            backend.outstanding += 1
+            if backend.first_start is None:
+                backend.first_start = now
+        return backend, now
+
+    def release(self, backend, model_name, start_time, is_ok):
+        """Record the outcome of a request started with acquire()."""
+        now = time.time()
+        with self.lock:
+            backend.outstanding -= 1
+            backend.busy_seconds += now - start_time
+            backend.last_end = now
+            if is_ok:
+                backend.completed += 1
+                backend.consecutive_failures = 0
+                backend.ejected_until = 0.0
+                backend.models.add(model_name)
+                return
+            backend.failed += 1
+            backend.consecutive_failures += 1
+            # A backend back from ejection (ejected_until still set) gets no second chance
+            if backend.consecutive_failures >= self.max_failures or backend.ejected_until:
+                backend.ejected_until = now + self.eject_seconds
+                backend.models.clear()
+
+    def set_loaded_models(self, url, models):
+        """Replace the known loaded models of a backend (e.g. from /api/ps)."""
+        with self.lock:
+            for backend in self.backends:
+                if backend.url == url.rstrip("/"):
+                    backend.models = set(models)
+
+    def stats(self):
+        """Return per-backend counters; merge_stats() combines them across processes."""
+        with self.lock:
+            return [
+                {
+                    "url": b.url,
+                    "completed": b.completed,
+                    "failed": b.failed,
+                    "busy_seconds": b.busy_seconds,
+                    "first_start": b.first_start,
+                    "last_end": b.last_end,
+                }
+                for b in self.backends
+            ]
+
+    @staticmethod
+    def merge_stats(stats_lists):
+        merged = {}
+        for stats in stats_lists:
+            for entry in stats:
+                if entry["url"] not in merged:
+                    merged[entry["url"]] = dict(entry)
+                    continue
+                total = merged[entry["url"]]
+                total["completed"] += entry["completed"]
+                total["failed"] += entry["failed"]
+                total["busy_seconds"] += entry["busy_seconds"]
+                starts = [t for t in (total["first_start"], entry["first_start"]) if t is not None]
+                ends = [t for t in (total["last_end"], entry["last_end"]) if t is not None]
+                total["first_start"] = min(starts) if starts else None
+                total["last_end"] = max(ends) if ends else None
+        return list(merged.values())
+
+    @staticmethod
+    def print_stats(stats):
+        for entry in stats:
+            span = (entry["last_end"] - entry["first_start"]) if entry["first_start"] and entry["last_end"] else 0
+            throughput = entry["completed"] / span if span > 0 else 0
+            mean_latency = entry["busy_seconds"] / (entry["completed"] + entry["failed"]) if entry["completed"] + entry["failed"] else 0
+            print(
+                f"Backend: {entry['url']} | Completed: {entry['completed']} | Failed: {entry['failed']} | "
+                f"Throughput: {throughput:.2f} req/s | Mean Latency: {mean_latency:.2f} seconds"
+            )
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+import contextlib
+import math
+import statistics
+import threading
+import time
+
+
+class ConcurrencyController:
+    """Adapts how many requests may be in flight to the latency and errors the server shows.
+
+    Completed requests are judged in windows of max(limit, min_window)
+    samples. The latency of a request is its time to first token when
+    streamed, which grows as soon as requests queue for a server slot. The
+    lowest window median seen is the no-load baseline. A window with errors
+    multiplies the limit by backoff. Otherwise:
+
+    - mode "aimd" adds one while throughput improves by more than gain,
+      multiplies by backoff once latency passes tolerance x baseline, and
+      holds on flat throughput.
+    - mode "gradient" moves the limit towards limit x min(1, tolerance x
+      baseline / latency) + sqrt(limit): it probes upward while latency stays
+      near the baseline and shrinks in proportion once requests queue.
+
+    Every window's decision is kept in decisions.
+    """
+    def __init__(self, initial=2, minimum=1, maximum=64, mode="aimd", tolerance=2.0,
+                 backoff=0.75, gain=0.05, min_window=8, smoothing=0.5):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.mode = mode
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.gain = gain
+        self.min_window = min_window
+        self.smoothing = smoothing
+        self.initial = self._clamp(initial)
+        self.limit = float(self.initial)
+        self.inflight = 0
+        self.baseline = None
+        self.last_throughput = None
+        self.latencies = []
+        self.errors = 0
+        self.start_time = self.window_start = time.time()
+        self.decisions = []
+        self.changed = threading.Condition()
+
+    def _clamp(self, limit):
+        return min(max(limit, self.minimum), self.maximum)
+
+    @property
+    def allowed(self):
+        """Requests that may be in flight now."""
+        return int(self.limit)
+
+    def try_acquire(self):
+        """Take an in-flight slot if the limit allows; never blocks."""
+        with self.changed:
+            if self.inflight >= self.allowed:
+                return False
+            self.inflight += 1
+            return True
+
+    def release(self):
+        with self.changed:
+            self.inflight -= 1
+            self.changed.notify()
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Hold one in-flight slot, waiting while the limit is reached."""
+        with self.changed:
+            while self.inflight >= self.allowed:
+                self.changed.wait()
+            self.inflight += 1
+        try:
+            yield
+        finally:
+            self.release()
+
+    def record(self, latency, is_ok):
+        """Add one finished request; closes the window and adjusts the limit when it is full."""
+        with self.changed:
+            if is_ok:
+                self.latencies.append(latency)
+            else:
+                self.errors += 1
+            if len(self.latencies) + self.errors < max(self.allowed, self.min_window):
+                return
+            old_allowed = self.allowed
+            decision = self._decide(time.time())
+            self.decisions.append(decision)
+            if self.allowed > old_allowed:
+                self.changed.notify_all()
+
+    def _decide(self, now):
+        samples = len(self.latencies) + self.errors
+        throughput = samples / max(now - self.window_start, 1e-9)
+        latency = statistics.median(self.latencies) if self.latencies else None
+        if latency is not None:
+            self.baseline = latency if self.baseline is None else min(self.baseline, latency)
+        old_limit = self.limit
+
+        if self.errors:
+            limit, reason = old_limit * self.backoff, "errors"
+        elif self.mode == "gradient":
+            gradient = max(0.5, min(1.0, self.tolerance * self.baseline / latency)) if latency else 1.0
+            target = old_limit * gradient + math.sqrt(old_limit)
+            limit = old_limit + self.smoothing * (target - old_limit)
+            reason = "probe" if gradient == 1.0 else "latency"
+        elif latency is not None and latency > self.tolerance * self.baseline:
+            limit, reason = old_limit * self.backoff, "latency"
+        elif self.last_throughput is None or throughput > self.last_throughput * (1 + self.gain):
+            limit, reason = old_limit + 1, "throughput up"
+        else:
+            limit, reason = old_limit, "throughput flat"
+
+        self.limit = float(self._clamp(limit))
+        self.last_throughput = throughput
+        decision = {
+            "time": now - self.start_time,
+            "limit": int(old_limit),
+            "new_limit": self.allowed,
+            "reason": reason,
+            "samples": samples,
+            "errors": self.errors,
+            "throughput": throughput,
+            "latency": latency,
+            "baseline": self.baseline,
+        }
+        self.latencies = []
+        self.errors = 0
+        self.window_start = now
+        return decision
+
+    def summary(self):
+        """Start, final and settled limits plus every decision; the settled limit is the most common over the last half."""
+        with self.changed:
+            decisions = list(self.decisions)
+        limits = [decision["new_limit"] for decision in decisions[len(decisions) // 2:]]
+        return {
+            "mode": self.mode,
+            "initial": self.initial,
+            "final": self.allowed,
+            "settled": statistics.mode(limits) if limits else self.allowed,
+            "low": min((d["new_limit"] for d in decisions), default=self.allowed),
+            "high": max((d["new_limit"] for d in decisions), default=self.allowed),
+            "decisions": decisions,
+        }
+
+    @staticmethod
+    def print_summary(summary, label=""):
+        changes = sum(1 for decision in summary["decisions"] if decision["new_limit"] != decision["limit"])
+        print(
+            f"Adaptive Concurrency{label} ({summary['mode']}): start {summary['initial']} | "
+            f"settled {summary['settled']} | final {summary['final']} | range {summary['low']}-{summary['high']} | "
+            f"{len(summary['decisions'])} windows, {changes} changes"
+        )
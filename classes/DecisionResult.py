@@ -1,7 +1,26 @@
 #!/usr/bin/env python3
 
 class DecisionResult:
-    """Dataclass to represent decision results"""
-    def __init__(self, decision, justification):
+    """One task's outcome as a slotted record: prompt id, TRUE vote, verdict returned, seconds and text.
+
+    Unpacks like the (prompt_id, agree, decision) tuples the counters use.
+    justification is only set when texts are kept (CHRONO_JUSTIFICATIONS).
+    """
+    __slots__ = ("prompt_id", "agree", "decision", "seconds", "justification")
+
+    def __init__(self, prompt_id, agree, decision, seconds=None, justification=None):
+        self.prompt_id = prompt_id
+        self.agree = agree
         self.decision = decision
-        self.justification = justification
\ No newline at end of file
+        self.seconds = seconds
+        self.justification = justification
+
+    def __iter__(self):
+        return iter((self.prompt_id, self.agree, self.decision))
+
+    def __reduce__(self):
+        # Plain argument tuple instead of the default slot-state dict
+        return DecisionResult, (self.prompt_id, self.agree, self.decision, self.seconds, self.justification)
+
+    def __repr__(self):
+        return f"DecisionResult({self.prompt_id}, {self.agree}, {self.decision}, {self.seconds})"
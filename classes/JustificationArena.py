@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+import mmap
+import os
+import socket
+import threading
+
+
+class JustificationArena:
+    """Append-only store of response texts, addressed by (offset, length) in UTF-8 bytes.
+
+    Without a directory the texts sit in one bytearray. With one, every
+    process appends to its own file there and reads texts back through a
+    memory map, so they need not stay in RAM. drop() discards the texts while
+    the offsets held by result stores stay valid (get() returns None).
+    """
+    def __init__(self, directory=None):
+        self.lock = threading.Lock()
+        self.map = None
+        self.is_dropped = False
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.path = os.path.join(directory, f"justifications-{socket.gethostname()}-{os.getpid()}.txt")
+            self.buffer = None
+            self.file = open(self.path, "ab")
+            self.size = self.file.tell()
+        else:
+            self.path = None
+            self.buffer = bytearray()
+            self.file = None
+            self.size = 0
+
+    def add(self, text):
+        """Append text; returns its (offset, length)."""
+        data = text.encode("utf-8")
+        with self.lock:
+            offset = self.size
+            if self.file:
+                self.file.write(data)
+            elif self.buffer is not None:
+                self.buffer += data
+            self.size += len(data)
+        return offset, len(data)
+
+    def get(self, offset, length):
+        if offset < 0 or self.is_dropped:
+            return None
+        if self.buffer is not None:
+            return self.buffer[offset:offset + length].decode("utf-8")
+        with self.lock:
+            if self.map is None or len(self.map) < offset + length:
+                self._remap()
+            return self.map[offset:offset + length].decode("utf-8")
+
+    def _remap(self):
+        if self.file:
+            self.file.flush()
+        if self.map is not None:
+            self.map.close()
+        with open(self.path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def nbytes(self):
+        return self.size
+
+    def drop(self):
+        """Free the texts: clear the buffer, or close and delete this process's file."""
+        with self.lock:
+            self.is_dropped = True
+            if self.map is not None:
+                self.map.close()
+                self.map = None
+            if self.file:
+                self.file.close()
+                self.file = None
+                os.remove(self.path)
+            if self.buffer is not None:
+                self.buffer = bytearray()
+
+    def __getstate__(self):
+        # A file arena travels as its path (the receiver maps the file read-only), a memory arena with its bytes
+        with self.lock:
+            if self.file:
+                self.file.flush()
+            return {"path": self.path, "buffer": bytes(self.buffer) if self.buffer is not None else None,
+                    "size": self.size, "is_dropped": self.is_dropped}
+
+    def __setstate__(self, state):
+        self.lock = threading.Lock()
+        self.map = None
+        self.file = None
+        self.path = state["path"]
+        self.buffer = bytearray(state["buffer"]) if state["buffer"] is not None else None
+        self.size = state["size"]
+        self.is_dropped = state["is_dropped"]
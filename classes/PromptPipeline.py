@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+import threading
+from collections import deque
+
+WAIT = object()  # try_get(): nothing is ready until an outstanding task completes
+
+
+class PromptState:
+    """Tasks of one admitted prompt that are not released yet, and its running vote counts."""
+    __slots__ = ("layer3", "outstanding", "agree", "decision")
+
+    def __init__(self):
+        self.layer3 = deque()
+        self.outstanding = 0  # Released but not completed
+        self.agree = 0
+        self.decision = 0
+
+
+class PromptPipeline:
+    """Releases each prompt's tasks once the results they depend on are in, many prompts at a time.
+
+    Tasks are read in grid order (a prompt's tasks are contiguous, layer 2
+    first). A prompt's layer-2 tasks are independent and released at once.
+    Its layer-3 prompts carry the running agreement count, so with mode
+    "serial" they are released one at a time in task order, each with the
+    counts of everything before it: exactly the prompts the serial engine
+    sends. With mode "layer2" all layer-3 tasks are released together once
+    layer 2 is complete, carrying the layer-2 counts only. Up to max_prompts
+    prompts are in flight, so while one prompt waits on its chain the
+    workers run tasks of the others.
+
+    Items are (task_id, task, agree_count, decision_count); task ids number
+    the tasks in reading order. resumed ({prompt_id: {layer: [agree,
+    decision]}}) holds the journaled counts of tasks a resumed run skipped;
+    they seed each prompt's counts as it is admitted.
+    """
+    def __init__(self, tasks, mode="serial", max_prompts=8, resumed=None):
+        self.iterator = iter(tasks)
+        self.mode = mode
+        self.max_prompts = max(1, max_prompts)
+        self.resumed = {} if resumed is None else resumed
+        self.next_task = next(self.iterator, None)
+        self.next_task_id = 0
+        self.prompts = {}  # {prompt_id: PromptState} for prompts in flight
+        self.ready = deque()
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+
+    def _admit(self):
+        """Read the next prompt's tasks and release its layer-2 tasks."""
+        prompt_id = self.next_task[0]
+        state = self.prompts[prompt_id] = PromptState()
+        while self.next_task is not None and self.next_task[0] == prompt_id:
+            item = (self.next_task_id, self.next_task)
+            if self.next_task[3] == 2:
+                self._release(state, item)
+            else:
+                state.layer3.append(item)
+            self.next_task_id += 1
+            self.next_task = next(self.iterator, None)
+        # Read past the prompt's last task, so every skipped task of it is in resumed by now
+        resumed = self.resumed.pop(prompt_id, None)
+        if resumed:
+            for layer in (2, 3) if self.mode == "serial" else (2,):
+                state.agree += resumed[layer][0]
+                state.decision += resumed[layer][1]
+        if not state.outstanding:
+            self._release_layer3(state)  # e.g. resumed runs whose layer 2 is already journaled
+        if not state.outstanding:
+            del self.prompts[prompt_id]
+
+    def _release(self, state, item):
+        task_id, task = item
+        state.outstanding += 1
+        self.ready.append((task_id, task, state.agree, state.decision))
+
+    def _release_layer3(self, state):
+        if self.mode == "serial":
+            if state.layer3:
+                self._release(state, state.layer3.popleft())
+        else:
+            while state.layer3:
+                self._release(state, state.layer3.popleft())
+
+    def try_get(self):
+        """Next ready item, WAIT if tasks are in flight but none is ready, or None when everything is done."""
+        with self.lock:
+            return self._try_get()
+
+    def _try_get(self):
+        while not self.ready and self.next_task is not None and len(self.prompts) < self.max_prompts:
+            self._admit()
+        if self.ready:
+            return self.ready.popleft()
+        return WAIT if self.prompts else None
+
+    def get(self):
+        """Blocking try_get() for worker threads; None when everything is done."""
+        with self.changed:
+            while (item := self._try_get()) is WAIT:
+                self.changed.wait()
+            return item
+
+    def complete(self, task, result):
+        """Record a released task's result (None if it was skipped) and release what now can run."""
+        with self.changed:
+            state = self.prompts[task[0]]
+            state.outstanding -= 1
+            if result is not None:
+                _, agree, decision = result
+                state.agree += agree
+                state.decision += decision
+            # "serial" chains every layer-3 task; "layer2" waits for the whole layer-2 fan-out
+            if self.mode == "serial" and task[3] == 3 or not state.outstanding:
+                self._release_layer3(state)
+            if not state.outstanding and not state.layer3:
+                del self.prompts[task[0]]
+            self.changed.notify_all()
+
+    def take(self):
+        """Non-blocking get for a coordinator: the next ready item, or None."""
+        item = self.try_get()
+        return None if item is WAIT else item
+
+    def remaining(self):
+        return None  # Chunk sizing treats the pipeline like a stream of unknown length
+
+    def is_feeding(self):
+        """True while tasks remain that were never handed out."""
+        with self.lock:
+            return bool(self.ready) or self.next_task is not None or any(state.layer3 for state in self.prompts.values())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+import math
+import threading
+
+
+class QuorumTracker:
+    """Tracks TRUE/FALSE votes per prompt and decides when a prompt's verdict is fixed.
+
+    A prompt's verdict is TRUE when its agreement percentage ends above 50%.
+    The verdict is fixed once the outstanding votes can no longer flip it, or,
+    with a confidence level set, once the Beta posterior of the TRUE rate is at
+    least that sure which side of 50% it lies on.
+
+    mode "quorum" skips the remaining tasks of a decided prompt. mode "shadow"
+    runs the full grid but records where quorum would have stopped, so the
+    early verdicts can be compared with the full-grid ones.
+    """
+    def __init__(self, votes_per_prompt, mode="quorum", confidence=None, min_votes=3):
+        self.votes_per_prompt = votes_per_prompt
+        self.mode = mode
+        self.confidence = confidence
+        self.min_votes = min_votes
+        self.votes = {}  # {prompt_id: [agree, disagree, failed]}
+        self.early_verdicts = {}  # {prompt_id: (verdict, votes_seen)}
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+    @property
+    def is_enabled(self):
+        return self.mode in ("quorum", "shadow")
+
+    def should_skip(self, prompt_id):
+        """Return True (and count the skip) if the prompt's remaining tasks can be dropped."""
+        if self.mode != "quorum":
+            return False
+        with self.lock:
+            if prompt_id in self.early_verdicts:
+                self.skipped += 1
+                return True
+        return False
+
+    def record(self, prompt_id, agree, decision):
+        """Record one task's outcome; decision == 0 means the query failed."""
+        if not self.is_enabled:
+            return  # Nothing reads the votes, so long streamed runs keep no per-prompt state
+        with self.lock:
+            votes = self.votes.setdefault(prompt_id, [0, 0, 0])
+            if not decision:
+                votes[2] += 1
+            elif agree:
+                votes[0] += 1
+            else:
+                votes[1] += 1
+            if prompt_id not in self.early_verdicts:
+                verdict = self._fixed_verdict(*votes)
+                if verdict is not None:
+                    self.early_verdicts[prompt_id] = (verdict, sum(votes))
+
+    def _fixed_verdict(self, agree, disagree, failed):
+        remaining = self.votes_per_prompt - agree - disagree - failed
+        # Majority can no longer change, even if every outstanding vote goes the other way
+        if agree > disagree + remaining:
+            return "TRUE"
+        if disagree >= agree + remaining:
+            return "FALSE"
+        if self.confidence is not None and agree + disagree >= self.min_votes:
+            p_true_rate_low = self._beta_cdf_half(agree + 1, disagree + 1)
+            if 1 - p_true_rate_low >= self.confidence:
+                return "TRUE"
+            if p_true_rate_low >= self.confidence:
+                return "FALSE"
+        return None
+
+    @staticmethod
+    def _beta_cdf_half(a, b):
+        """P(p <= 0.5) for p ~ Beta(a, b) with integer a, b, via the binomial identity."""
+        n = a + b - 1
+        return sum(math.comb(n, k) for k in range(a, n + 1)) / 2 ** n
+
+    def summary(self):
+        """Return the counters needed to report queries saved and verdict agreement."""
+        with self.lock:
+            matches = 0
+            for prompt_id, (verdict, _) in self.early_verdicts.items():
+                agree, disagree, _ = self.votes[prompt_id]
+                full_verdict = "TRUE" if agree > disagree else "FALSE"
+                matches += verdict == full_verdict
+            return {
+                "prompts": len(self.votes),
+                "prompts_decided_early": len(self.early_verdicts),
+                "queries_planned": len(self.votes) * self.votes_per_prompt,
+                "queries_skipped": self.skipped,
+                "queries_saveable": sum(self.votes_per_prompt - seen for _, seen in self.early_verdicts.values()),
+                "early_verdict_matches": matches,
+            }
+
+    @staticmethod
+    def merge_summaries(summaries):
+        return {key: sum(summary[key] for summary in summaries) for key in summaries[0]}
+
+    def print_summary(self, summary=None):
+        summary = summary or self.summary()
+        planned = summary["queries_planned"]
+        decided = summary["prompts_decided_early"]
+        print(f"Quorum Mode: {self.mode}" + (f" (confidence {self.confidence})" if self.confidence is not None else ""))
+        print(f"Prompts Decided Early: {decided}/{summary['prompts']}")
+        if self.mode == "quorum":
+            saved = summary["queries_skipped"]
+            print(f"Queries Saved: {saved}/{planned} ({saved / planned * 100 if planned else 0:.2f}%)")
+        else:
+            # Shadow mode ran the full grid, so the early verdicts can be checked against it
+            saveable = summary["queries_saveable"]
+            matches = summary["early_verdict_matches"]
+            print(f"Queries Quorum Would Save: {saveable}/{planned} ({saveable / planned * 100 if planned else 0:.2f}%)")
+            print(f"Early Verdict Agreement with Full Grid: {matches / decided * 100 if decided else 0:.2f}%")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+import random
+import threading
+from collections import deque
+from classes.Reservoir import Reservoir
+from classes.TokenMetricTracker import TokenMetricsTracker
+
+# HTTP statuses worth retrying: the server was busy, restarting or timed out
+TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504}
+COUNTERS = ("requests", "attempts", "retries", "deadlines", "failed", "hedges", "hedge_wins")
+
+
+class RequestFailed(Exception):
+    """An attempt that produced no answer: an HTTP error status, a missed deadline or a cancelled hedge."""
+    def __init__(self, status, is_transient):
+        super().__init__(status)
+        self.status = status
+        self.is_transient = is_transient
+
+
+class RequestPolicy:
+    """Deadline, retry and hedging settings for server requests, and the counters reporting on them.
+
+    Each attempt gets deadline seconds. A transient failure is retried up to
+    max_retries times after a full-jitter exponential delay. With
+    hedge_percentile set, an attempt still running after that percentile of
+    the model's recent latencies gets a duplicate on another backend. The
+    first answer wins and the other request is cancelled.
+
+    Request latencies include retries. Each attempt records the latency the
+    caller saw. A primary request that loses to its hedge is cancelled, so
+    what it would have taken stays unknown; with is_shadow it runs to the end
+    instead (at the cost of the extra load) and every attempt also records
+    its primary request's latency, or the time it took to fail.
+    """
+    def __init__(self, deadline=300, max_retries=2, backoff=0.5, backoff_max=8,
+                 hedge_percentile=None, hedge_min_samples=20, is_shadow=False, window=200):
+        self.deadline = deadline or None
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.is_shadow = is_shadow
+        self.window = window
+        self.recent = {}  # {model: deque of recent successful attempt latencies}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        # Bounded samples, so memory stays flat however many requests run
+        self.latencies = Reservoir()  # Per successful request, retries included
+        self.attempt_latencies = Reservoir()  # Per successful attempt, as the caller saw it (hedged or not)
+        self.primary_latencies = Reservoir()  # Shadow mode: per attempt, its primary request alone
+        self.random = random.Random()
+        self.lock = threading.Lock()
+
+    def retry_delay(self, retry):
+        """Full jitter: uniform in [0, min(backoff_max, backoff * 2**retry)]."""
+        return self.random.uniform(0, min(self.backoff_max, self.backoff * 2 ** retry))
+
+    def hedge_delay(self, model_name):
+        """Seconds to wait before hedging a request for model_name, or None when not hedging (yet)."""
+        if self.hedge_percentile is None:
+            return None
+        with self.lock:
+            recent = list(self.recent.get(model_name, ()))
+        if len(recent) < self.hedge_min_samples:
+            return None
+        return TokenMetricsTracker.percentile(recent, self.hedge_percentile)
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.counters[key] += n
+
+    def record(self, latency):
+        with self.lock:
+            self.latencies.add(latency)
+
+    def record_attempt(self, model_name, latency, primary_latency=None, hedge_won=False):
+        """Record a successful attempt and feed the hedge delay estimate.
+
+        primary_latency is left out when a shadowed primary is still running;
+        record_primary() adds it later.
+        """
+        with self.lock:
+            self.recent.setdefault(model_name, deque(maxlen=self.window)).append(latency)
+            self.attempt_latencies.add(latency)
+            if primary_latency is not None and self.is_shadow:
+                self.primary_latencies.add(primary_latency)
+            self.counters["hedge_wins"] += hedge_won
+
+    def record_primary(self, primary_latency):
+        with self.lock:
+            self.primary_latencies.add(primary_latency)
+
+    def summary(self):
+        with self.lock:
+            return {
+                **self.counters,
+                "hedge_percentile": self.hedge_percentile,
+                "is_shadow": self.is_shadow,
+                # merge() with an empty reservoir copies the sample
+                "latencies": self.latencies.merge(Reservoir()),
+                "attempt_latencies": self.attempt_latencies.merge(Reservoir()),
+                "primary_latencies": self.primary_latencies.merge(Reservoir()),
+            }
+
+    @staticmethod
+    def merge_summaries(summaries):
+        merged = {key: sum(s[key] for s in summaries) for key in COUNTERS}
+        merged["hedge_percentile"] = summaries[0]["hedge_percentile"]
+        merged["is_shadow"] = summaries[0]["is_shadow"]
+        for key in ("latencies", "attempt_latencies", "primary_latencies"):
+            merged[key] = Reservoir.merge_all(s[key] for s in summaries)
+        return merged
+
+    @staticmethod
+    def print_summary(summary):
+        latencies = summary["latencies"]
+        print(
+            f"Requests: {summary['requests']} | Attempts: {summary['attempts']} | Retries: {summary['retries']} | "
+            f"Deadlines Missed: {summary['deadlines']} | Failed: {summary['failed']} | "
+            f"Latency p50/p99: {latencies.percentile(50):.3f}/{latencies.percentile(99):.3f} s"
+        )
+        if summary["hedge_percentile"] is None:
+            return
+        extra = summary["hedges"] / summary["requests"] * 100 if summary["requests"] else 0
+        if summary["is_shadow"]:
+            comparison = f"vs {summary['primary_latencies'].percentile(99):.3f} s without"
+        else:
+            comparison = "(CHRONO_HEDGE_SHADOW=1 also measures it without hedging)"
+        print(
+            f"Hedging at p{summary['hedge_percentile']:g}: {summary['hedges']} hedges (+{extra:.1f}% requests), "
+            f"{summary['hedge_wins']} won by the hedge | Attempt p99: {summary['attempt_latencies'].percentile(99):.3f} s "
+            f"with hedging {comparison}"
+        )
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+import math
+import random
+
+DEFAULT_SIZE = 10000  # Values kept per reservoir; percentiles are exact up to this many
+
+
+class Reservoir:
+    """Uniform sample of at most size values from a stream (Algorithm R), for percentiles in flat memory.
+
+    While no more than size values were added the sample is every value, so
+    percentiles are exact; after that each value is kept with probability
+    size / count. merge() weights each side by the number of values it stands for.
+    """
+    def __init__(self, size=DEFAULT_SIZE):
+        self.size = size
+        self.count = 0
+        self.values = []
+        self.random = random.Random()
+
+    def add(self, value):
+        self.count += 1
+        if len(self.values) < self.size:
+            self.values.append(value)
+            return
+        index = self.random.randrange(self.count)
+        if index < self.size:
+            self.values[index] = value
+
+    def is_exact(self):
+        return len(self.values) == self.count
+
+    def merge(self, other):
+        """A new reservoir standing for the values of both."""
+        merged = Reservoir(self.size)
+        merged.count = self.count + other.count
+        if self.is_exact() and other.is_exact() and merged.count <= self.size:
+            merged.values = self.values + other.values
+            return merged
+        take = min(len(self.values), round(self.size * self.count / merged.count))
+        take_other = min(len(other.values), self.size - take)
+        merged.values = merged.random.sample(self.values, take) + merged.random.sample(other.values, take_other)
+        return merged
+
+    @staticmethod
+    def merge_all(reservoirs, size=DEFAULT_SIZE):
+        merged = Reservoir(size)
+        for reservoir in reservoirs:
+            merged = merged.merge(reservoir)
+        return merged
+
+    def percentile(self, q):
+        if not self.values:
+            return 0.0
+        values = sorted(self.values)
+        return values[min(len(values) - 1, max(0, math.ceil(q / 100 * len(values)) - 1))]
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+
+class ResponseCache:
+    """On-disk, content-addressed cache of LLM responses backed by SQLite.
+
+    Each thread gets its own connection and the database runs in WAL mode, so
+    threads and MPI ranks on the same node can read and write concurrently.
+    Entries expire after max_age seconds, and the oldest entries are evicted
+    once the stored responses exceed max_bytes.
+    """
+    EVICT_EVERY = 100  # Run eviction once per this many writes
+
+    def __init__(self, path, max_bytes=512 * 1024 * 1024, max_age=30 * 24 * 3600):
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS responses_created_at ON responses (created_at)")
+        conn.commit()
+
+    def _connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(model_name, prompt, options=None):
+        """Hash the model, fully rendered prompt and generation options."""
+        payload = json.dumps(
+            {"model": model_name, "prompt": prompt, "options": options or {}},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        is_hit = row is not None and time.time() - row[1] <= self.max_age
+        with self.lock:
+            if is_hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return row[0] if is_hit else None
+
+    def put(self, key, response):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, response, size, created_at) VALUES (?, ?, ?, ?)",
+            (key, response, len(response.encode("utf-8")), time.time()),
+        )
+        conn.commit()
+        with self.lock:
+            self.writes += 1
+            is_evict = self.writes % self.EVICT_EVERY == 0
+        if is_evict:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the oldest ones until under the size budget."""
+        conn = self._connection()
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.max_age,))
+        total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total_bytes > self.max_bytes:
+            excess = total_bytes - self.max_bytes
+            cutoff = conn.execute(
+                "SELECT created_at FROM ("
+                " SELECT created_at, SUM(size) OVER (ORDER BY created_at) AS running FROM responses"
+                ") WHERE running >= ? LIMIT 1",
+                (excess,),
+            ).fetchone()
+            if cutoff:
+                conn.execute("DELETE FROM responses WHERE created_at <= ?", (cutoff[0],))
+        conn.commit()
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "writes": self.writes}
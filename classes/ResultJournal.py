@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import glob
+import json
+import os
+import socket
+import threading
+import time
+
+
+class ResultJournal:
+    """Append-only JSONL journal of finished tasks, fsynced in batches.
+
+    Every process appends to its own file in the journal directory, so MPI
+    ranks and pool workers never share a file; load() merges them. Records are
+    buffered and written with one fsync per batch_size records or flush_seconds,
+    so a crash loses at most the last unflushed batch. A torn last line from a
+    crash mid-write is skipped when reading. Each record gets its file's next
+    sequence number ("seq"), which orders records that finished at the same time.
+    """
+    def __init__(self, directory, batch_size=64, flush_seconds=2.0):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"journal-{socket.gethostname()}-{os.getpid()}.jsonl")
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.buffer = []
+        self.seq = 0
+        self.last_flush = time.time()
+        self.lock = threading.Lock()
+        self.file = open(self.path, "a")
+
+    @staticmethod
+    def task_key(prompt_id, model, layer, role):
+        return f"{prompt_id}|{model}|{layer}|{role}"
+
+    def append(self, record):
+        with self.lock:
+            self.buffer.append(json.dumps({**record, "seq": self.seq}))
+            self.seq += 1
+            if len(self.buffer) >= self.batch_size or time.time() - self.last_flush >= self.flush_seconds:
+                self._flush()
+
+    def _flush(self):
+        if self.buffer and not self.file.closed:
+            self.file.write("\n".join(self.buffer) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.buffer = []
+        self.last_flush = time.time()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def close(self):
+        with self.lock:
+            self._flush()
+            if not self.file.closed:
+                self.file.close()
+
+    @staticmethod
+    def rank(record):
+        # Records journaled before "seq" existed sort first among equal end times
+        return record["decision"], record.get("end", 0), record.get("seq", -1)
+
+    @staticmethod
+    def load(directory):
+        """Merge every journal file in directory into {task_key: record}.
+
+        Decided records win over failures; among those, the one that finished
+        last (end time, then seq) wins, whichever file it is in.
+        """
+        records = {}
+        for path in glob.glob(os.path.join(directory, "journal-*.jsonl")):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn write at a crash
+                    key = ResultJournal.task_key(record["prompt_id"], record["model"], record["layer"], record["role"])
+                    if key not in records or ResultJournal.rank(record) >= ResultJournal.rank(records[key]):
+                        records[key] = record
+        return records
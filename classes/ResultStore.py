@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+import threading
+import numpy as np
+from classes.DecisionResult import DecisionResult
+
+# Verdict code per task: decision + agree, or NOT_RUN for ids never filled (quorum skips, gaps)
+NOT_RUN, FAILED, FALSE, TRUE = -1, 0, 1, 2
+
+# name -> (dtype, fill value); 9 bytes per task
+COLUMNS = {
+    "prompt_id": (np.int32, 0),
+    "code": (np.int8, NOT_RUN),
+    "seconds": (np.float32, np.nan),
+}
+# Only allocated when the store keeps texts in a JustificationArena
+TEXT_COLUMNS = {
+    "text_offset": (np.int64, -1),
+    "text_length": (np.int32, 0),
+}
+
+
+class ResultStore:
+    """Task results in typed NumPy columns indexed by task id.
+
+    append() gives each result the next id, put() stores it at a known id
+    (e.g. its index in the task list). A row costs 9 bytes instead of a tuple
+    or DecisionResult object (about 100 bytes). Justification texts go to an
+    optional JustificationArena and rows keep their offset and length.
+    Pickling sends only the filled rows, with runs of equal prompt ids
+    collapsed, so MPI gathers carry about 5 bytes per task.
+    """
+    def __init__(self, capacity=1024, arena=None):
+        self.arena = arena
+        self.columns = {name: np.full(max(capacity, 1), fill, dtype) for name, (dtype, fill) in self._specs().items()}
+        self.size = 0  # One past the highest id in use
+        self.lock = threading.Lock()
+
+    def _specs(self):
+        return {**COLUMNS, **TEXT_COLUMNS} if self.arena is not None else COLUMNS
+
+    def _reserve(self, size):
+        capacity = len(self.columns["code"])
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2)
+        for name, (dtype, fill) in self._specs().items():
+            column = np.full(capacity, fill, dtype)
+            column[:self.size] = self.columns[name][:self.size]
+            self.columns[name] = column
+
+    def append(self, result):
+        """Store a DecisionResult or (prompt_id, agree, decision) under the next task id; returns the id."""
+        with self.lock:
+            task_id = self.size
+            self._put(task_id, result)
+        return task_id
+
+    def put(self, task_id, result):
+        with self.lock:
+            self._put(task_id, result)
+
+    def _put(self, task_id, result):
+        prompt_id, agree, decision = result
+        self._reserve(task_id + 1)
+        self.columns["prompt_id"][task_id] = prompt_id
+        self.columns["code"][task_id] = decision + agree if decision else FAILED
+        seconds = getattr(result, "seconds", None)
+        if seconds is not None:
+            self.columns["seconds"][task_id] = seconds
+        text = getattr(result, "justification", None)
+        if self.arena is not None and text is not None:
+            self.columns["text_offset"][task_id], self.columns["text_length"][task_id] = self.arena.add(text)
+        self.size = max(self.size, task_id + 1)
+
+    @staticmethod
+    def from_columns(prompt_ids, codes, seconds, arena=None):
+        """Store over filled columns, e.g. read back from shared memory; row i is task id i."""
+        store = ResultStore(len(codes), arena)
+        for name, values in (("prompt_id", prompt_ids), ("code", codes), ("seconds", seconds)):
+            store.columns[name][:len(codes)] = values
+        store.size = len(codes)
+        return store
+
+    def set_justification(self, task_id, text):
+        if self.arena is not None and text is not None:
+            with self.lock:
+                self.columns["text_offset"][task_id], self.columns["text_length"][task_id] = self.arena.add(text)
+
+    def extend(self, results):
+        for result in results:
+            self.append(result)
+
+    def __len__(self):
+        return self.size
+
+    def view(self, name):
+        """The filled part of a column (no copy)."""
+        return self.columns[name][:self.size]
+
+    def completed(self):
+        return int(np.count_nonzero(self.view("code") != NOT_RUN))
+
+    def __iter__(self):
+        """(prompt_id, agree, decision) of every task that ran, in task id order."""
+        codes = self.view("code")
+        for prompt_id, code in zip(self.view("prompt_id")[codes != NOT_RUN].tolist(), codes[codes != NOT_RUN].tolist()):
+            yield prompt_id, int(code == TRUE), int(code != FAILED)
+
+    def results(self):
+        """DecisionResult of every task that ran, with seconds and text where known."""
+        for task_id in np.flatnonzero(self.view("code") != NOT_RUN).tolist():
+            code = int(self.columns["code"][task_id])
+            seconds = float(self.columns["seconds"][task_id])
+            yield DecisionResult(
+                int(self.columns["prompt_id"][task_id]), int(code == TRUE), int(code != FAILED),
+                None if np.isnan(seconds) else seconds, self.justification(task_id),
+            )
+
+    def justification(self, task_id):
+        if self.arena is None:
+            return None
+        return self.arena.get(int(self.columns["text_offset"][task_id]), int(self.columns["text_length"][task_id]))
+
+    def aggregate(self):
+        """{prompt_id: {"agree": int, "decision": int}}, summed with bincount."""
+        codes = self.view("code")
+        ran = codes != NOT_RUN
+        prompt_ids = self.view("prompt_id")[ran]
+        codes = codes[ran]
+        if not len(codes):
+            return {}
+        agree = np.bincount(prompt_ids, weights=codes == TRUE)
+        decision = np.bincount(prompt_ids, weights=codes != FAILED)
+        seen = np.bincount(prompt_ids)
+        return {
+            prompt_id: {"agree": int(agree[prompt_id]), "decision": int(decision[prompt_id])}
+            for prompt_id in np.flatnonzero(seen).tolist()
+        }
+
+    def nbytes(self):
+        """Bytes per filled row summed over the columns (texts excluded)."""
+        return sum(column.itemsize for column in self.columns.values()) * self.size
+
+    @staticmethod
+    def concatenate(stores, arena=None):
+        """One store with the rows of stores in order; texts are copied into arena if given."""
+        total = sum(len(store) for store in stores)
+        merged = ResultStore(total, arena)
+        for store in stores:
+            if arena is None or store.arena is None:
+                for name in COLUMNS:
+                    merged.columns[name][merged.size:merged.size + len(store)] = store.view(name)
+                merged.size += len(store)
+            else:
+                for result in store.results():
+                    merged.append(result)
+        return merged
+
+    def __getstate__(self):
+        with self.lock:
+            prompt_ids = self.view("prompt_id")
+            # Grid-ordered results share a prompt id for many rows: send (value, run length) pairs
+            starts = np.flatnonzero(np.diff(prompt_ids, prepend=prompt_ids[:1] - 1)) if self.size else np.zeros(0, np.int64)
+            state = {
+                "size": self.size,
+                "prompt_id_values": prompt_ids[starts],
+                "prompt_id_runs": np.diff(np.append(starts, self.size)).astype(np.int32),
+                "arena": self.arena,
+            }
+            for name in self._specs():
+                if name != "prompt_id":
+                    state[name] = self.view(name).copy()
+            return state
+
+    def __setstate__(self, state):
+        self.arena = state["arena"]
+        self.size = state["size"]
+        self.lock = threading.Lock()
+        self.columns = {"prompt_id": np.repeat(state["prompt_id_values"], state["prompt_id_runs"]).astype(np.int32)}
+        for name in self._specs():
+            if name != "prompt_id":
+                self.columns[name] = state[name]
+        if not self.size:
+            self.columns = {name: np.full(1, fill, dtype) for name, (dtype, fill) in self._specs().items()}
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+import threading
+
+
+class ResultStream:
+    """Sums (prompt_id, agree, decision) results and hands each prompt on as soon as it is complete.
+
+    Only prompts with results still outstanding are held, so memory depends on
+    how many prompts are in flight, not on the size of the prompt set. Prompts
+    that never collect every vote (quorum skips) are flushed by finish().
+    """
+    def __init__(self, votes_per_prompt, on_complete):
+        self.votes_per_prompt = votes_per_prompt
+        self.on_complete = on_complete  # on_complete(prompt_id, agree, decision)
+        self.pending = {}  # {prompt_id: [agree, decision, results]}
+        self.completed = 0
+        self.lock = threading.Lock()
+
+    def add(self, result):
+        prompt_id, agree, decision = result
+        with self.lock:
+            counts = self.pending.setdefault(prompt_id, [0, 0, 0])
+            counts[0] += agree
+            counts[1] += decision
+            counts[2] += 1
+            if counts[2] >= self.votes_per_prompt:
+                del self.pending[prompt_id]
+                self.completed += 1
+                # Under the lock so each prompt's output stays in one piece
+                self.on_complete(prompt_id, counts[0], counts[1])
+
+    def finish(self):
+        """Flush incomplete prompts in prompt order; returns the number of prompts seen."""
+        with self.lock:
+            for prompt_id in sorted(self.pending):
+                agree, decision, _ = self.pending[prompt_id]
+                self.on_complete(prompt_id, agree, decision)
+            self.completed += len(self.pending)
+            self.pending.clear()
+            return self.completed
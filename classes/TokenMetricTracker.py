@@ -1,24 +1,219 @@
+#!/usr/bin/env python3
+
+import bisect
+import json
+import math
+import os
+import shutil
 import threading
+from classes.Reservoir import Reservoir
+
+# Upper bucket bounds in seconds for latency-like fields (last bucket is open-ended)
+HISTOGRAM_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 60, 120, 300]
+TIME_FIELDS = ("ttfb", "ttft", "latency", "queue", "load", "prompt_eval", "eval")
+# Parts of the total request time, summed over every request
+TIME_PARTS = ("latency", "queue", "load", "prompt_eval", "eval")
+
 
 class TokenMetricsTracker:
-    def __init__(self):
-        self.prompt_token_count = 0
-        self.response_token_count = 0
+    """Per-request telemetry (timings, token counts, tags) folded into bounded aggregates, one set per thread.
+
+    record() updates the calling thread's own summary: counts, sums, histogram
+    buckets and Reservoir samples for the percentiles, so memory stays flat
+    however long the run (e.g. under --stream) and workers never wait on each
+    other while requests are in flight. With sink_path set, every record is
+    also appended to that JSONL file, batch_size lines per write; the lock is
+    only taken to create a thread's state, to write a batch and to merge.
+    """
+    def __init__(self, sink_path=None, cold_load_seconds=0.1, batch_size=256):
+        self.sink_path = sink_path
+        self.cold_load_seconds = cold_load_seconds
+        self.batch_size = max(1, batch_size)
+        self.local = threading.local()
+        self.states = []
+        self.written = 0
         self.lock = threading.Lock()
 
-    def add_prompt_tokens(self, count):
+    def _state(self):
+        state = getattr(self.local, "state", None)
+        if state is None:
+            state = self.local.state = {"summary": TokenMetricsTracker.new_summary(), "lines": []}
+            with self.lock:
+                self.states.append(state)
+        return state
+
+    def record(self, **fields):
+        state = self._state()
+        TokenMetricsTracker.add(state["summary"], fields, self.cold_load_seconds)
+        if self.sink_path:
+            state["lines"].append(json.dumps(fields))
+            if len(state["lines"]) >= self.batch_size:
+                self._write(state["lines"])
+
+    def _write(self, lines):
         with self.lock:
-            self.prompt_token_count += count
+            count = len(lines)
+            if not count:
+                return
+            os.makedirs(os.path.dirname(self.sink_path) or ".", exist_ok=True)
+            with open(self.sink_path, "a") as f:
+                f.write("\n".join(lines[:count]) + "\n")
+            del lines[:count]
+            self.written += count
+
+    def flush(self):
+        """Write every thread's pending sink lines."""
+        if self.sink_path:
+            for state in list(self.states):
+                self._write(state["lines"])
 
-    def add_response_tokens(self, count):
+    def summary(self):
+        """This process's merged summary; flushes the sink first, and lists it under "files"."""
+        self.flush()
         with self.lock:
-            self.response_token_count += count
+            summaries = [state["summary"] for state in self.states]
+        summary = TokenMetricsTracker.merge_summaries(summaries)
+        summary["files"] = [self.sink_path] if self.sink_path and self.written else []
+        return summary
 
     def get_total_tokens(self):
-        with self.lock:
-            return self.prompt_token_count + self.response_token_count
+        return self.summary()["tokens"]
 
-    def reset(self):
-        with self.lock:
-            self.prompt_token_count = 0
-            self.response_token_count = 0
\ No newline at end of file
+    @staticmethod
+    def new_summary():
+        return {
+            "records": 0,
+            "tokens": 0,
+            "models": {},  # {model: {"requests", "ok", "latency", "ttft", "rate_sum", "rates"}}
+            "cold": {"requests": 0, "load": 0.0, "latency": Reservoir()},
+            "steady": Reservoir(),
+            "time": dict.fromkeys(TIME_PARTS, 0.0),
+            "histograms": {},  # {model: {field: [count per bucket]}}
+            "files": [],
+        }
+
+    @staticmethod
+    def add(summary, record, cold_load_seconds):
+        """Fold one request record into summary."""
+        summary["records"] += 1
+        summary["tokens"] += (record.get("prompt_tokens") or 0) + (record.get("output_tokens") or 0)
+        model = summary["models"].setdefault(record.get("model"), {
+            "requests": 0, "ok": 0, "latency": Reservoir(), "ttft": Reservoir(), "rate_sum": 0.0, "rates": 0,
+        })
+        model["requests"] += 1
+        for field in TIME_PARTS:
+            summary["time"][field] += record.get(field) or 0
+        histogram = summary["histograms"].setdefault(
+            str(record.get("model")), {field: [0] * (len(HISTOGRAM_BUCKETS) + 1) for field in TIME_FIELDS}
+        )
+        for field in TIME_FIELDS:
+            value = record.get(field)
+            if value is not None:
+                histogram[field][bisect.bisect_left(HISTOGRAM_BUCKETS, value)] += 1
+        if record.get("status") != "ok":
+            return
+        model["ok"] += 1
+        model["latency"].add(record["latency"])
+        if record.get("ttft") is not None:
+            model["ttft"].add(record["ttft"])
+        if record.get("tokens_per_s"):
+            model["rate_sum"] += record["tokens_per_s"]
+            model["rates"] += 1
+        # A request that waited cold_load_seconds or more for its model to load was a cold start
+        load = record.get("load") or 0
+        if load >= cold_load_seconds:
+            summary["cold"]["requests"] += 1
+            summary["cold"]["load"] += load
+            summary["cold"]["latency"].add(record["latency"])
+        else:
+            summary["steady"].add(record["latency"])
+
+    @staticmethod
+    def merge_summaries(summaries):
+        merged = TokenMetricsTracker.new_summary()
+        for summary in summaries:
+            merged["records"] += summary["records"]
+            merged["tokens"] += summary["tokens"]
+            for name, model in summary["models"].items():
+                total = merged["models"].setdefault(name, {
+                    "requests": 0, "ok": 0, "latency": Reservoir(), "ttft": Reservoir(), "rate_sum": 0.0, "rates": 0,
+                })
+                for key in ("requests", "ok", "rate_sum", "rates"):
+                    total[key] += model[key]
+                total["latency"] = total["latency"].merge(model["latency"])
+                total["ttft"] = total["ttft"].merge(model["ttft"])
+            merged["cold"]["requests"] += summary["cold"]["requests"]
+            merged["cold"]["load"] += summary["cold"]["load"]
+            merged["cold"]["latency"] = merged["cold"]["latency"].merge(summary["cold"]["latency"])
+            merged["steady"] = merged["steady"].merge(summary["steady"])
+            for field in TIME_PARTS:
+                merged["time"][field] += summary["time"][field]
+            for name, histogram in summary["histograms"].items():
+                total = merged["histograms"].setdefault(name, {field: [0] * (len(HISTOGRAM_BUCKETS) + 1) for field in TIME_FIELDS})
+                for field, counts in histogram.items():
+                    total[field] = [a + b for a, b in zip(total[field], counts)]
+            merged["files"] += [path for path in summary["files"] if path not in merged["files"]]
+        return merged
+
+    @staticmethod
+    def percentile(values, q):
+        if not values:
+            return 0.0
+        values = sorted(values)
+        return values[min(len(values) - 1, max(0, math.ceil(q / 100 * len(values)) - 1))]
+
+    @staticmethod
+    def summarize_files(paths, cold_load_seconds):
+        """Summary of the records in the JSONL files at paths, read one line at a time."""
+        summary = TokenMetricsTracker.new_summary()
+        for path in paths:
+            with open(path) as f:
+                for line in f:
+                    TokenMetricsTracker.add(summary, json.loads(line), cold_load_seconds)
+        summary["files"] = list(paths)
+        return summary
+
+    @staticmethod
+    def merge_files(paths, path):
+        """Concatenate the per-process JSONL files into path and remove them."""
+        with open(path, "w") as out:
+            for part in paths:
+                if not os.path.exists(part):
+                    continue  # e.g. written on another node's local disk
+                with open(part) as f:
+                    shutil.copyfileobj(f, out)
+                os.remove(part)
+
+    @staticmethod
+    def write_histograms(summary, path):
+        with open(path, "w") as f:
+            json.dump({"buckets": HISTOGRAM_BUCKETS, "by_model": summary["histograms"]}, f, indent=2)
+
+    @staticmethod
+    def print_summary(summary):
+        """Per-model latency percentiles, cold starts vs steady state, then where the total request time went."""
+        for name, model in sorted(summary["models"].items(), key=lambda item: str(item[0])):
+            latency, ttft = model["latency"], model["ttft"]
+            # No rates when every request failed or no response reported its eval timings
+            rate = f"{model['rate_sum'] / model['rates']:.1f}" if model["rates"] else "n/a"
+            print(
+                f"Telemetry: {name} | Requests: {model['requests']} ({model['ok']} ok) | "
+                f"TTFT p50/p99: {ttft.percentile(50):.3f}/{ttft.percentile(99):.3f} s | "
+                f"Latency p50/p99: {latency.percentile(50):.3f}/{latency.percentile(99):.3f} s | "
+                f"Tokens/s: {rate}"
+            )
+
+        cold, steady = summary["cold"], summary["steady"]
+        print(
+            f"Cold Starts: {cold['requests']} requests | Load: {cold['load']:.2f} s | "
+            f"Latency p50/p99: {cold['latency'].percentile(50):.3f}/{cold['latency'].percentile(99):.3f} s"
+        )
+        print(f"Steady State: {len(steady)} requests | Latency p50/p99: {steady.percentile(50):.3f}/{steady.percentile(99):.3f} s")
+
+        total = summary["time"]["latency"]
+        if total > 0:
+            parts = {field: summary["time"][field] for field in ("queue", "load", "prompt_eval", "eval")}
+            # Whatever the server did not account for: network, client parsing, early stream closes
+            parts["client"] = max(total - sum(parts.values()), 0)
+            shares = " | ".join(f"{name}: {seconds:.2f} s ({seconds / total * 100:.1f}%)" for name, seconds in parts.items())
+            print(f"Request Time: {total:.2f} s | {shares}")
@@ -1,157 +1,279 @@
 #!/usr/bin/env python
 
 ##########################################
-# 
-# $ python entity/perf_monitor.py '[command]'
-# 
+# Per-process resource monitor for a command or for the current process tree
+#
+# $ python -m classes.perf_monitor [--interval 0.5] [--server-name ollama] [--output perf.npy] [--plot] '[command]'
+#
 # e.g.
-#     $ python entity/perf_monitor.py './run_test.sh healthcareL'
+#     $ python -m classes.perf_monitor './run_test.sh'
+#     $ python -m classes.perf_monitor --server-name ollama 'mpirun -n 4 python main.py --engine mpi'
+#
+# As a library:
+#     with PerformanceMonitor(interval=0.5) as monitor:
+#         engine.run(tasks, args)
+#     monitor.print_summary()
 ##########################################
 
 
 # Standard library import
-import subprocess
-import psutil
+import argparse
 import os
-import sys
+import subprocess
+import threading
 import time
-import logging
-from datetime import datetime
-import matplotlib.pyplot as plt
-import pdb
-
-if len(sys.argv) < 2:
-    print('Usage: python perf_monitor.py <command>')
-    sys.exit(1)
-
-# Local import
-import resources.chrono_logging as artm_logging
-log = artm_logging.get_logger(__name__, json=False)
+import numpy as np
+import psutil
 
+SYSTEM_PID = 0  # Row holding system-wide counters in each sample
+ROLE_SYSTEM, ROLE_CLIENT, ROLE_SERVER = range(3)
 
+# One row per process per sample; cumulative counters are stored raw and differenced in summary()
+SAMPLE_DTYPE = np.dtype([
+    ("time", "f8"),  # seconds since start()
+    ("pid", "i4"),
+    ("role", "i1"),
+    ("cpu_user", "f8"),  # cumulative CPU seconds
+    ("cpu_system", "f8"),
+    ("rss", "i8"),  # bytes (used memory for the system row)
+    ("threads", "i4"),
+    ("sockets", "i4"),  # open inet sockets
+    ("net_sent", "i8"),  # system row only, cumulative bytes
+    ("net_recv", "i8"),
+])
 
-# Setup logging
-logging.basicConfig(filename='performance_monitor.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class PerformanceMonitor:
-    def __init__(self, command, interval=1):
+    """Samples CPU, RSS, thread and socket counts of a process tree at a fixed cadence.
+
+    The tree is either a launched command (run()) or an existing process,
+    by default the current one (start()/stop() or a with block); children such
+    as pool workers and MPI ranks are found again on every sample. Processes
+    whose name contains one of server_names (e.g. the Ollama server) are
+    sampled too, tagged as server. Samples go into a ring buffer of capacity
+    rows, so long runs keep the most recent history in constant memory.
+    """
+    def __init__(self, command=None, interval=1.0, pid=None, server_names=(), capacity=200_000):
         self.command = command
         self.interval = interval
+        self.pid = pid or os.getpid()
+        self.server_names = tuple(name.lower() for name in server_names)
+        self.samples = np.zeros(capacity, dtype=SAMPLE_DTYPE)
+        self.count = 0  # Rows written in total; the buffer holds the last `capacity` of them
+        self.processes = {}  # {pid: psutil.Process}, reused so psutil keeps its per-process state
+        self.names = {}  # {pid: process name}
         self.begin_time = None
         self.end_time = None
-        self.cpu_usage_total = 0
-        self.cpu_samples = 0
-        self.cpu_usage_peak = 0
-        self.mem_usage_total = 0
-        self.mem_usage_samples = 0
-        self.mem_usage_peak = 0
-        self.disk_io_begin = psutil.disk_io_counters()
-        self.disk_io_end = None
-        self.network_io_begin = psutil.net_io_counters()
-        self.network_io_end = None
-        self.li_cpu_usage = []
-        self.li_mem_usage = []
-        
+        self.ticks = 0
+        self.missed_ticks = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """Start sampling self.pid's process tree on a background thread."""
+        self.begin_time = time.monotonic()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._sample_loop, name="perf-monitor", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+        self._sample()  # Final sample so short runs still have an end point
+        self.end_time = time.monotonic()
+
     def run(self):
-        logging.info('Start performance monitor...')
-        
-        process = subprocess.Popen(self.command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        self.begin_time = datetime.now()
-        
-        while process.poll() is None:
-            self.monitor_resources()
-            time.sleep(self.interval)
-
-        self.end_time = datetime.now()
-        self.disk_io_end = psutil.disk_io_counters()
-        self.network_io_end = psutil.net_io_counters()
-        self.log_metrics()
-        logging.info('End of performance monitor...')
-        logging.info('')
-            
-    def monitor_resources(self):
-        # Get CPU usage
-        cpu_usage = psutil.cpu_percent(interval=self.interval)
-        self.li_cpu_usage.append(cpu_usage)
-        self.cpu_usage_total += cpu_usage
-        self.cpu_samples += 1
-        self.cpu_usage_peak = max(self.cpu_usage_peak, cpu_usage)
-        
-        # Get memory usage
-        mem = psutil.virtual_memory()
-        self.li_mem_usage.append(mem.percent)
-        mem_usage = mem.percent
-        self.mem_usage_total += mem_usage
-        self.mem_usage_samples += 1
-        self.mem_usage_peak = max(self.mem_usage_peak, mem_usage)
-        
-        logging.info(f'cpu usage: {cpu_usage}%')
-        logging.info(f'memory usage: {mem_usage}%')
-        
-    def log_metrics(self, is_plain_logging: bool = False, is_perf_stats: bool = False) -> dict:
-        total_cpu_mean = self.cpu_usage_total / self.cpu_samples if self.cpu_samples else 0
-        total_mem_mean = self.mem_usage_total / self.mem_usage_samples if self.mem_usage_samples else 0
-        total_disk_io = (self.disk_io_end.read_bytes + self.disk_io_end.write_bytes) - (self.disk_io_begin.read_bytes + self.disk_io_begin.write_bytes)
-        total_network_usage = (self.network_io_end.bytes_sent + self.network_io_end.bytes_recv) - (self.network_io_begin.bytes_sent + self.network_io_begin.bytes_recv)
-        
-        metrics = {
-            "execution_time": str(self.end_time - self.begin_time),
-            "cpu_usage_peak": self.cpu_usage_peak,
-            "cpu_usage_mean": total_cpu_mean,
-            "memory_usage_peak": self.mem_usage_peak,
-            "memory_usage_mean": total_mem_mean,
-            "total_disk_io": total_disk_io/1000000,
-            "total_network_usage": total_network_usage/1000000
+        """Launch self.command, monitor its process tree until it exits; returns its exit code."""
+        process = subprocess.Popen(self.command, shell=True)
+        self.pid = process.pid
+        self.start()
+        try:
+            return process.wait()
+        finally:
+            self.stop()
+
+    def _sample_loop(self):
+        # Ticks are scheduled from the start time, so sampling cost does not accumulate as drift
+        next_tick = self.begin_time
+        while not self.stop_event.is_set():
+            self._sample()
+            self.ticks += 1
+            next_tick += self.interval
+            now = time.monotonic()
+            if now > next_tick:
+                # Overran one or more ticks: skip them instead of sampling in a burst
+                skipped = int((now - next_tick) // self.interval) + 1
+                self.missed_ticks += skipped
+                next_tick += skipped * self.interval
+            self.stop_event.wait(next_tick - now)
+
+    def _tree(self):
+        """Current processes to sample as [(psutil.Process, role)]."""
+        try:
+            root = self.processes.get(self.pid) or psutil.Process(self.pid)
+            tree = [root] + root.children(recursive=True)
+        except psutil.NoSuchProcess:
+            tree = []
+        members = [(process, ROLE_CLIENT) for process in tree]
+        if self.server_names:
+            tree_pids = {process.pid for process in tree}
+            for process in psutil.process_iter(["name"]):
+                name = (process.info["name"] or "").lower()
+                if process.pid not in tree_pids and any(server in name for server in self.server_names):
+                    members.append((process, ROLE_SERVER))
+        # Keep one psutil.Process per pid across samples
+        return [(self.processes.setdefault(process.pid, process), role) for process, role in members]
+
+    def _write(self, row):
+        self.samples[self.count % len(self.samples)] = row
+        self.count += 1
+
+    def _sample(self):
+        now = time.monotonic() - self.begin_time
+        cpu = psutil.cpu_times()
+        net = psutil.net_io_counters()
+        self._write((now, SYSTEM_PID, ROLE_SYSTEM, cpu.user, cpu.system, psutil.virtual_memory().used, 0, 0, net.bytes_sent, net.bytes_recv))
+        for process, role in self._tree():
+            try:
+                with process.oneshot():
+                    times = process.cpu_times()
+                    row = (
+                        now, process.pid, role,
+                        # Own time only: children are sampled themselves, so reaped children are not counted twice
+                        times.user, times.system,
+                        process.memory_info().rss, process.num_threads(),
+                        len(process.net_connections(kind="inet")), 0, 0,
+                    )
+                    self.names.setdefault(process.pid, process.name())
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+            self._write(row)
+
+    def rows(self):
+        """Recorded rows in time order (at most `capacity` of the latest)."""
+        capacity = len(self.samples)
+        if self.count <= capacity:
+            return self.samples[:self.count].copy()
+        start = self.count % capacity
+        return np.concatenate([self.samples[start:], self.samples[:start]])
+
+    def save(self, path):
+        """Write the recorded rows as a structured NumPy array (np.load(path) to read back)."""
+        np.save(path, self.rows())
+
+    def summary(self):
+        """Per-process and client/server totals over the monitored interval."""
+        rows = self.rows()
+        wall_time = (self.end_time or time.monotonic()) - self.begin_time
+        processes = {}
+        for pid in np.unique(rows["pid"]):
+            if pid == SYSTEM_PID:
+                continue
+            own = rows[rows["pid"] == pid]
+            # Processes already running at the first sample count only the CPU used since then
+            cpu = own["cpu_user"][-1] + own["cpu_system"][-1]
+            if len(own) > 1 and own["time"][0] == rows["time"][0]:
+                cpu -= own["cpu_user"][0] + own["cpu_system"][0]
+            processes[int(pid)] = {
+                "name": self.names.get(int(pid), ""),
+                "role": "server" if own["role"][0] == ROLE_SERVER else "client",
+                "cpu_seconds": float(cpu),
+                "rss_peak": int(own["rss"].max()),
+                "threads_peak": int(own["threads"].max()),
+                "sockets_peak": int(own["sockets"].max()),
+            }
+        system = rows[rows["pid"] == SYSTEM_PID]
+        client_cpu = sum(p["cpu_seconds"] for p in processes.values() if p["role"] == "client")
+        server_cpu = sum(p["cpu_seconds"] for p in processes.values() if p["role"] == "server")
+        return {
+            "wall_seconds": wall_time,
+            "ticks": self.ticks,
+            "missed_ticks": self.missed_ticks,
+            "client_cpu_seconds": client_cpu,
+            "server_cpu_seconds": server_cpu,
+            # Average cores busy in the client tree; the rest of the wall time it was waiting
+            "client_cores_busy": client_cpu / wall_time if wall_time > 0 else 0.0,
+            "client_rss_peak": int(sum(p["rss_peak"] for p in processes.values() if p["role"] == "client")),
+            "network_bytes": int((system["net_sent"][-1] + system["net_recv"][-1]) - (system["net_sent"][0] + system["net_recv"][0])) if len(system) else 0,
+            "processes": processes,
         }
-        
-        if is_perf_stats:
-            print(metrics)
-        elif is_plain_logging:
-            print(f'execution time: {self.end_time - self.begin_time}')
-            print(f'cpu usage - peak: {self.cpu_usage_peak} %')
-            print(f'cpu usage - mean: {total_cpu_mean:.2f} %')
-            print(f'memory usage - peak: {self.mem_usage_peak} %')
-            print(f'memory usage - mean: {total_mem_mean:.2f} %')
-            print(f'total disk i/o: {total_disk_io/1000000:.2f} MB')
-            print(f'total network usage: {total_network_usage/1000000:.2f} MB')
-            print(f'execution time: {self.end_time - self.begin_time}')
-        else:
-            logging.info(f'execution time: {self.end_time - self.begin_time}')
-            logging.info(f'cpu usage - peak: {self.cpu_usage_peak} %')
-            logging.info(f'cpu usage - mean: {total_cpu_mean:.2f} %')
-            logging.info(f'memory usage - peak: {self.mem_usage_peak} %')
-            logging.info(f'memory usage - mean: {total_mem_mean:.2f} %')
-            logging.info(f'total disk i/o: {total_disk_io/1000000:.2f} MB')
-            logging.info(f'total network usage: {total_network_usage/1000000:.2f} MB')
-            logging.info(f'execution time: {self.end_time - self.begin_time}')
-        
-        return metrics
-        
-    def plot_metrics(self):
-        time_axis = [i * self.interval for i in range(len(self.li_cpu_usage))]
-        
-        plt.figure(figsize=(10,5))
-        plt.plot(time_axis, self.li_cpu_usage, label= ('CPU Usage (%)'))
-        plt.plot(time_axis, self.li_mem_usage, label= ('Memory Usage (%)'))
-        
-        plt.xlabel('Time (s)')
-        plt.ylabel('Usage (%)')
-        plt.title('Resource Usage Over Time')
-        
-        plt.legend()
-        plt.grid(True)
-        # plt.savefig(f"usage_plot{sys.argv[1].replace(' ', '_')}.png")
-        plt.savefig(f"usage_plot.png")
-        plt.show()
-        
-        
+
+    def print_summary(self, summary=None):
+        summary = summary or self.summary()
+        wall_time = summary["wall_seconds"]
+        waiting = max(wall_time - summary["client_cpu_seconds"], 0)
+        print(f"Monitor: {wall_time:.2f} s wall | {summary['ticks']} samples ({summary['missed_ticks']} missed ticks)")
+        print(
+            f"Client CPU: {summary['client_cpu_seconds']:.2f} s ({summary['client_cores_busy']:.2f} cores busy) | "
+            f"Server CPU: {summary['server_cpu_seconds']:.2f} s | Client Peak RSS: {summary['client_rss_peak'] / 1e6:.1f} MB | "
+            f"Network: {summary['network_bytes'] / 1e6:.2f} MB"
+        )
+        # With one core busy or less, the rest of the wall time went to waiting on the server
+        print(f"Client Waiting (wall - client CPU, single-core view): {waiting:.2f} s ({waiting / wall_time * 100 if wall_time > 0 else 0:.1f}%)")
+        for pid, process in sorted(summary["processes"].items()):
+            print(
+                f"  PID: {pid} ({process['name']}, {process['role']}) | CPU: {process['cpu_seconds']:.2f} s | "
+                f"Peak RSS: {process['rss_peak'] / 1e6:.1f} MB | Threads: {process['threads_peak']} | Sockets: {process['sockets_peak']}"
+            )
+
+    def plot_metrics(self, path="usage_plot.png"):
+        """Plot client and server CPU (cores) and RSS over time."""
+        import matplotlib.pyplot as plt
+
+        rows = self.rows()
+        fig, (cpu_axis, mem_axis) = plt.subplots(2, 1, figsize=(10, 7), sharex=True)
+        for role, label in ((ROLE_CLIENT, "client"), (ROLE_SERVER, "server")):
+            own = rows[rows["role"] == role]
+            if not len(own):
+                continue
+            times = np.unique(own["time"])
+            cpu = np.array([(own["cpu_user"] + own["cpu_system"])[own["time"] == t].sum() for t in times])
+            rss = np.array([own["rss"][own["time"] == t].sum() for t in times])
+            cpu_axis.plot(times[1:], np.diff(cpu) / np.diff(times), label=f"{label} CPU (cores)")
+            mem_axis.plot(times, rss / 1e6, label=f"{label} RSS (MB)")
+        cpu_axis.set_ylabel("Cores")
+        mem_axis.set_ylabel("MB")
+        mem_axis.set_xlabel("Time (s)")
+        cpu_axis.set_title("Resource Usage Over Time")
+        for axis in (cpu_axis, mem_axis):
+            axis.legend()
+            axis.grid(True)
+        fig.savefig(path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Monitor the process tree of a command.")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between samples")
+    parser.add_argument("--server-name", action="append", default=[], help="also sample processes whose name contains this (e.g. ollama)")
+    parser.add_argument("--output", default=None, help="save the samples as a .npy structured array")
+    parser.add_argument("--plot", action="store_true", help="save usage_plot.png")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="command to run (quoted or after --)")
+    args = parser.parse_args(argv)
+    if args.command and args.command[0] == "--":
+        args.command = args.command[1:]
+    if not args.command:
+        parser.error("a command is required")
+    return args
+
+
 def main():
-    subsystems = [s.strip() for s in sys.argv[1].split()]
-    monitor = PerformanceMonitor(sys.argv[1])
-    monitor.run()
-    monitor.log_metrics(is_plain_logging=True, is_perf_stats=True)
-    monitor.plot_metrics()
+    args = parse_args()
+    monitor = PerformanceMonitor(" ".join(args.command), interval=args.interval, server_names=args.server_name)
+    exit_code = monitor.run()
+    monitor.print_summary()
+    if args.output:
+        monitor.save(args.output)
+    if args.plot:
+        monitor.plot_metrics()
+    raise SystemExit(exit_code)
 
 
 if __name__ == '__main__': main()
-    
\ No newline at end of file
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+################################################################################
+# Description:
+#       Single benchmark entry point. Every engine shares one task builder and
+#       one aggregation path, so measured speedups compare the engines only.
+#
+# e.g.
+#     $ python main.py --engine threads -w 8 -m 3 -r 2
+#     $ mpirun -n 4 python main.py --engine mpi -m llama3,phi -r Engineer
+################################################################################
+
+import argparse
+import importlib
+import os
+import time
+import chrono_modules.io as io
+import chrono_modules.ollama_helper as ollama_helper
+import chrono_modules.tasks as tasks_module
+import resources.common as cmn
+from classes.ResultJournal import ResultJournal
+from classes.ResultStore import ResultStore
+from classes.ResultStream import ResultStream
+
+# --engine name -> module under chrono_modules/engines (imported on demand, so
+# e.g. mpi4py is only needed for the MPI engine)
+ENGINES = {
+    "serial": "serial",
+    "threads": "threads",
+    "processes": "processes",
+    "async": "async_engine",
+    "mpi": "mpi",
+}
+
+
+def select(value, available):
+    """Interpret a -m/-r value: a count takes the first N entries, otherwise comma-separated names."""
+    value = value.strip()
+    if value.isdigit():
+        count = int(value)
+        if not 1 <= count <= len(available):
+            raise argparse.ArgumentTypeError(f"count must be between 1 and {len(available)}")
+        return available[:count]
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the model/role agreement benchmark on one engine.")
+    parser.add_argument("-e", "--engine", choices=sorted(ENGINES), default="serial")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=None,
+        help="threads, processes, in-flight requests (async) or requests per rank (mpi); engine default if omitted",
+    )
+    parser.add_argument(
+        "-m", "--models", type=lambda v: select(v, cmn.ALL_MODELS), default=cmn.MODELS,
+        help=f"number of models from {cmn.ALL_MODELS} or comma-separated names (default: {','.join(cmn.MODELS)})",
+    )
+    parser.add_argument(
+        "-r", "--roles", type=lambda v: select(v, cmn.ALL_ROLES), default=cmn.ROLES,
+        help=f"number of roles or comma-separated names (default: {','.join(cmn.ROLES)})",
+    )
+    parser.add_argument("-p", "--prompts", default=os.path.abspath('data/prompts.txt'), help="prompt file, one prompt per line")
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="read prompts lazily (.txt or .jsonl), build tasks on demand and print each prompt's result when it completes",
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="skip tasks already decided in the CHRONO_JOURNAL_DIR journals and count their journaled results",
+    )
+    parser.add_argument(
+        "--analyze", action="store_true",
+        help="score the journaled results (CHRONO_JOURNAL_DIR) against data/answer_keys.py after the run",
+    )
+    parser.add_argument(
+        "--monitor", nargs="?", const="", default=None, metavar="NPY_PATH",
+        help="sample this process tree's CPU/RSS/threads/sockets during the run; optionally save the samples",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    engine = importlib.import_module(f"chrono_modules.engines.{ENGINES[args.engine]}")
+    is_root = getattr(engine, "is_root", lambda: True)()
+    if args.stream and not hasattr(engine, "run_streaming"):
+        raise SystemExit(f"--stream is not supported by the {args.engine} engine")
+    if args.resume and not cmn.JOURNAL_DIR:
+        raise SystemExit("--resume needs CHRONO_JOURNAL_DIR set to the journal directory of the earlier run")
+    if args.analyze and not cmn.JOURNAL_DIR:
+        raise SystemExit("--analyze reads the result journal; set CHRONO_JOURNAL_DIR")
+
+    # Only the root reads prompts; MPI workers get their tasks from it (scattered or handed out)
+    if args.stream:
+        prompts = io.iter_prompts(args.prompts) if is_root else iter(())
+        tasks = tasks_module.iter_tasks(prompts, args.models, args.roles)
+    else:
+        prompts = tasks_module.read_prompts(args.prompts) if is_root else []
+        tasks = tasks_module.build_tasks(prompts, args.models, args.roles)
+    if args.stream:
+        stream = ResultStream(tasks_module.votes_per_prompt(args.models, args.roles), tasks_module.print_prompt_result)
+    resumed = tasks_module.make_result_store()
+    if args.resume and is_root:
+        # Only the root's task list is scheduled (scattered or handed out), so only it needs filtering
+        records = ResultJournal.load(cmn.JOURNAL_DIR)
+        tasks = tasks_module.skip_completed(tasks, records, stream.add if args.stream else resumed.append)
+        if not args.stream:
+            tasks = list(tasks)
+            print(f'Resumed Tasks: {len(resumed)} (from {cmn.JOURNAL_DIR})')
+    if is_root:
+        print(f'Engine: {args.engine}')
+        if not args.stream:
+            print(f'Number of Prompts: {len(prompts)}')
+        print(f'Number of Models: {len(args.models)}')
+        print(f'Number of Roles: {len(args.roles)}')
+
+    warm_up = None
+    if cmn.IS_WARMUP and is_root:
+        # Models load here instead of inside the first timed requests
+        warm_up = ollama_helper.warm_up_models(args.models)
+        ollama_helper.print_warm_up(warm_up)
+
+    monitor = None
+    if args.monitor is not None:
+        from classes.perf_monitor import PerformanceMonitor
+        monitor = PerformanceMonitor(interval=cmn.MONITOR_INTERVAL)
+        monitor.start()
+
+    start_time = time.time()
+    if args.stream:
+        engine.run_streaming(tasks, args, stream.add)
+        results = [] if is_root else None
+    else:
+        results = engine.run(tasks, args)
+    if monitor:
+        monitor.stop()
+        if args.monitor:
+            # Each MPI rank monitors its own process; non-root ranks save next to the root's file
+            monitor.save(args.monitor if is_root else f"{args.monitor}.{os.getpid()}")
+    if results is None:
+        return  # Non-root MPI rank
+
+    if args.stream:
+        print(f'Number of Prompts: {stream.finish()}')
+    else:
+        tasks_module.print_results(tasks_module.aggregate_results(ResultStore.concatenate([results, resumed])))
+    if monitor:
+        monitor.print_summary()
+    if args.analyze:
+        import chrono_modules.analytics as analytics
+        tasks_module.get_journal().flush()
+        report = analytics.analyze(
+            ResultJournal.load(cmn.JOURNAL_DIR).values(), io.iter_prompts(args.prompts), args.models, args.roles
+        )
+        analytics.print_report(report)
+    elapsed_time = (time.time() - start_time) / 60
+    print(f'Elapsed Time = {elapsed_time:.1f} min.')
+    if warm_up and cmn.IS_RELEASE_MODELS:
+        released = ollama_helper.release_models(warm_up["models"])
+        print(f'Released Models: {released} model loads freed')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+# Kept for existing scripts; equivalent to `python main.py --engine async`.
+
+import sys
+import main
+
+if __name__ == "__main__":
+    main.main(["--engine", "async"] + sys.argv[1:])
@@ -1,20 +1,44 @@
 from functools import cache
+import atexit
 import logging
+import logging.handlers
+import multiprocessing.util
 import os
 import json
+import queue
+import socket
+import sys
+import threading
+import time
 
 # TIME_FORMAT = "[%Y-%m-%d %H:%M:%S.%f]"
 TIME_FORMAT = "[%Y-%m-%d %H:%M:%S]"
 LOG_FORMAT = "[%(name)s] %(message)s"
+LOG_LEVEL = os.environ.get("CHRONO_LOGLEVEL", "INFO").upper()
 
-from rich.logging import RichHandler
+# Per-task records (task times, task errors) go through this logger
+TASK_LOGGER_NAME = "chrono.tasks"
+TASK_LOG_MODES = ("console", "summary", "off")
+
+_console_lock = threading.Lock()
+_is_console_configured = False
+
+
+def configure_console():
+    """Install the rich console handler on the root logger once; rich is only imported here."""
+    global _is_console_configured
+    with _console_lock:
+        if _is_console_configured:
+            return
+        from rich.logging import RichHandler
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=f"{LOG_FORMAT}",
+            datefmt=f"{TIME_FORMAT}",
+            handlers=[RichHandler()],
+        )
+        _is_console_configured = True
 
-logging.basicConfig(
-    level=os.environ.get("CHRONO_LOGLEVEL", "INFO"),
-    format=f"{LOG_FORMAT}",
-    datefmt=f"{TIME_FORMAT}",
-    handlers=[RichHandler()],
-)
 
 class JsonFormatter(logging.Formatter):
     def format(self, record):
@@ -23,10 +47,12 @@ class JsonFormatter(logging.Formatter):
             'name': record.name,
             'level': record.levelname,
             'message': record.getMessage(),
-            'pathname': record.pathname,
-            'lineno': record.lineno,
-            'funcName': record.funcName
         }
+        # Records built on a listener thread (TaskLog.info) have no call site
+        if record.lineno:
+            log_record.update(pathname=record.pathname, lineno=record.lineno, funcName=record.funcName)
+        # Structured fields passed as extra={"fields": {...}}
+        log_record.update(getattr(record, "fields", None) or {})
         if record.exc_info:
             log_record['exc_info'] = self.formatException(record.exc_info)
         return json.dumps(log_record)
@@ -41,40 +67,195 @@ def get_logger(name, json=True) -> logging.Logger:
 
 @cache
 def get_normal_logger(name) -> logging.Logger:
-    logger: logging.Logger = logging.getLogger(name)
-
-    logging.basicConfig(
-        level=os.environ.get("CHRONO_LOGLEVEL", "INFO"),
-        format=f"{LOG_FORMAT}",
-        datefmt=f"{TIME_FORMAT}",
-        handlers=[RichHandler()],
-    )
-
-    return logger
+    configure_console()
+    return logging.getLogger(name)
 
 
 @cache
 def get_json_logger(name) -> logging.Logger:
     logger = logging.getLogger(name)
-    
+
     # Clear existing handlers
     if logger.hasHandlers():
         logger.handlers.clear()
-    
+
     # Set log level from environment variable or default to INFO
-    log_level = os.environ.get("CHRONO_LOGLEVEL", "INFO").upper()
-    logger.setLevel(log_level)
-    
+    logger.setLevel(LOG_LEVEL)
+
     # Create a stream handler
     handler = logging.StreamHandler()
-    handler.setLevel(log_level)
-    
+    handler.setLevel(LOG_LEVEL)
+
     # Use the custom JSON formatter
     formatter = JsonFormatter()
     handler.setFormatter(formatter)
-    
+
     # Add the handler to the logger
     logger.addHandler(handler)
-    
+
     return logger
 
+
+##############################
+# Queued task log
+##############################
+class TaskLogListener(logging.handlers.QueueListener):
+    """QueueListener that builds the LogRecords of TaskLog.info() entries and counts its own CPU time."""
+    def __init__(self, log_queue, *handlers):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.records = 0
+        self.seconds = 0.0
+
+    def prepare(self, entry):
+        if isinstance(entry, logging.LogRecord):
+            return entry
+        level, msg, args, fields, created = entry
+        record = logging.LogRecord(TASK_LOGGER_NAME, level, "", 0, msg, args, None)
+        record.created, record.msecs = created, (created - int(created)) * 1000
+        record.fields = fields
+        return record
+
+    def handle(self, record):
+        start = time.thread_time()
+        super().handle(record)
+        self.seconds += time.thread_time() - start
+        self.records += 1
+
+
+class BatchedJsonlHandler(logging.Handler):
+    """Appends records as JSON lines, one write per batch_size records or flush_seconds."""
+    def __init__(self, path, batch_size=256, flush_seconds=2.0):
+        super().__init__()
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self.buffer = []
+        self.written = 0
+        self.batches = 0
+        self.last_flush = time.time()
+        self.setFormatter(JsonFormatter())
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(path, "a")
+
+    def emit(self, record):
+        self.buffer.append(self.format(record))
+        if len(self.buffer) >= self.batch_size or time.time() - self.last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if self.buffer and not self.file.closed:
+                self.file.write("\n".join(self.buffer) + "\n")
+                self.file.flush()
+                self.written += len(self.buffer)
+                self.batches += 1
+                self.buffer = []
+            self.last_flush = time.time()
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.file.close()
+        super().close()
+
+
+class TaskLog:
+    """A process's per-task log: a queue in front and a QueueListener thread behind it.
+
+    info() checks one flag, then queues a tuple; the listener thread builds
+    the LogRecord, formats it and writes it, so the calling thread neither
+    formats nor blocks on output. Warnings and errors go through logger, a
+    standard QueueHandler on the same queue. mode "console" prints every
+    record, "summary" prints warnings and errors only, and "off" prints
+    nothing. With directory set, every record is also appended to
+    tasks-<host>-<pid>.jsonl in batches.
+    """
+    def __init__(self, mode="console", directory="", batch_size=256, flush_seconds=2.0):
+        if mode not in TASK_LOG_MODES:
+            raise ValueError(f"Unknown task log mode {mode!r}; expected one of {', '.join(TASK_LOG_MODES)}")
+        self.mode = mode
+        self.queue = queue.SimpleQueue()
+        handlers = []
+        if mode != "off":
+            console = logging.StreamHandler(sys.stdout)
+            console.setFormatter(logging.Formatter("%(message)s"))
+            console.setLevel(logging.INFO if mode == "console" else logging.WARNING)
+            handlers.append(console)
+        self.sink = None
+        if directory:
+            self.sink = BatchedJsonlHandler(
+                os.path.join(directory, f"tasks-{socket.gethostname()}-{os.getpid()}.jsonl"), batch_size, flush_seconds,
+            )
+            handlers.append(self.sink)
+        # Per-task records are only queued when some handler keeps them
+        self.is_info = mode == "console" or self.sink is not None
+        self.listener = TaskLogListener(self.queue, *handlers)
+        self.logger = logging.getLogger(TASK_LOGGER_NAME)
+        self.logger.handlers = [logging.handlers.QueueHandler(self.queue)]
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO if self.is_info else logging.WARNING)
+        self.listener.start()
+
+    def info(self, msg, *args, **fields):
+        """Queue an INFO record of msg % args with JSON fields; nothing is formatted on the calling thread."""
+        if self.is_info:
+            self.queue.put((logging.INFO, msg, args, fields, time.time()))
+
+    def drain(self):
+        """Wait until every queued record has been handled, so summaries print after the task lines."""
+        if self.listener._thread is not None:
+            self.listener.stop()
+            self.listener.start()
+        if self.sink is not None:
+            self.sink.flush()
+
+    def close(self):
+        if self.listener._thread is not None:
+            self.listener.stop()
+        if self.sink is not None:
+            self.sink.close()
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "records": self.listener.records,
+            "seconds": self.listener.seconds,
+            "written": self.sink.written if self.sink else 0,
+            "batches": self.sink.batches if self.sink else 0,
+        }
+
+    @staticmethod
+    def merge_stats(stats_list):
+        merged = {key: sum(s[key] for s in stats_list) for key in ("records", "seconds", "written", "batches")}
+        merged["mode"] = stats_list[0]["mode"]
+        return merged
+
+    @staticmethod
+    def print_stats(stats, directory=""):
+        line = (
+            f"Task Log ({stats['mode']}): {stats['records']} records | "
+            f"{stats['seconds'] * 1e3:.1f} ms CPU on the listener thread"
+        )
+        if directory:
+            line += f" | {stats['written']} written to {directory} in {stats['batches']} batches"
+        print(line)
+
+
+_task_log = None
+_task_log_pid = None
+_task_log_lock = threading.Lock()
+
+
+def get_task_log(mode="console", directory="", batch_size=256, flush_seconds=2.0):
+    """Return this process's TaskLog; forked workers build their own listener thread."""
+    global _task_log, _task_log_pid
+    pid = os.getpid()
+    if _task_log is None or _task_log_pid != pid:
+        with _task_log_lock:
+            if _task_log is None or _task_log_pid != pid:
+                task_log = TaskLog(mode, directory, batch_size, flush_seconds)
+                # Drain the queue at exit; pool workers skip atexit, so also register a multiprocessing finalizer
+                atexit.register(task_log.close)
+                multiprocessing.util.Finalize(None, task_log.close, exitpriority=10)
+                _task_log, _task_log_pid = task_log, pid
+    return _task_log
@@ -21,6 +21,160 @@ import os
 # Dynamically fetch the Ollama server URL from the environment variable
 BASE_URL_LOCAL = os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")
 
+# Comma-separated Ollama servers to spread queries over (e.g. one per shell/start_ollama_server*.sh)
+OLLAMA_BACKENDS = [url.strip() for url in os.getenv("OLLAMA_BACKENDS", BASE_URL_LOCAL).split(",") if url.strip()]
+BACKEND_MAX_FAILURES = int(os.getenv("CHRONO_BACKEND_MAX_FAILURES", "3"))  # consecutive failures before ejection
+BACKEND_EJECT_SECONDS = float(os.getenv("CHRONO_BACKEND_EJECT_SECONDS", "30"))
+
+# Keep-alive connections per backend and process: at least the server's parallel slots, more when the
+# engine runs more requests at once (see ollama_helper.pool_size())
+POOL_SIZE = int(os.getenv("OLLAMA_NUM_PARALLEL", "10"))
+CONNECT_TIMEOUT = float(os.getenv("CHRONO_CONNECT_TIMEOUT", "5"))  # seconds
+READ_TIMEOUT = float(os.getenv("CHRONO_READ_TIMEOUT", "300"))  # seconds between streamed bytes
+
+##############################
+# Deadlines, retries and hedging
+##############################
+# Seconds one attempt may take end to end (0 = no deadline); each read also times out after at most this long
+REQUEST_DEADLINE = float(os.getenv("CHRONO_REQUEST_DEADLINE", "300"))
+# Retries of transient failures (connection errors, timeouts, HTTP 408/429/5xx) after full-jitter exponential backoff
+MAX_RETRIES = int(os.getenv("CHRONO_MAX_RETRIES", "2"))
+RETRY_BACKOFF = float(os.getenv("CHRONO_RETRY_BACKOFF", "0.5"))  # seconds before the first retry, doubled per retry
+RETRY_BACKOFF_MAX = float(os.getenv("CHRONO_RETRY_BACKOFF_MAX", "8"))
+# Hedging: duplicate a request still running after this percentile of the model's recent latencies (e.g. 95)
+HEDGE_PERCENTILE = float(os.environ["CHRONO_HEDGE_PERCENTILE"]) if os.getenv("CHRONO_HEDGE_PERCENTILE") else None
+HEDGE_MIN_SAMPLES = int(os.getenv("CHRONO_HEDGE_MIN_SAMPLES", "20"))  # latencies seen before hedging starts
+# Let the first attempt finish even when its hedge wins, to measure p99 without hedging in the same run
+IS_HEDGE_SHADOW = os.getenv("CHRONO_HEDGE_SHADOW", "0") == "1"
+
+##############################
+# Adaptive concurrency
+##############################
+# fixed: -w sets the requests in flight | aimd: +1 per window while throughput improves, x0.75 on
+# errors or rising latency | gradient: scale by baseline/current latency plus a sqrt(limit) probe
+CONCURRENCY_MODE = os.getenv("CHRONO_CONCURRENCY", "fixed")
+CONCURRENCY_INITIAL = int(os.getenv("CHRONO_CONCURRENCY_INITIAL", "2"))
+# Ceiling on requests in flight per process when -w is not given
+CONCURRENCY_MAX = int(os.getenv("CHRONO_CONCURRENCY_MAX", "64"))
+# Time to first token above this multiple of the no-load baseline counts as queueing
+CONCURRENCY_TOLERANCE = float(os.getenv("CHRONO_CONCURRENCY_TOLERANCE", "2.0"))
+
+##############################
+# Model warm-up and keep-alive
+##############################
+# Load every model on every backend before the timed run, so load time is not counted in it
+IS_WARMUP = os.getenv("CHRONO_WARMUP", "1") != "0"
+# Unload the warmed models (keep_alive 0) once the run is over
+IS_RELEASE_MODELS = os.getenv("CHRONO_RELEASE_MODELS", "1") != "0"
+# keep_alive sent with every request: a duration such as "30m", or seconds (-1 keeps models until released)
+KEEP_ALIVE = os.getenv("CHRONO_KEEP_ALIVE", "30m")
+KEEP_ALIVE = int(KEEP_ALIVE) if KEEP_ALIVE.lstrip("-").isdigit() else KEEP_ALIVE
+# Requests whose server-reported load time reaches this count as cold starts in the telemetry summary
+COLD_LOAD_SECONDS = float(os.getenv("CHRONO_COLD_LOAD_SECONDS", "0.1"))
+
+##############################
+# Response decoding
+##############################
+# Bytes read from a streamed response at a time (lines split across reads are reassembled)
+STREAM_CHUNK_BYTES = int(os.getenv("CHRONO_STREAM_CHUNK_BYTES", "65536"))
+# Request "stream": false and parse one body per response; TTFT is not measured (ignored in verdict-only mode)
+IS_BULK_RESPONSE = os.getenv("CHRONO_BULK_RESPONSE", "0") == "1"
+
+##############################
+# Verdict-only generation
+##############################
+# Stop each generation once the leading TRUE/FALSE has streamed instead of reading the full justification
+IS_VERDICT_ONLY = os.getenv("CHRONO_VERDICT_ONLY", "0") == "1"
+# Characters of justification to keep after the verdict (0 keeps the verdict only)
+VERDICT_JUSTIFICATION_CHARS = int(os.getenv("CHRONO_VERDICT_JUSTIFICATION_CHARS", "0"))
+# Server-side token limit sent as num_predict in verdict-only mode (0 sends no limit)
+VERDICT_NUM_PREDICT = int(os.getenv("CHRONO_VERDICT_NUM_PREDICT", "16"))
+
+##############################
+# Response cache
+##############################
+# Opt-in: set CHRONO_CACHE=1 to answer repeated prompts from disk (timing runs must leave it off)
+IS_CACHE_ENABLED = os.getenv("CHRONO_CACHE", "0") == "1"
+CACHE_PATH = os.getenv("CHRONO_CACHE_PATH", os.path.abspath("data/cache/responses.sqlite"))
+CACHE_MAX_BYTES = int(os.getenv("CHRONO_CACHE_MAX_MB", "512")) * 1024 * 1024
+CACHE_MAX_AGE = float(os.getenv("CHRONO_CACHE_MAX_AGE_DAYS", "30")) * 24 * 3600
+
+##############################
+# Early-exit quorum voting
+##############################
+# off: run the full grid | quorum: skip a prompt's remaining tasks once its verdict is fixed
+# shadow: run the full grid but report what quorum would have saved and how often it agrees
+QUORUM_MODE = os.getenv("CHRONO_QUORUM", "off")
+# Optional confidence-based stop (e.g. 0.95); unset stops only when the majority is mathematically fixed
+QUORUM_CONFIDENCE = float(os.environ["CHRONO_QUORUM_CONFIDENCE"]) if os.getenv("CHRONO_QUORUM_CONFIDENCE") else None
+QUORUM_MIN_VOTES = int(os.getenv("CHRONO_QUORUM_MIN_VOTES", "3"))
+
+##############################
+# Layer-2 -> layer-3 feedback
+##############################
+# serial: each layer-3 prompt carries the agreement count of the prompt's earlier tasks, as the serial
+#         engine sends it; a prompt's layer-3 tasks run in order while many prompts run in parallel
+# layer2: a prompt's layer-3 tasks all start once its layer 2 is in, carrying the layer-2 count
+# off: every task starts at once and layer-3 prompts carry no count (-1); needed for model affinity
+FEEDBACK_MODE = os.getenv("CHRONO_FEEDBACK", "serial")
+# Prompts in flight in the pipeline (0 = twice the engine's concurrency)
+PIPELINE_PROMPTS = int(os.getenv("CHRONO_PIPELINE_PROMPTS", "0"))
+
+##############################
+# Model-affinity scheduling
+##############################
+# Group tasks by model and give each worker/rank as few models as possible. Models run in phases of
+# OLLAMA_MAX_LOADED_MODELS, and threads/ranks wait for each other between phases to stay within that budget
+IS_MODEL_AFFINITY = os.getenv("CHRONO_MODEL_AFFINITY", "0") == "1"
+
+##############################
+# MPI scheduling
+##############################
+# static: scatter equal chunks once | dynamic: rank 0 coordinates and hands out chunks on request
+MPI_SCHEDULE = os.getenv("CHRONO_MPI_SCHEDULE", "static")
+# Dynamic chunks are remaining_tasks / (MPI_CHUNK_FACTOR * workers), never below MPI_MIN_CHUNK
+MPI_CHUNK_FACTOR = float(os.getenv("CHRONO_MPI_CHUNK_FACTOR", "2"))
+MPI_MIN_CHUNK = int(os.getenv("CHRONO_MPI_MIN_CHUNK", "1"))
+# Hybrid mode: concurrent requests each rank keeps in flight (1 = one request at a time)
+MPI_THREADS_PER_RANK = int(os.getenv("CHRONO_MPI_THREADS_PER_RANK", "1"))
+# Hybrid mode: give each rank its own share of OLLAMA_BACKENDS instead of all of them
+IS_MPI_SPREAD_BACKENDS = os.getenv("CHRONO_MPI_SPREAD_BACKENDS", "0") == "1"
+
+##############################
+# Result journal
+##############################
+# Directory of append-only per-process journals of finished tasks (main.py --resume reads them); unset disables
+JOURNAL_DIR = os.getenv("CHRONO_JOURNAL_DIR", "")
+JOURNAL_BATCH = int(os.getenv("CHRONO_JOURNAL_BATCH", "64"))  # records per fsync
+JOURNAL_FLUSH_SECONDS = float(os.getenv("CHRONO_JOURNAL_FLUSH_SECONDS", "2"))  # max age of an unsynced batch
+
+##############################
+# Result store
+##############################
+# Keep response texts next to the results: unset drops them, "memory" keeps them in RAM,
+# any other value is a directory of per-process, memory-mapped text files
+JUSTIFICATIONS = os.getenv("CHRONO_JUSTIFICATIONS", "")
+
+##############################
+# Request telemetry
+##############################
+# Directory for telemetry.jsonl (one record per request) and telemetry_histograms.json; unset only prints the summary
+TELEMETRY_DIR = os.getenv("CHRONO_TELEMETRY_DIR", "")
+
+##############################
+# Task log
+##############################
+# console: print every task line (from a background thread) | summary: print only task errors and the
+# run summaries | off: drop per-task lines before they are formatted
+TASK_LOG = os.getenv("CHRONO_TASK_LOG", "console")
+# Directory of per-process JSONL task logs (tasks-<host>-<pid>.jsonl), written in batches; unset writes none
+TASK_LOG_DIR = os.getenv("CHRONO_TASK_LOG_DIR", "")
+TASK_LOG_BATCH = int(os.getenv("CHRONO_TASK_LOG_BATCH", "256"))  # records per write
+TASK_LOG_FLUSH_SECONDS = float(os.getenv("CHRONO_TASK_LOG_FLUSH_SECONDS", "2"))  # max age of an unwritten batch
+
+# Seconds between perf_monitor samples for main.py --monitor
+MONITOR_INTERVAL = float(os.getenv("CHRONO_MONITOR_INTERVAL", "0.5"))
+
 ##############################
 # Miscellaneous
 ##############################
@@ -41,6 +195,13 @@ MODELS = ["llama3", "phi", "gemma"]
 # ROLES = ["Engineer", "Philosophy Professor", "Mathematician", "Social Scientist", "Physicist", "Astronomer", "Molecular Biologist", "Medical Doctor", "Social Worker", "Occupational Therapist"]
 ROLES = ["Engineer", "Philosophy Professor"]
 
+# Pools that main.py -m/-r select from when given a count instead of names
+ALL_MODELS = ["llama3", "phi", "gemma", "mistral"]
+ALL_ROLES = ["Engineer", "Philosophy Professor", "Mathematician", "Social Scientist", "Physicist", "Astronomer", "Molecular Biologist", "Medical Doctor", "Social Worker", "Occupational Therapist"]
+
+# Memory budget: how many models the server can hold at once
+MAX_LOADED_MODELS = int(os.getenv("OLLAMA_MAX_LOADED_MODELS", str(len(MODELS))))
+
 ##############################
 # Tokens
 ##############################
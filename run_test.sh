@@ -4,6 +4,9 @@
 #       ./run_test_2.sh | tee result_$(date +"%Y%m%d_%H%M").txt 
 # 
 
+# Timing runs must not be answered from the response cache
+export CHRONO_CACHE=0
+
 echo "#####################"
 echo "    Serial"
 echo "#####################"
@@ -18,6 +21,20 @@ echo "python main_shared_mem.py"
 python main_shared_mem.py
 echo ""
 
+echo "#####################"
+echo "    Parallel - asyncio"
+echo "#####################"
+echo "python main_async.py"
+python main_async.py
+echo ""
+
+echo "#####################"
+echo "    Parallel - Process Pool"
+echo "#####################"
+echo "python main_processes.py"
+python main_processes.py
+echo ""
+
 echo "#####################"
 echo "    Parallel - MPI"
 echo "#####################"
@@ -6,6 +6,9 @@
 # Define script name for dynamic usage display
 script_name=$(basename "$0")
 
+# Timing runs must not be answered from the response cache
+export CHRONO_CACHE=0
+
 # Results directory
 results_dir="results"
 mkdir -p "$results_dir"
@@ -34,6 +37,16 @@ echo "Results will be logged to: $log_file"
     python main_shared_mem.py
     echo ""
 
+    print_section "Parallel - asyncio"
+    echo "python main_async.py"
+    python main_async.py
+    echo ""
+
+    print_section "Parallel - Process Pool"
+    echo "python main_processes.py"
+    python main_processes.py
+    echo ""
+
     print_section "Parallel - MPI"
     for n in 4 3 2 1; do
         echo "mpirun -n $n python main_mpi.py"
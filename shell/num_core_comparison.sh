@@ -39,6 +39,9 @@ if [[ "$#" -eq 2 ]]; then
     num_roles="$2"
 fi
 
+# Timing runs must not be answered from the response cache
+export CHRONO_CACHE=0
+
 # Verify results directory exists
 results_dir="results/num_cores"
 mkdir -p "$results_dir"
@@ -46,5 +49,5 @@ mkdir -p "$results_dir"
 # Main loop to run the script with varying number of processes
 for i in {1..16}; do
     echo "Running with $i MPI processes, $num_models models, and $num_roles roles..."
-    mpiexec -n "$i" python main_mpi.py "-m $num_models" "-r $num_roles" | tee "$results_dir/result_num_cores_$(date +"%Y%m%d_%H%M").txt"
+    mpiexec -n "$i" python main.py --engine mpi -m "$num_models" -r "$num_roles" | tee "$results_dir/result_num_cores_$(date +"%Y%m%d_%H%M").txt"
 done
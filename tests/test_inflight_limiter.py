@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+import chrono_modules.ollama_async as ollama_async
+import chrono_modules.ollama_helper as ollama_helper
+
+
+class FixedController:
+    """Stand-in for a ConcurrencyController whose limit stays at allowed."""
+    def __init__(self, allowed):
+        self.allowed = allowed
+        self.inflight = 0
+
+    def try_acquire(self):
+        if self.inflight >= self.allowed:
+            return False
+        self.inflight += 1
+        return True
+
+    def release(self):
+        self.inflight -= 1
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    controller = FixedController(2)
+    monkeypatch.setattr(ollama_helper, "_concurrency_controller", controller)
+    return controller
+
+
+def test_finished_hedge_wakes_requests_waiting_for_a_slot(controller):
+    async def scenario():
+        limiter = ollama_async.InflightLimiter(4, 4)
+        waiter_started = asyncio.Event()
+
+        async def waiter():
+            async with limiter.slot("m1"):
+                waiter_started.set()
+
+        async with limiter.slot("m1"):
+            # This request's hedge takes the last controller slot, as _hedged_attempt_async does
+            assert ollama_helper.try_hedge_slot()
+            hedge = asyncio.get_running_loop().create_future()
+            hedge.add_done_callback(ollama_async.release_hedge_slot)
+            blocked = asyncio.ensure_future(waiter())
+            await asyncio.sleep(0.01)
+            assert not waiter_started.is_set()
+
+            # The hedge ends while its primary still holds a slot: the waiter must not wait for the primary
+            hedge.cancel()
+            await asyncio.wait_for(waiter_started.wait(), timeout=1)
+        await blocked
+        assert controller.inflight == 0
+
+    asyncio.run(scenario())
+
+
+def test_release_outside_a_slot_only_returns_the_slot(controller):
+    assert ollama_helper.try_hedge_slot()
+    ollama_async.release_hedge_slot()
+    assert controller.inflight == 0
@@ -0,0 +1,133 @@
+import pytest
+
+pytest.importorskip("mpi4py")
+
+import chrono_modules.engines.mpi as mpi
+import resources.common as cmn
+from classes.DecisionResult import DecisionResult
+from classes.PromptPipeline import PromptPipeline
+from classes.QuorumTracker import QuorumTracker
+from mpi4py import MPI
+
+
+def make_tasks(n):
+    return [(task_id, "m1", f"p{task_id}", 2, "Generalist") for task_id in range(n)]
+
+
+def fields(task_id, agree=1):
+    return task_id, agree, 1, 0.1, None
+
+
+@pytest.fixture(autouse=True)
+def single_task_chunks(monkeypatch):
+    monkeypatch.setattr(cmn, "MPI_MIN_CHUNK", 1)
+    monkeypatch.setattr(cmn, "MPI_CHUNK_FACTOR", 100)
+
+
+def make_state(feed, n_workers=2):
+    return mpi.CoordinatorState(feed, QuorumTracker(0, mode="off"), n_workers, 1)
+
+
+def task_ids(action):
+    tag, chunk = action
+    assert tag == mpi.TAG_WORK
+    return [item[0] for item in chunk]
+
+
+def test_straggler_is_reissued_and_the_losing_copy_cancelled():
+    state = make_state(mpi.TaskFeed(make_tasks(2)))
+    assert task_ids(state.dispatch(1)) == [0]
+    assert task_ids(state.dispatch(2)) == [1]
+    assert state.finish(1, 0, DecisionResult(*fields(0))) == (True, None, [])
+
+    # Nothing fresh left: the idle worker gets a copy of the task still running on rank 2
+    assert task_ids(state.dispatch(1)) == [1]
+    assert state.finish(1, 1, DecisionResult(*fields(1))) == (True, 2, [])
+    # Rank 2's copy reports anyway (the cancel crossed its result) and is dropped
+    assert state.finish(2, 1, DecisionResult(*fields(1))) == (False, None, [])
+
+    assert state.dispatch(1) == (mpi.TAG_STOP, None)
+    assert state.dispatch(2) == (mpi.TAG_STOP, None)
+    assert not state.is_running()
+    assert state.stats() == {"reissued": 1, "cancelled": 1, "duplicates": 1}
+
+
+def test_reissued_copy_losing_cancels_its_own_rank():
+    state = make_state(mpi.TaskFeed(make_tasks(1)))
+    assert task_ids(state.dispatch(1)) == [0]
+    assert task_ids(state.dispatch(2)) == [0]  # Re-issued at once: nothing else to do
+    assert state.finish(1, 0, DecisionResult(*fields(0))) == (True, 2, [])
+
+
+def test_a_worker_never_gets_a_copy_of_its_own_task():
+    state = make_state(mpi.TaskFeed(make_tasks(1)), n_workers=1)
+    assert task_ids(state.dispatch(1)) == [0]
+    assert state.dispatch(1) is None  # Parked until the task finishes
+    assert state.finish(1, 0, DecisionResult(*fields(0))) == (True, None, [1])
+    assert state.dispatch(1) == (mpi.TAG_STOP, None)
+    assert state.stats()["reissued"] == 0
+
+
+def test_parked_worker_is_retried_when_a_result_releases_layer3():
+    tasks = [(0, "m1", "p", 2, "Generalist"), (0, "m1", "p", 3, "r1")]
+    state = make_state(PromptPipeline(tasks, mode="serial"))
+    assert task_ids(state.dispatch(1)) == [0]
+    # Layer 3 waits for layer 2, and nothing is re-issued while the pipeline still holds tasks
+    assert state.dispatch(2) is None
+    is_new, loser, waiting = state.finish(1, 0, DecisionResult(0, 1, 1, 0.1, None))
+    assert (is_new, loser, waiting) == (True, None, [2])
+    tag, [item] = state.dispatch(2)
+    assert (tag, item[0], item[2:]) == (mpi.TAG_WORK, 1, (1, 1))
+
+
+class FakeComm:
+    """Replays scripted (source, tag, message) receives and records what the coordinator sends."""
+    def __init__(self, size, script):
+        self.size = size
+        self.script = list(script)
+        self.sent = []
+
+    def Get_size(self):
+        return self.size
+
+    def recv(self, source, tag, status):
+        source, tag, message = self.script.pop(0)
+        status.Set_source(source)
+        status.Set_tag(tag)
+        return message
+
+    def send(self, message, dest, tag):
+        self.sent.append((dest, tag, message and [item[0] for item in message]))
+
+    def isend(self, message, dest, tag):
+        self.sent.append((dest, tag, message))
+        return MPI.REQUEST_NULL
+
+
+def test_run_coordinator_reissues_and_cancels(monkeypatch):
+    monkeypatch.setattr(cmn, "FEEDBACK_MODE", "off")
+    comm = FakeComm(3, [
+        (1, mpi.TAG_REQUEST, None),
+        (2, mpi.TAG_REQUEST, None),
+        (1, mpi.TAG_RESULT, (0, fields(0))),
+        (1, mpi.TAG_REQUEST, None),
+        (1, mpi.TAG_RESULT, (1, fields(1, agree=0))),
+        (2, mpi.TAG_RESULT, (1, fields(1))),
+        (1, mpi.TAG_REQUEST, None),
+        (2, mpi.TAG_REQUEST, None),
+    ])
+    emitted = []
+    stats = mpi.run_coordinator(comm, make_tasks(2), QuorumTracker(0, mode="off"), 1, emitted.append)
+
+    assert comm.sent == [
+        (1, mpi.TAG_WORK, [0]),
+        (2, mpi.TAG_WORK, [1]),
+        (1, mpi.TAG_WORK, [1]),
+        (2, mpi.TAG_CANCEL, [1]),
+        (1, mpi.TAG_STOP, None),
+        (2, mpi.TAG_STOP, None),
+    ]
+    # Only the winning copy's result is emitted
+    assert [tuple(result) for result in emitted] == [(0, 1, 1), (1, 0, 1)]
+    assert stats == {"reissued": 1, "cancelled": 1, "duplicates": 1}
+    assert not comm.script
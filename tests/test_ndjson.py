@@ -0,0 +1,88 @@
+import importlib.util
+import json
+import sys
+
+import pytest
+
+import chrono_modules.ollama_helper as ollama_helper
+import resources.common as cmn
+from chrono_modules.mock_ollama import start_mock_server
+from chrono_modules.ollama_helper import NDJSONDecoder, iter_ndjson
+
+OBJECTS = [
+    {"model": "m1", "response": "TRUE", "done": False},
+    {"model": "m1", "response": " café ✓ 東京", "done": False},
+    {"model": "m1", "response": "", "done": True, "eval_count": 3, "eval_duration": 1234567890, "ratio": 0.25, "tags": [1, None]},
+]
+DATA = b"".join(json.dumps(obj, ensure_ascii=False).encode("utf-8") + b"\n" for obj in OBJECTS)
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(DATA)])
+def test_lines_split_across_chunks(size):
+    # Size 1 also cuts every multi-byte UTF-8 character in two
+    assert list(iter_ndjson(chunked(DATA, size))) == OBJECTS
+
+
+def test_feed_returns_only_completed_lines():
+    decoder = NDJSONDecoder()
+    first, rest = DATA.split(b"\n", 1)
+    assert decoder.feed(first[:10]) == []
+    assert decoder.feed(first[10:]) == []
+    assert decoder.feed(b"\n" + rest[:5]) == [OBJECTS[0]]
+    assert decoder.feed(rest[5:]) == OBJECTS[1:]
+    assert decoder.close() == []
+
+
+def test_blank_lines_and_missing_final_newline():
+    data = b"\n" + DATA.replace(b"\n", b"\r\n\n").rstrip()
+    assert list(iter_ndjson(chunked(data, 5))) == OBJECTS
+
+
+def test_orjson_and_json_decode_alike():
+    pytest.importorskip("orjson")
+    import orjson
+    chunks = chunked(DATA, 5)
+    assert list(iter_ndjson(chunks, orjson.loads)) == list(iter_ndjson(chunks, json.loads)) == OBJECTS
+
+
+def test_module_falls_back_to_json_without_orjson(monkeypatch):
+    """A fresh copy of ollama_helper imported while orjson is unavailable."""
+    monkeypatch.setitem(sys.modules, "orjson", None)  # Makes "import orjson" raise ImportError
+    spec = importlib.util.spec_from_file_location("ollama_helper_without_orjson", ollama_helper.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    assert module.orjson is None
+    assert isinstance(module.json_loads.__self__, json.JSONDecoder)
+    assert list(module.iter_ndjson(chunked(DATA, 3))) == OBJECTS
+    assert module.json_loads(DATA.split(b"\n")[2].decode("utf-8")) == OBJECTS[2]
+
+
+def test_bulk_response_only_outside_verdict_only_mode(monkeypatch):
+    monkeypatch.setattr(cmn, "IS_BULK_RESPONSE", True)
+    assert ollama_helper.is_bulk_response(verdict_only=False)
+    assert not ollama_helper.is_bulk_response(verdict_only=True)  # Needs the stream to stop early
+    monkeypatch.setattr(cmn, "IS_BULK_RESPONSE", False)
+    assert not ollama_helper.is_bulk_response(verdict_only=False)
+
+
+def test_bulk_body_matches_the_streamed_response():
+    requests = pytest.importorskip("requests")
+    server = start_mock_server(ttft=0, token_delay=0, tokens=6)
+    try:
+        payload = {"model": "m1", "prompt": "Is water wet?"}
+        with requests.post(f"{server.url}/api/generate", json=payload, stream=True) as response:
+            streamed = list(iter_ndjson(response.iter_content(chunk_size=16)))
+        response = requests.post(f"{server.url}/api/generate", json={**payload, "stream": False})
+        bulk = ollama_helper.json_loads(response.content.decode("utf-8"))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert streamed[-1]["done"] and bulk["done"]
+    assert "".join(obj["response"] for obj in streamed) == bulk["response"]
+    assert streamed[-1]["eval_count"] == bulk["eval_count"] == 6
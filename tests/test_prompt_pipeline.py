@@ -0,0 +1,164 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import chrono_modules.engines.threads as threads
+import chrono_modules.tasks as tasks_module
+import resources.common as cmn
+from classes.DecisionResult import DecisionResult
+from classes.PromptPipeline import PromptPipeline, WAIT
+
+MODELS = ["m1", "m2"]
+ROLES = ["r1", "r2"]
+
+
+def make_tasks(n_prompts):
+    """The engines' task grid with placeholder prompt texts: per prompt, layer 2 per model, then layer 3 per model and role."""
+    tasks = []
+    for prompt_id in range(n_prompts):
+        tasks += [(prompt_id, model, f"p{prompt_id}", 2, tasks_module.DEFAULT_ROLE) for model in MODELS]
+        tasks += [(prompt_id, model, f"p{prompt_id}", 3, role) for model in MODELS for role in ROLES]
+    return tasks
+
+
+def drain_ready(pipeline):
+    """Every item ready right now."""
+    items = []
+    while (item := pipeline.try_get()) not in (WAIT, None):
+        items.append(item)
+    return items
+
+
+def verdict(task_id):
+    """Fake result of a task: agree on every task id divisible by 3, decide on all but 7."""
+    return int(task_id % 3 == 0), int(task_id != 7)
+
+
+def run_all(pipeline):
+    """Complete every item as it is released, one at a time; returns the items in release order."""
+    released = []
+    while (item := pipeline.try_get()) is not None:
+        assert item is not WAIT  # Completing every item at once never leaves the pipeline waiting
+        released.append(item)
+        task_id, task = item[:2]
+        pipeline.complete(task, (task[0], *verdict(task_id)))
+    return released
+
+
+def test_layer2_released_at_admission_and_layer3_waits():
+    pipeline = PromptPipeline(make_tasks(1), mode="serial", max_prompts=1)
+    first = drain_ready(pipeline)
+    assert [item[0] for item in first] == [0, 1]
+    assert pipeline.try_get() is WAIT
+    pipeline.complete(first[0][1], (0, 1, 1))
+    assert pipeline.try_get() is WAIT  # Layer 3 waits for the whole of layer 2
+    pipeline.complete(first[1][1], (0, 0, 1))
+    assert drain_ready(pipeline) == [(2, make_tasks(1)[2], 1, 2)]
+
+
+def test_serial_mode_chains_layer3_with_running_counts():
+    tasks = make_tasks(2)
+    released = run_all(PromptPipeline(tasks, mode="serial", max_prompts=1))
+    assert [item[0] for item in released] == list(range(len(tasks)))
+
+    for task_id, task, agree_count, decision_count in released:
+        if task[3] == 3:
+            # Every earlier task of the prompt, exactly what the serial engine sends
+            earlier = [verdict(i) for i in range(len(tasks)) if tasks[i][0] == task[0] and i < task_id]
+            assert (agree_count, decision_count) == (sum(a for a, _ in earlier), sum(d for _, d in earlier))
+
+
+def test_layer2_mode_releases_layer3_together_with_layer2_counts():
+    tasks = make_tasks(1)
+    pipeline = PromptPipeline(tasks, mode="layer2", max_prompts=1)
+    layer2 = drain_ready(pipeline)
+    for task_id, task, _, _ in layer2:
+        pipeline.complete(task, (0, *verdict(task_id)))
+    layer3 = drain_ready(pipeline)
+    assert [item[0] for item in layer3] == [2, 3, 4, 5]
+    expected = (sum(verdict(i)[0] for i in (0, 1)), sum(verdict(i)[1] for i in (0, 1)))
+    assert {item[2:] for item in layer3} == {expected}
+    for task_id, task, _, _ in layer3:
+        pipeline.complete(task, (0, *verdict(task_id)))
+    assert pipeline.try_get() is None
+
+
+def test_skipped_task_releases_without_counting():
+    tasks = make_tasks(1)
+    pipeline = PromptPipeline(tasks, mode="serial")
+    for _, task, _, _ in drain_ready(pipeline):
+        pipeline.complete(task, None)  # e.g. skipped by quorum
+    [(task_id, task, agree_count, decision_count)] = drain_ready(pipeline)
+    assert (task_id, agree_count, decision_count) == (2, 0, 0)
+
+
+def test_max_prompts_bounds_the_prompts_in_flight():
+    pipeline = PromptPipeline(make_tasks(3), mode="serial", max_prompts=2)
+    ready = drain_ready(pipeline)
+    assert {item[1][0] for item in ready} == {0, 1}
+
+    # Run prompt 1 to the end while prompt 0's layer 2 stays outstanding
+    prompt1 = [item for item in ready if item[1][0] == 1]
+    admitted = []
+    while prompt1:
+        assert 2 not in pipeline.prompts
+        item = prompt1.pop(0)
+        pipeline.complete(item[1], (1, 1, 1))
+        for ready_item in drain_ready(pipeline):
+            (prompt1 if ready_item[1][0] == 1 else admitted).append(ready_item)
+    # Prompt 1's end freed its slot: prompt 2's layer 2 is released, nothing more of prompt 0
+    assert [item[0] for item in admitted] == [12, 13]
+    assert set(pipeline.prompts) == {0, 2}
+    assert pipeline.is_feeding()
+
+
+def test_get_blocks_until_a_result_releases_the_next_task():
+    tasks = make_tasks(1)
+    pipeline = PromptPipeline(tasks, mode="serial")
+    layer2 = [pipeline.get(), pipeline.get()]
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pipeline.get()))
+    waiter.start()
+    waiter.join(0.05)
+    assert waiter.is_alive()
+    for task_id, task, _, _ in layer2:
+        pipeline.complete(task, (0, 1, 1))
+    waiter.join(5)
+    assert got == [(2, tasks[2], 2, 2)]
+
+
+def test_resumed_counts_seed_admitted_prompts():
+    # Layer 2 and the first layer-3 task were journaled; the pipeline only sees the rest
+    tasks = make_tasks(1)[3:]
+    resumed = {0: {2: [1, 2], 3: [1, 1]}}
+    serial = PromptPipeline(tasks, mode="serial", resumed=dict(resumed))
+    assert drain_ready(serial)[0][2:] == (2, 3)
+    layer2 = PromptPipeline(tasks, mode="layer2", resumed=dict(resumed))
+    assert {item[2:] for item in drain_ready(layer2)} == {(1, 2)}
+
+
+@pytest.mark.parametrize("mode", ["serial", "layer2", "off"])
+def test_threads_engine_counts_by_mode(monkeypatch, mode):
+    """Counts each layer-3 task is sent with, per CHRONO_FEEDBACK mode, when driven by the threads engine."""
+    monkeypatch.setattr(cmn, "FEEDBACK_MODE", mode)
+    tasks = make_tasks(3)
+    task_ids = {task: task_id for task_id, task in enumerate(tasks)}
+    sent = {}
+
+    def run_task(task, agree_count=-1, decision_count=-1):
+        sent[task] = (agree_count, decision_count)
+        return DecisionResult(task[0], *verdict(task_ids[task]), 0.0)
+
+    monkeypatch.setattr(tasks_module, "run_task", run_task)
+    threads.run(tasks, SimpleNamespace(models=MODELS, roles=ROLES, workers=4))
+
+    assert set(sent) == set(tasks)
+    for task_id, task in enumerate(tasks):
+        if task[3] != 3:
+            continue
+        earlier = [i for i in range(task_id) if tasks[i][0] == task[0]]
+        if mode == "layer2":
+            earlier = [i for i in earlier if tasks[i][3] == 2]
+        expected = (sum(verdict(i)[0] for i in earlier), sum(verdict(i)[1] for i in earlier))
+        assert sent[task] == ((-1, -1) if mode == "off" else expected)
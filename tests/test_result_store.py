@@ -0,0 +1,74 @@
+import math
+import pickle
+
+import numpy as np
+
+from classes.DecisionResult import DecisionResult
+from classes.JustificationArena import JustificationArena
+from classes.ResultStore import ResultStore, NOT_RUN, FAILED, FALSE, TRUE
+
+
+def rows(store):
+    return [
+        (result.prompt_id, result.agree, result.decision, None if result.seconds is None else round(result.seconds, 3), result.justification)
+        for result in store.results()
+    ]
+
+
+def round_trip(store):
+    return pickle.loads(pickle.dumps(store))
+
+
+def grid_store(arena=None):
+    """Grid-ordered results with runs of equal prompt ids, a failure, a gap and a result without seconds."""
+    store = ResultStore(4, arena)
+    for prompt_id, agree, decision, seconds in [(0, 1, 1, 0.5), (0, 0, 1, 0.25), (0, 0, 0, 1.0), (1, 1, 1, 2.0), (3, 0, 1, 0.75)]:
+        store.append(DecisionResult(prompt_id, agree, decision, seconds, f"text {prompt_id}" if decision else None))
+    store.put(7, (3, 1, 1))  # Ids 5 and 6 stay NOT_RUN
+    return store
+
+
+def test_round_trip_keeps_every_column():
+    store = grid_store()
+    copy = round_trip(store)
+    assert len(copy) == len(store) == 8
+    for name in ("prompt_id", "code"):
+        assert np.array_equal(copy.view(name), store.view(name))
+        assert copy.view(name).dtype == store.view(name).dtype
+    assert np.array_equal(copy.view("seconds"), store.view("seconds"), equal_nan=True)
+    assert copy.view("code").tolist() == [TRUE, FALSE, FAILED, TRUE, FALSE, NOT_RUN, NOT_RUN, TRUE]
+    assert rows(copy) == rows(store)
+    assert math.isnan(copy.view("seconds")[7])
+    assert copy.aggregate() == store.aggregate() == {0: {"agree": 1, "decision": 2}, 1: {"agree": 1, "decision": 1}, 3: {"agree": 1, "decision": 2}}
+
+
+def test_round_trip_keeps_texts_and_stays_writable():
+    store = grid_store(JustificationArena())
+    copy = round_trip(store)
+    assert [row[4] for row in rows(copy)] == ["text 0", "text 0", None, "text 1", "text 3", None]
+    copy.append((4, 1, 1))
+    assert len(copy) == 9 and copy.aggregate()[4] == {"agree": 1, "decision": 1}
+
+
+def test_round_trip_of_empty_store():
+    copy = round_trip(ResultStore(16))
+    assert len(copy) == 0 and list(copy) == [] and copy.aggregate() == {}
+    copy.append((2, 0, 1))
+    assert list(copy) == [(2, 0, 1)]
+
+
+def test_pickle_collapses_prompt_id_runs():
+    store = ResultStore()
+    store.extend([(prompt_id, 1, 1) for prompt_id in range(10) for _ in range(12)])
+    state = store.__getstate__()
+    assert state["prompt_id_values"].tolist() == list(range(10))
+    assert state["prompt_id_runs"].tolist() == [12] * 10
+    assert round_trip(store).aggregate() == store.aggregate()
+
+
+def test_concatenate_of_gathered_stores():
+    stores = [round_trip(grid_store()), round_trip(ResultStore(1)), round_trip(grid_store())]
+    merged = ResultStore.concatenate(stores)
+    assert len(merged) == 16
+    assert [row[:4] for row in rows(merged)] == [row[:4] for row in rows(stores[0])] * 2
+    assert merged.aggregate()[0] == {"agree": 2, "decision": 4}
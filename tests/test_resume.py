@@ -0,0 +1,106 @@
+import json
+import os
+import zlib
+from types import SimpleNamespace
+
+import pytest
+
+import chrono_modules.engines.serial as serial
+import chrono_modules.engines.threads as threads
+import chrono_modules.ollama_helper as ollama_helper
+import chrono_modules.tasks as tasks_module
+import resources.common as cmn
+from classes.ResultJournal import ResultJournal
+from classes.ResultStore import ResultStore
+
+MODELS = ["m1", "m2"]
+ROLES = ["r1", "r2"]
+PROMPTS = [f"Claim number {n} holds." for n in range(4)]
+TASKS_PER_PROMPT = tasks_module.votes_per_prompt(MODELS, ROLES)
+
+
+@pytest.fixture
+def sent(monkeypatch, tmp_path):
+    """Fake backend answering from a hash of the prompt text (which holds the layer-3 counts); records every prompt."""
+    prompts = []
+
+    def query_ollama(model, prompt, **kwargs):
+        prompts.append((model, prompt))
+        return "TRUE, it holds" if zlib.crc32(f"{model}|{prompt}".encode()) % 3 else "FALSE, it does not"
+
+    monkeypatch.setattr(ollama_helper, "query_ollama", query_ollama)
+    monkeypatch.setattr(cmn, "JOURNAL_DIR", str(tmp_path / "journal"))
+    monkeypatch.setattr(tasks_module, "_journal", None)
+    tasks_module.set_resumed_counts({})
+    yield prompts
+    tasks_module.set_resumed_counts({})
+
+
+def run(engine, tasks):
+    results = engine.run(tasks, SimpleNamespace(models=MODELS, roles=ROLES, workers=3))
+    tasks_module.get_journal().flush()
+    return results
+
+
+def resume(engine, tasks):
+    """Run the tasks the journal does not have yet; returns (new results, resumed results)."""
+    resumed = tasks_module.make_result_store()
+    remaining = list(tasks_module.skip_completed(tasks, ResultJournal.load(cmn.JOURNAL_DIR), resumed.append))
+    return run(engine, remaining), resumed
+
+
+@pytest.mark.parametrize("engine,mode", [(serial, "serial"), (threads, "serial"), (threads, "layer2")])
+@pytest.mark.parametrize("stop", [TASKS_PER_PROMPT + 1, TASKS_PER_PROMPT + 4, 2 * TASKS_PER_PROMPT])
+def test_resume_matches_uninterrupted_run(sent, monkeypatch, engine, mode, stop):
+    monkeypatch.setattr(cmn, "FEEDBACK_MODE", mode)
+    tasks = tasks_module.build_tasks(PROMPTS, MODELS, ROLES)
+    expected = run(engine, tasks).aggregate()
+    expected_prompts = sorted(sent)
+
+    # A fresh journal: interrupted after the first stop tasks, then resumed
+    sent.clear()
+    monkeypatch.setattr(cmn, "JOURNAL_DIR", cmn.JOURNAL_DIR + "-resumed")
+    monkeypatch.setattr(tasks_module, "_journal", None)
+    run(engine, tasks[:stop])
+    results, resumed = resume(engine, tasks)
+
+    assert len(resumed) == stop
+    assert sorted(sent) == expected_prompts
+    assert ResultStore.concatenate([results, resumed]).aggregate() == expected
+
+
+def write_journal(directory, name, records):
+    with open(os.path.join(directory, name), "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def test_load_keeps_latest_decided_record_across_files(tmp_path):
+    record = {"prompt_id": 0, "model": "m1", "layer": 3, "role": "r1", "prompt_sha": "x"}
+    # File names sort opposite to the finishing order
+    write_journal(tmp_path, "journal-a-2.jsonl", [{**record, "agree": 1, "decision": 1, "end": 20.0, "seq": 0}])
+    write_journal(tmp_path, "journal-b-1.jsonl", [
+        {**record, "agree": 0, "decision": 1, "end": 10.0, "seq": 0},
+        {**record, "agree": 0, "decision": 0, "end": 30.0, "seq": 1},
+    ])
+    [loaded] = ResultJournal.load(tmp_path).values()
+    assert (loaded["agree"], loaded["end"]) == (1, 20.0)
+
+
+def test_load_orders_equal_end_times_by_seq(tmp_path):
+    record = {"prompt_id": 0, "model": "m1", "layer": 2, "role": "Generalist", "prompt_sha": "x", "end": 5.0}
+    write_journal(tmp_path, "journal-a-1.jsonl", [
+        {**record, "agree": 1, "decision": 1, "seq": 1},
+        {**record, "agree": 0, "decision": 1, "seq": 0},
+    ])
+    [loaded] = ResultJournal.load(tmp_path).values()
+    assert loaded["agree"] == 1
+
+
+def test_journal_numbers_records(tmp_path):
+    journal = ResultJournal(tmp_path, batch_size=1)
+    for agree in (1, 0):
+        journal.append({"prompt_id": 0, "model": "m1", "layer": 2, "role": "Generalist", "agree": agree, "decision": 1})
+    journal.close()
+    with open(journal.path) as f:
+        assert [json.loads(line)["seq"] for line in f] == [0, 1]
@@ -0,0 +1,81 @@
+import pytest
+
+from chrono_modules.ollama_helper import VerdictStream, parse_verdict
+
+
+@pytest.mark.parametrize("text,verdict", [
+    ("TRUE", "TRUE"),
+    ("FALSE. The claim is wrong.", "FALSE"),
+    ("True, because", "TRUE"),
+    ("fAlSe", "FALSE"),
+    ("  **True**", "TRUE"),
+    ('\n> "false"', "FALSE"),
+    ("TRUE and FALSE", "TRUE"),
+    ("False, it is not true", "FALSE"),
+])
+def test_parse_verdict_reads_the_leading_verdict(text, verdict):
+    assert parse_verdict(text) == verdict
+
+
+@pytest.mark.parametrize("text", ["", "  ", "**", "t", "Tr", "TRU", "f", "Fals"])
+def test_parse_verdict_is_undecided_on_a_verdict_prefix(text):
+    assert parse_verdict(text) is None
+
+
+@pytest.mark.parametrize("text", ["Maybe TRUE", "Truth be told", "It is FALSE", "Yes"])
+def test_parse_verdict_finds_no_leading_verdict(text):
+    assert parse_verdict(text) == ""
+
+
+def feed_all(stream, pieces):
+    """Feed pieces until the stream says stop; returns how many were read."""
+    for count, piece in enumerate(pieces, 1):
+        if stream.feed(piece):
+            return count
+    return len(pieces)
+
+
+def test_stream_stops_at_the_verdict_token_across_partial_chunks():
+    stream = VerdictStream(verdict_only=True)
+    pieces = [" *", "*T", "r", "ue", "**", " because", " it holds"]
+    assert feed_all(stream, pieces) == 4
+    assert stream.verdict == "TRUE"
+    assert stream.text() == " **TRUE"
+
+
+def test_stream_reads_justification_chars_after_the_verdict():
+    stream = VerdictStream(verdict_only=True, justification_chars=10)
+    pieces = ["FALSE", ". The", " claim", " mixes", " up dates."]
+    assert feed_all(stream, pieces) == 3
+    assert stream.text() == "FALSE. The clai"
+
+
+def test_stream_normalises_mixed_case_verdicts():
+    stream = VerdictStream(verdict_only=True, justification_chars=5)
+    assert feed_all(stream, ["tR", "uE", ", it", " holds"]) == 4
+    # The scorer looks for an uppercase TRUE, which the model did not write
+    assert stream.text() == "TRUE, it "
+
+
+def test_stream_keeps_the_leading_verdict_when_both_appear():
+    stream = VerdictStream(verdict_only=True, justification_chars=40)
+    feed_all(stream, ["False", " - it would only be TRUE", " for another year", " and place."])
+    assert stream.verdict == "FALSE"
+    assert stream.text().startswith("FALSE - it would only be TRUE")
+    assert len(stream.text()) == len("FALSE") + 40
+
+
+def test_stream_without_a_leading_verdict_reads_to_the_end():
+    stream = VerdictStream(verdict_only=True)
+    pieces = ["I think", " it is", " TRUE."]
+    assert not any(stream.feed(piece) for piece in pieces)
+    assert stream.verdict == ""
+    assert stream.text() == "I think it is TRUE."
+
+
+def test_stream_outside_verdict_only_mode_never_stops():
+    stream = VerdictStream()
+    pieces = ["TRUE", ", and", " more"]
+    assert not any(stream.feed(piece) for piece in pieces)
+    assert stream.verdict is None
+    assert stream.text() == "TRUE, and more"